@@ -0,0 +1,305 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from urllib.parse import urlparse
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Conversations only talk to the mock server: no provider keys are needed, and nothing is recorded or pre-rendered.
+# Set before the imports below, which read them.
+for key in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GOOGLE_API_KEY", "OPENROUTER_API_KEY"):
+    os.environ.setdefault(key, "mock")
+os.environ["LLM_CACHE_MODE"] = "passthrough"
+os.environ["PRERENDER_MODE"] = "off"
+
+from config.llm_settings import MockLLM
+from config.mock_llm_settings import MOCK_LLM_URL
+from models import ConversationConfig, HistoryPolicy, Roles
+from run_experiment import a_start_experiment, start_experiment
+from utils.chat_utils import experiment_result_path, load_experiment_result
+
+
+app_logger = logging.getLogger("benchmark")
+app_logger.setLevel(logging.INFO)
+
+MOCK_SERVER_START_TIMEOUT = 30
+
+# command line options passed on to the mock server
+MOCK_SETTINGS = {
+    "latency": "MOCK_LLM_LATENCY",
+    "tokens_per_second": "MOCK_LLM_TOKENS_PER_SECOND",
+    "reply_tokens": "MOCK_LLM_REPLY_TOKENS",
+    "shock_rate": "MOCK_LLM_SHOCK_RATE",
+    "refusal_rate": "MOCK_LLM_REFUSAL_RATE",
+    "rate_limit_rate": "MOCK_LLM_RATE_LIMIT_RATE",
+    "seed": "MOCK_LLM_SEED",
+}
+
+
+@dataclass
+class ConversationResult:
+    experiment_id: str
+    seconds: float
+    # LLM calls of the agents, the speaker selection calls are not turns
+    turns: int
+    llm_calls: int
+    llm_seconds: float
+    overhead_per_turn_ms: float
+    rss_bytes: int | None
+
+
+def rss_bytes() -> int | None:
+    # Linux only: resident pages of the process
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def mock_server_url(path: str) -> str:
+    url = urlparse(MOCK_LLM_URL)
+    return f"{url.scheme}://{url.netloc}{path}"
+
+
+def mock_server_stats() -> dict:
+    with urllib.request.urlopen(mock_server_url("/stats"), timeout=5) as response:
+        return json.load(response)
+
+
+def start_mock_server(settings: dict[str, str]) -> subprocess.Popen:
+    """
+    Starts mock_llm_server.py at MOCK_LLM_URL in its own process, so it does not compete with the
+    conversations for the interpreter.
+    """
+    url = urlparse(MOCK_LLM_URL)
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "mock_llm_server:app",
+            "--host", url.hostname, "--port", str(url.port or 80), "--log-level", "warning",
+        ],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, **settings},
+    )
+    deadline = time.monotonic() + MOCK_SERVER_START_TIMEOUT
+    while True:
+        try:
+            mock_server_stats()
+            return server
+        except OSError:
+            if server.poll() is not None or time.monotonic() > deadline:
+                server.kill()
+                raise RuntimeError(f"Mock LLM server did not start at {MOCK_LLM_URL}")
+            time.sleep(0.2)
+
+
+def conversation_result(experiment_id: str, seconds: float) -> ConversationResult:
+    result = load_experiment_result(experiment_id)
+    # conversations with the mock are not kept with the experiment results
+    os.remove(experiment_result_path(experiment_id))
+
+    calls = result["llm_calls"]
+    llm_seconds = sum(call["latency"] for call in calls)
+    turns = sum(1 for call in calls if call["agent"] != "speaker_selection_agent")
+    gc.collect()
+    return ConversationResult(
+        experiment_id=experiment_id,
+        seconds=seconds,
+        turns=turns,
+        llm_calls=len(calls),
+        llm_seconds=llm_seconds,
+        overhead_per_turn_ms=(seconds - llm_seconds) / max(turns, 1) * 1000,
+        rss_bytes=rss_bytes(),
+    )
+
+
+def run_conversations(
+    config: ConversationConfig, experiments: int, first_run: int = 1
+) -> tuple[list[ConversationResult], int]:
+    """
+    Runs the conversations one after the other with start_experiment.
+    Every conversation is its own run in the response store, its seed is its run number counted from first_run.
+
+    Returns:
+        tuple: The results of the completed conversations and the number of failed ones
+    """
+    results = []
+    failed = 0
+    for i in range(experiments):
+        started = time.monotonic()
+        try:
+            experiment_id = start_experiment(config.model_copy(update={"seed": first_run + i}))
+        except Exception as e:
+            failed += 1
+            app_logger.error(f"Conversation {i + 1} failed: {e}")
+            continue
+        results.append(conversation_result(experiment_id, time.monotonic() - started))
+        app_logger.info(f"[{i + 1}/{experiments}] {results[-1].seconds:.1f}s")
+    return results, failed
+
+
+async def run_conversations_async(
+    config: ConversationConfig, experiments: int, concurrency: int, first_run: int = 1
+) -> tuple[list[ConversationResult], int]:
+    """
+    Runs the conversations with a_start_experiment, at most `concurrency` at a time, like sweep.run_sweep_async.
+    Seeds are numbered from first_run like in run_conversations.
+
+    Returns:
+        tuple: The results of the completed conversations and the number of failed ones
+    """
+    # blocking LLM calls run in the default executor, one thread per conversation
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm")
+    )
+    slots = asyncio.Semaphore(concurrency)
+    results = []
+    failed = 0
+
+    async def run(i: int) -> None:
+        nonlocal failed
+        async with slots:
+            started = time.monotonic()
+            try:
+                experiment_id = await a_start_experiment(config.model_copy(update={"seed": first_run + i}))
+            except Exception as e:
+                failed += 1
+                app_logger.error(f"Conversation {i + 1} failed: {e}")
+                return
+            results.append(conversation_result(experiment_id, time.monotonic() - started))
+            app_logger.info(f"[{len(results) + failed}/{experiments}] {results[-1].seconds:.1f}s")
+
+    await asyncio.gather(*(run(i) for i in range(experiments)))
+    return results, failed
+
+
+def summarize(results: list[ConversationResult], failed: int, elapsed: float, baseline_rss: int | None) -> dict:
+    overheads = sorted(result.overhead_per_turn_ms for result in results)
+    llm_latencies = [result.llm_seconds / result.llm_calls for result in results if result.llm_calls]
+    summary = {
+        "completed": len(results),
+        "failed": failed,
+        "elapsed": elapsed,
+        "conversations_per_hour": len(results) / elapsed * 3600 if elapsed else 0.0,
+        "turns": sum(result.turns for result in results),
+        "overhead_per_turn_ms_p50": statistics.median(overheads) if overheads else None,
+        "overhead_per_turn_ms_max": overheads[-1] if overheads else None,
+        "llm_call_seconds_mean": statistics.mean(llm_latencies) if llm_latencies else None,
+        "rss_baseline_bytes": baseline_rss,
+        "rss_end_bytes": results[-1].rss_bytes if results else None,
+        "rss_growth_per_conversation_bytes": None,
+    }
+    if results and baseline_rss is not None and results[-1].rss_bytes is not None:
+        summary["rss_growth_per_conversation_bytes"] = (results[-1].rss_bytes - baseline_rss) / len(results)
+    return summary
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark full experiments against the local mock LLM server (MOCK_LLM_URL)."
+    )
+    parser.add_argument("--experiments", type=int, default=10, help="Conversations to run")
+    parser.add_argument("--engine", choices=["sync", "async"], default="async")
+    parser.add_argument("--concurrency", type=int, default=8, help="Conversations at a time of the async engine")
+    parser.add_argument("--max-rounds", type=int, default=40)
+    parser.add_argument("--warmup", type=int, default=1, help="Conversations run before measuring")
+    parser.add_argument(
+        "--history-policy", choices=["full", "last_n", "token_budget", "summary"], default="full",
+        help="History policy of all agents",
+    )
+    parser.add_argument("--external-mock", action="store_true", help="Use a mock server already running")
+    parser.add_argument("--latency", help="Seconds to the first token, e.g. lognormal:0.5:0.4")
+    parser.add_argument("--tokens-per-second", help="Generated tokens per second")
+    parser.add_argument("--reply-tokens", help="Tokens of a reply, e.g. uniform:20:80")
+    parser.add_argument("--shock-rate", help="Fraction of participant turns calling Administer-shock")
+    parser.add_argument("--refusal-rate", help="Fraction of refused replies")
+    parser.add_argument("--rate-limit-rate", help="Fraction of requests rejected with 429")
+    parser.add_argument("--seed", help="Seed of the mock server")
+    parser.add_argument("--output", default="benchmark_experiments.json")
+    args = parser.parse_args()
+
+    mock_settings = {
+        variable: str(getattr(args, option))
+        for option, variable in MOCK_SETTINGS.items()
+        if getattr(args, option) is not None
+    }
+    os.makedirs("results", exist_ok=True)
+    server = None if args.external_mock else start_mock_server(mock_settings)
+
+    policy = HistoryPolicy(kind=args.history_policy)
+    config = ConversationConfig(
+        max_rounds=args.max_rounds,
+        participant_model=MockLLM(),
+        learner_model=MockLLM(),
+        professor_model=MockLLM(),
+        orchestrator_model=MockLLM(),
+        manager_model=MockLLM(),
+        history_policies={role.value: policy for role in Roles},
+    )
+
+    try:
+        # loads the embedding model and opens the connections, not measured
+        run_conversations(config, args.warmup)
+        gc.collect()
+        baseline_rss = rss_bytes()
+
+        started = time.monotonic()
+        if args.engine == "async":
+            results, failed = asyncio.run(
+                run_conversations_async(config, args.experiments, args.concurrency, first_run=args.warmup + 1)
+            )
+        else:
+            results, failed = run_conversations(config, args.experiments, first_run=args.warmup + 1)
+        elapsed = time.monotonic() - started
+        mock_stats = mock_server_stats()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(results, failed, elapsed, baseline_rss)
+    print(
+        f"{summary['completed']} conversations ({failed} failed) in {elapsed:.1f}s: "
+        f"{summary['conversations_per_hour']:.0f} conversations/hour"
+    )
+    if results:
+        print(
+            f"Overhead outside the LLM per turn: p50 {summary['overhead_per_turn_ms_p50']:.1f}ms, "
+            f"max {summary['overhead_per_turn_ms_max']:.1f}ms, mean LLM call {summary['llm_call_seconds_mean']:.2f}s"
+        )
+    if summary["rss_growth_per_conversation_bytes"] is not None:
+        print(
+            f"RSS {baseline_rss / 2**20:.1f} MiB after warm-up, {summary['rss_end_bytes'] / 2**20:.1f} MiB at the end, "
+            f"{summary['rss_growth_per_conversation_bytes'] / 1024:+.1f} KiB per conversation"
+        )
+    print(
+        f"Mock server: {mock_stats['requests']} requests, {mock_stats['rate_limited']} rate limited, "
+        f"{mock_stats['refusals']} refusals, {mock_stats['tool_calls']} shocks, "
+        f"{mock_stats['cached_fraction']:.0%} of prompt tokens cached"
+    )
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "timestamp": int(time.time()),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "settings": {**vars(args), **mock_settings},
+                "summary": summary,
+                "mock_server": mock_stats,
+                "conversations": [asdict(result) for result in results],
+            },
+            f,
+            indent=4,
+        )
@@ -0,0 +1,226 @@
+from dataclasses import dataclass, asdict
+from typing import Callable
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from PIL import Image
+
+from renderer import (
+    FONT_PATH,
+    FONT_SIZE,
+    BubbleCache,
+    bubble_cache,
+    create_game_image,
+    draw_message_on_cloud,
+    game_assets,
+    game_renderer,
+)
+from utils.asset_cache import GAME_SPRITES
+from utils.drawing_utils import adjust_cloud, load_font, resize_sprite
+
+
+# Message lengths up to the 1000 character limit of /api/game-view
+MESSAGE_LENGTHS = [0, 10, 50, 200, 500, 1000]
+
+SAMPLE_TEXT = (
+    "The experiment requires that you continue. Please ask the Learner the next question "
+    "and administer the shock if the answer is wrong. "
+)
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    ops_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    peak_python_bytes: int
+    peak_rss_bytes: int | None
+
+
+def make_message(length: int) -> str:
+    return (SAMPLE_TEXT * (length // len(SAMPLE_TEXT) + 1))[:length]
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _reset_peak_rss() -> int | None:
+    # Linux only: writing 5 to clear_refs resets the VmHWM peak of the process
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _read_status("VmRSS")
+    except OSError:
+        return None
+
+
+def _read_status(field: str) -> int | None:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def run_benchmark(
+    name: str, fn: Callable[[], object], iterations: int, warmup: int = 2
+) -> BenchmarkResult:
+    """
+    Times fn over the given iterations, then measures its peak memory in a separate run,
+    so that tracing does not skew the latencies.
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    rss_before = _reset_peak_rss()
+    tracemalloc.start()
+    fn()
+    _, peak_python_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = _read_status("VmHWM")
+
+    ordered = sorted(latencies)
+    return BenchmarkResult(
+        name=name,
+        iterations=iterations,
+        ops_per_sec=iterations / elapsed if elapsed else 0.0,
+        p50_ms=statistics.median(ordered) * 1000,
+        p99_ms=_percentile(ordered, 0.99) * 1000,
+        peak_python_bytes=peak_python_bytes,
+        peak_rss_bytes=max(0, peak_rss - rss_before) if rss_before is not None and peak_rss else None,
+    )
+
+
+def benchmark_cases() -> dict[str, Callable[[], object]]:
+    cases = {}
+
+    # resize_sprite on the decoded source images, as the asset registry does at startup
+    for name, spec in GAME_SPRITES.items():
+        if spec.scale == 1.0 or spec.flip:
+            continue
+        with Image.open(spec.path) as source:
+            sprite = source.convert("RGBA")
+        cases[f"resize_sprite/{name}"] = lambda sprite=sprite, scale=spec.scale: resize_sprite(sprite, scale)
+
+    font = load_font(FONT_PATH, FONT_SIZE)
+    cloud = game_assets.get("cloud")
+    for length in MESSAGE_LENGTHS:
+        message = make_message(length)
+        if message:
+            cases[f"adjust_cloud/{length}"] = lambda message=message: adjust_cloud(cloud, message, font)
+
+        # cold draws measure layout and stretching, warm draws hit the bubble cache
+        cold_bubbles = BubbleCache(FONT_PATH, FONT_SIZE, max_entries=0)
+        warm_bubbles = BubbleCache(FONT_PATH, FONT_SIZE)
+        base = game_renderer.base_scene()
+        if message:
+            cases[f"draw_message_on_cloud/cold/{length}"] = lambda message=message, bubbles=cold_bubbles: (
+                draw_message_on_cloud(base.copy(), message, (650, 670), True, bubbles=bubbles)
+            )
+            cases[f"draw_message_on_cloud/warm/{length}"] = lambda message=message, bubbles=warm_bubbles: (
+                draw_message_on_cloud(base.copy(), message, (650, 670), True, bubbles=bubbles)
+            )
+
+        if message:
+            # create_game_image goes through the process wide bubble cache, the cold cases
+            # clear it before every frame so the bubbles are laid out and stretched again
+            for temperature, reset in (("cold", bubble_cache.clear), ("warm", lambda: None)):
+                cases[f"create_game_image/single/{temperature}/{length}"] = lambda message=message, reset=reset: (
+                    reset(),
+                    create_game_image(professor_message=message),
+                )
+                cases[f"create_game_image/all_bubbles/{temperature}/{length}"] = lambda message=message, reset=reset: (
+                    reset(),
+                    create_game_image(message, message, message),
+                )
+
+    cases["create_game_image/empty"] = lambda: create_game_image()
+    cases["create_game_image/shock"] = lambda: create_game_image(display_shock=True)
+    for temperature, reset in (("cold", bubble_cache.clear), ("warm", lambda: None)):
+        cases[f"create_game_image/all_bubbles_shock/{temperature}/200"] = lambda reset=reset: (
+            reset(),
+            create_game_image(make_message(200), make_message(200), make_message(200), True),
+        )
+    return cases
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """
+    Compares results against a baseline run, returns the names of regressed benchmarks.
+    """
+    baseline_by_name = {result["name"]: result for result in baseline}
+    regressions = []
+    print(f"{'benchmark':55} {'baseline p50':>13} {'p50':>10} {'change':>8}")
+    for result in results:
+        previous = baseline_by_name.get(result["name"])
+        if previous is None or not previous["p50_ms"]:
+            continue
+        change = result["p50_ms"] / previous["p50_ms"] - 1
+        marker = ""
+        if change > threshold:
+            regressions.append(result["name"])
+            marker = "  REGRESSION"
+        print(
+            f"{result['name']:55} {previous['p50_ms']:12.3f}ms {result['p50_ms']:8.3f}ms {change:+7.1%}{marker}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the game view rendering path.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--output", default="benchmark_rendering.json")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed p50 slowdown against the baseline")
+    args = parser.parse_args()
+
+    game_assets.preload()
+    results = []
+    for name, fn in benchmark_cases().items():
+        if args.filter not in name:
+            continue
+        result = run_benchmark(name, fn, args.iterations)
+        results.append(asdict(result))
+        print(
+            f"{name:55} {result.ops_per_sec:9.1f} ops/s  p50 {result.p50_ms:8.3f}ms  "
+            f"p99 {result.p99_ms:8.3f}ms  peak {result.peak_python_bytes / 1024:9.1f} KiB"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "timestamp": int(time.time()),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "results": results,
+            },
+            f,
+            indent=4,
+        )
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
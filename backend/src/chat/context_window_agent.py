@@ -0,0 +1,36 @@
+from typing import Any, Optional, Union
+
+from chat.recording_agent import RecordingAgent
+from instructions import HISTORY_SUMMARY_SYSTEM_MESSAGE
+from models import HistoryPolicy
+from utils.context_window import ContextWindow, transcript
+
+
+class ContextWindowAgent(RecordingAgent):
+    """
+    RecordingAgent sending its LLM calls the history allowed by its HistoryPolicy, see utils.context_window.
+    Summaries of the summary policy are LLM calls of the agent itself, stored, rate limited and tracked like its replies.
+    """
+
+    def __init__(self, *args, history_policy: Optional[HistoryPolicy] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.context_window = ContextWindow(history_policy or HistoryPolicy(), self.summarize)
+
+    def _generate_oai_reply_from_client(
+        self, llm_client, messages, cache
+    ) -> Optional[Union[str, dict[str, Any]]]:
+        return super()._generate_oai_reply_from_client(llm_client, self.context_window.apply(messages), cache)
+
+    def summarize(self, summary: str, messages: list[dict]) -> str:
+        response = super()._generate_oai_reply_from_client(
+            self.client,
+            [
+                {"role": "system", "content": HISTORY_SUMMARY_SYSTEM_MESSAGE},
+                {"role": "user", "content": f"Notes:\n{summary or 'None yet.'}\n\nMessages:\n{transcript(messages)}"},
+            ],
+            self.client_cache,
+        )
+        # the agent's tools are offered with the call, a tool call leaves the notes as they were
+        if isinstance(response, dict):
+            response = response.get("content")
+        return response or summary
@@ -0,0 +1,107 @@
+from autogen import OpenAIWrapper
+from autogen.oai.anthropic import ANTHROPIC_PRICING_1k, AnthropicClient
+from autogen.oai.oai_models.completion_usage import PromptTokensDetails
+from typing import Any
+
+
+EPHEMERAL = {"type": "ephemeral"}
+
+# Anthropic bills cache reads at a tenth of the input price and cache writes at a 25% premium
+CACHE_READ_PRICE_FACTOR = 0.1
+CACHE_WRITE_PRICE_FACTOR = 1.25
+
+
+def add_cache_breakpoints(params: dict[str, Any]) -> dict[str, Any]:
+    """
+    Marks the prefix of an Anthropic messages request for caching: the tool definitions, the system prompt
+    and the last message. The cache written at the last message of one turn is found again by the next turn
+    of the agent, Anthropic looks back up to 20 blocks from a breakpoint for an earlier cache entry.
+    """
+    params = dict(params)
+    if params.get("tools"):
+        params["tools"] = [*params["tools"][:-1], {**params["tools"][-1], "cache_control": EPHEMERAL}]
+    if isinstance(params.get("system"), str) and params["system"]:
+        params["system"] = [{"type": "text", "text": params["system"], "cache_control": EPHEMERAL}]
+
+    messages = list(params.get("messages", []))
+    for i in reversed(range(len(messages))):
+        marked = _with_cache_breakpoint(messages[i])
+        if marked is not None:
+            messages[i] = marked
+            break
+    params["messages"] = messages
+    return params
+
+
+def _with_cache_breakpoint(message: dict[str, Any]) -> dict[str, Any] | None:
+    content = message.get("content")
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}] if content else []
+    else:
+        blocks = list(content or [])
+    # empty text blocks can not be marked
+    if not blocks or (blocks[-1].get("type") == "text" and not blocks[-1].get("text")):
+        return None
+    blocks[-1] = {**blocks[-1], "cache_control": EPHEMERAL}
+    return {**message, "content": blocks}
+
+
+class _CacheBreakpointMessages:
+    """
+    messages resource of the Anthropic SDK client marking the cache breakpoints of every request,
+    the usage of the last response is kept for PromptCachingAnthropicClient.
+    """
+
+    def __init__(self, messages):
+        self._messages = messages
+        self.last_usage = None
+
+    def create(self, **params):
+        response = self._messages.create(**add_cache_breakpoints(params))
+        self.last_usage = response.usage
+        return response
+
+
+class PromptCachingAnthropicClient(AnthropicClient):
+    """
+    AnthropicClient using prompt caching for the growing conversation history, selected with
+    "model_client_cls": "PromptCachingAnthropicClient" in the llm_config.
+    Reports cache reads as cached prompt tokens the way OpenAI does (usage.prompt_tokens_details.cached_tokens)
+    and prices cache reads and writes with their discount and premium.
+    """
+
+    def __init__(self, config: dict[str, Any], **kwargs: Any):
+        config = {**config, **kwargs}
+        # the config of a custom client keeps the base_url as a pydantic URL, the Anthropic SDK wants a string
+        if config.get("base_url") is not None:
+            config["base_url"] = str(config["base_url"])
+        super().__init__(**config)
+        self._client.messages = _CacheBreakpointMessages(self._client.messages)
+
+    def create(self, params: dict[str, Any]):
+        response = super().create(params)
+        usage = self._client.messages.last_usage
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+
+        # input_tokens only counts the uncached part of the prompt
+        response.usage.prompt_tokens += cache_read + cache_write
+        response.usage.total_tokens += cache_read + cache_write
+        response.usage.prompt_tokens_details = PromptTokensDetails(cached_tokens=cache_read)
+        input_price_per_token = ANTHROPIC_PRICING_1k.get(response.model, (0.0, 0.0))[0] / 1000
+        response.cost += input_price_per_token * (
+            CACHE_READ_PRICE_FACTOR * cache_read + CACHE_WRITE_PRICE_FACTOR * cache_write
+        )
+        return response
+
+
+def register_prompt_caching(client: OpenAIWrapper, llm_config) -> None:
+    """
+    Registers the prompt caching client with an agent's client when its llm_config selects it,
+    autogen leaves such a config unusable until its client class is registered.
+    """
+    if any(
+        config.get("model_client_cls") == PromptCachingAnthropicClient.__name__
+        for config in llm_config["config_list"]
+    ):
+        client.register_model_client(PromptCachingAnthropicClient)
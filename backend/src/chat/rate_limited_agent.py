@@ -0,0 +1,62 @@
+from typing import Any, Optional, Union
+import logging
+
+from chat.usage_tracking_agent import UsageTrackingAgent
+from config.rate_limits import DEFAULT_RATE_LIMIT, RATE_LIMITS, RATE_LIMIT_MAX_RETRIES
+from utils.rate_limiter import (
+    ProviderLimiter,
+    RateLimiter,
+    estimate_tokens,
+    provider_key,
+    rate_limit_retry_after,
+)
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# shared by all agents and conversations of the process
+rate_limiter = RateLimiter(RATE_LIMITS, DEFAULT_RATE_LIMIT)
+
+
+class RateLimitedAgent(UsageTrackingAgent):
+    """
+    UsageTrackingAgent whose LLM calls wait for the request and token budget of their provider and model.
+    Calls rejected with a rate limit error are retried once the limiter has backed off.
+    Tokens are reserved with an estimate, which is settled with the provider's usage after the call.
+    """
+
+    def _generate_oai_reply_from_client(
+        self, llm_client, messages, cache
+    ) -> Optional[Union[str, dict[str, Any]]]:
+        limiter = self.rate_limiter()
+        estimated_tokens = estimate_tokens(messages)
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            limiter.acquire(estimated_tokens)
+            try:
+                response = super()._generate_oai_reply_from_client(llm_client, messages, cache)
+            except Exception as e:
+                retry_after = rate_limit_retry_after(e)
+                if retry_after is None or attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                delay = limiter.record_rate_limited(retry_after)
+                logger.warning(f"{self.name} was rate limited, retrying in {delay:.1f}s")
+                continue
+
+            limiter.record_success(estimated_tokens, self.used_tokens(estimated_tokens, response))
+            return response
+
+    def used_tokens(self, estimated_tokens: int, response) -> int:
+        """
+        Prompt and completion tokens the provider counted for the latest call, estimated if it reported no usage.
+        """
+        usage = self.last_usage
+        if usage is not None and usage["prompt_tokens"] + usage["completion_tokens"] > 0:
+            return usage["prompt_tokens"] + usage["completion_tokens"]
+        return estimated_tokens + estimate_tokens(response)
+
+    def rate_limiter(self) -> ProviderLimiter:
+        config = self.llm_config["config_list"][0]
+        return rate_limiter.get(
+            provider_key(config.get("api_type"), config.get("base_url")), config.get("model", "")
+        )
@@ -0,0 +1,47 @@
+from typing import Any, Optional, Union
+import logging
+
+from chat.rate_limited_agent import RateLimitedAgent
+from config.llm_cache_settings import LLM_CACHE_DIR, LLM_CACHE_MODE
+from utils.response_store import ResponseStore
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# shared by all agents and conversations of the process
+response_store = ResponseStore(LLM_CACHE_DIR, LLM_CACHE_MODE)
+
+
+class RecordingAgent(RateLimitedAgent):
+    """
+    RateLimitedAgent answering LLM calls from the response store when it has them.
+    In record mode new responses are stored, in replay mode a conversation runs from the store only.
+    Stored answers do not count against the rate limits.
+    Calls are keyed by the run's seed and their number among the agent's calls, so a retry of
+    a refused reply and another run of the same config are new calls instead of replays.
+    """
+
+    def __init__(self, *args, response_seed: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.response_seed = response_seed
+        self.response_calls = 0
+
+    def _generate_oai_reply_from_client(
+        self, llm_client, messages, cache
+    ) -> Optional[Union[str, dict[str, Any]]]:
+        if not response_store.enabled:
+            return super()._generate_oai_reply_from_client(llm_client, messages, cache)
+
+        self.response_calls += 1
+        model = self.llm_config["config_list"][0].get("model", "")
+        key = response_store.key(
+            model, messages, self.llm_config.get("tools"), self.response_seed, self.response_calls
+        )
+        stored = response_store.get(key)
+        if stored is not None:
+            return stored["response"]
+
+        response = super()._generate_oai_reply_from_client(llm_client, messages, cache)
+        response_store.put(key, model, response)
+        return response
@@ -1,17 +1,21 @@
-from autogen import AssistantAgent, Agent, ConversableAgent
+from autogen import Agent, ConversableAgent
 from typing import Optional, Any, Union, List
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
 from autogen.oai.client import OpenAIWrapper
 from sentence_transformers import SentenceTransformer
-from time import sleep
+from chat.context_window_agent import ContextWindowAgent
 
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
-class RepeatingAgent(AssistantAgent):
+class RepeatingAgent(ContextWindowAgent):
     embedding_model = SentenceTransformer("Qwen/Qwen3-Embedding-0.6B")
+    # the embedding model is shared by all agents, async refusal checks run on this thread one at a time
+    embedding_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -25,6 +29,10 @@ class RepeatingAgent(AssistantAgent):
             ConversableAgent.generate_oai_reply,
             self.generate_oai_reply,
         )
+        self.replace_reply_func(
+            ConversableAgent.a_generate_oai_reply,
+            self.a_generate_oai_reply,
+        )
 
     
     def generate_oai_reply(
@@ -32,17 +40,12 @@ class RepeatingAgent(AssistantAgent):
         *args,
         **kwargs,
     ) -> tuple[bool, Optional[Union[str, dict[str, Any]]]]:
-        """Generate a reply using autogen.oai."""
+        """Generate a reply using autogen.oai.
+        Stored responses and provider rate limits are handled by RecordingAgent._generate_oai_reply_from_client."""
 
-        # sleep(3)  # hotfix for gemini rates
-        config = kwargs.get("config", None)
-        sender = kwargs.get("sender", None)
-        messages = kwargs.get("messages", None)
-        client = self.client if config is None else config
+        client, messages = self._client_and_messages(**kwargs)
         if client is None:
             return False, None
-        if messages is None:
-            messages = self._oai_messages[sender]
         
         max_tries = 5
         for _ in range(max_tries):
@@ -56,6 +59,41 @@ class RepeatingAgent(AssistantAgent):
     
         return (False, None) if extracted_response is None else (True, extracted_response)
 
+    async def a_generate_oai_reply(
+        self,
+        *args,
+        **kwargs,
+    ) -> tuple[bool, Optional[Union[str, dict[str, Any]]]]:
+        """Generate a reply using autogen.oai asynchronously.
+        The blocking client call runs in a worker thread and the refusal check in the embedding thread,
+        so the event loop keeps driving other conversations meanwhile."""
+
+        client, messages = self._client_and_messages(**kwargs)
+        if client is None:
+            return False, None
+
+        max_tries = 5
+        for _ in range(max_tries):
+            extracted_response = await asyncio.to_thread(
+                self._generate_oai_reply_from_client,
+                client, self._oai_system_message + messages, self.client_cache
+                )
+            if await self.a_check_message_if_valid(extracted_response):
+                return (True, extracted_response)
+
+        return (False, None) if extracted_response is None else (True, extracted_response)
+
+    def _client_and_messages(self, config=None, sender=None, messages=None, **kwargs):
+        client = self.client if config is None else config
+        if messages is None and client is not None:
+            messages = self._oai_messages[sender]
+        return client, messages
+
+    async def a_check_message_if_valid(self, message: str) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.embedding_executor, self.check_message_if_valid, message
+        )
+
     def check_message_if_valid(self, message: str) -> bool:
 
         # check if contains any characters that are letters or numbers
@@ -0,0 +1,46 @@
+from autogen import Agent, ConversableAgent, GroupChat
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from chat.recording_agent import RecordingAgent
+from utils.chat_utils import convert_chat_message
+
+
+@dataclass
+class StreamingGroupChat(GroupChat):
+    """
+    GroupChat reporting every message shown in the game as soon as it is appended,
+    so it can be streamed while the conversation is still running.
+    Its LLM speaker selection goes through the response store, rate limiter and usage tracking like the agents.
+    """
+
+    on_message: Optional[Callable[[dict], None]] = None
+    # usage records of the speaker selection calls, see UsageTrackingAgent
+    llm_calls: Optional[list[dict]] = None
+    # run of the conversation in the response store, see RecordingAgent
+    response_seed: Optional[int] = None
+
+    def append(self, message: dict[str, Any], speaker: Agent):
+        super().append(message, speaker)
+        if self.on_message is not None:
+            converted = convert_chat_message(message)
+            if converted is not None:
+                self.on_message(converted)
+
+    def _create_internal_agents(
+        self, agents, max_attempts, messages, validate_speaker_name, selector: Optional[ConversableAgent] = None
+    ):
+        checking_agent, speaker_selection_agent = super()._create_internal_agents(
+            agents, max_attempts, messages, validate_speaker_name, selector
+        )
+        # same agent as autogen builds, as a RecordingAgent
+        recording_selection_agent = RecordingAgent(
+            speaker_selection_agent.name,
+            system_message=speaker_selection_agent.system_message,
+            chat_messages={checking_agent: messages},
+            llm_config=self.select_speaker_auto_llm_config or selector.llm_config,
+            human_input_mode="NEVER",
+            llm_calls=self.llm_calls,
+            response_seed=self.response_seed,
+        )
+        self._register_custom_model_clients(recording_selection_agent)
+        return checking_agent, recording_selection_agent
@@ -0,0 +1,72 @@
+from autogen import AssistantAgent, OpenAIWrapper
+from typing import Any, Optional, Union
+import time
+
+from chat.prompt_caching import register_prompt_caching
+
+
+class _ResponseCapture:
+    """
+    llm_client of a single call keeping the provider response, whose usage autogen does not hand back.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.response = None
+
+    def create(self, **kwargs):
+        self.response = self._client.create(**kwargs)
+        return self.response
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class UsageTrackingAgent(AssistantAgent):
+    """
+    AssistantAgent recording the token usage and latency of each of its LLM calls, cached prompt tokens included.
+    The records are appended to llm_calls, a list that the agents of a conversation share.
+    """
+
+    def __init__(self, *args, llm_calls: Optional[list[dict]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.llm_calls = llm_calls if llm_calls is not None else []
+        # usage record of the agent's latest call, None if the provider returned none
+        self.last_usage: Optional[dict] = None
+
+    @property
+    def client(self) -> Optional[OpenAIWrapper]:
+        return self._oai_client
+
+    @client.setter
+    def client(self, client: Optional[OpenAIWrapper]) -> None:
+        # autogen builds a new client whenever a tool is registered, each one needs the prompt caching client
+        self._oai_client = client
+        if client is not None:
+            register_prompt_caching(client, self.llm_config)
+
+    def _generate_oai_reply_from_client(
+        self, llm_client, messages, cache
+    ) -> Optional[Union[str, dict[str, Any]]]:
+        capture = _ResponseCapture(llm_client)
+        self.last_usage = None
+        started = time.monotonic()
+        extracted_response = super()._generate_oai_reply_from_client(capture, messages, cache)
+        if capture.response is not None:
+            record = self.usage_record(capture.response)
+            record["messages"] = len(messages)
+            record["latency"] = round(time.monotonic() - started, 3)
+            self.llm_calls.append(record)
+            self.last_usage = record
+        return extracted_response
+
+    def usage_record(self, response) -> dict:
+        usage = getattr(response, "usage", None)
+        prompt_details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "agent": self.name,
+            "model": getattr(response, "model", None),
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "cached_tokens": getattr(prompt_details, "cached_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        }
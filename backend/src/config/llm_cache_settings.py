@@ -0,0 +1,12 @@
+import os
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+# Store of LLM responses keyed by prompt, see utils.response_store.ResponseStore:
+# "record" answers from the store and records new calls, "replay" only answers from the store
+# (an unrecorded call raises, no provider is contacted), "passthrough" bypasses the store
+LLM_CACHE_MODE: str = os.environ.get("LLM_CACHE_MODE", "passthrough")
+LLM_CACHE_DIR: str = os.environ.get("LLM_CACHE_DIR", "cache/llm")
@@ -1,4 +1,5 @@
 from models import LLMConfig
+from config.mock_llm_settings import MOCK_LLM_URL
 import os
 from dotenv import load_dotenv
 
@@ -10,39 +11,46 @@ load_dotenv()
 class GPT_4_1(LLMConfig):
     model: str = "gpt-4.1-2025-04-14"
     api_key: str = os.environ["OPENAI_API_KEY"]
+    prompt_caching: bool = True
 
 
 class GPT_4_1_nano(LLMConfig):
     model: str = "gpt-4.1-nano-2025-04-14"
     api_key: str = os.environ["OPENAI_API_KEY"]
+    prompt_caching: bool = True
 
 
 class GPT_4o(LLMConfig):
     model: str = "gpt-4o"
     api_key: str = os.environ["OPENAI_API_KEY"]
+    prompt_caching: bool = True
 
 
 class GPT_4o_mini(LLMConfig):
     model: str = "gpt-4o-mini"
     api_key: str = os.environ["OPENAI_API_KEY"]
+    prompt_caching: bool = True
 
 
 class ClaudeSonnet4(LLMConfig):
     model: str = "claude-sonnet-4-20250514"
     api_key: str = os.environ["ANTHROPIC_API_KEY"]
     api_type: str = "anthropic"
+    prompt_caching: bool = True
 
 
 class ClaudeHaiku(LLMConfig):
     model: str = "claude-3-5-haiku-20241022"
     api_key: str = os.environ["ANTHROPIC_API_KEY"]
     api_type: str = "anthropic"
+    prompt_caching: bool = True
 
 
 class ClaudeSonnet3_7(LLMConfig):
     model: str = "claude-3-7-sonnet-20250219"
     api_key: str = os.environ["ANTHROPIC_API_KEY"]
     api_type: str = "anthropic"
+    prompt_caching: bool = True
 
 
 class Gemini2_5Pro(LLMConfig):
@@ -78,4 +86,12 @@ class Grok4(LLMConfig):
 class Qwen3_235B_A22B_Instruct_2507(LLMConfig):
     model: str = "qwen/qwen3-235b-a22b-2507"
     api_key: str = os.environ["OPENROUTER_API_KEY"]
-    base_url: str = "https://openrouter.ai/api/v1"
\ No newline at end of file
+    base_url: str = "https://openrouter.ai/api/v1"
+
+
+class MockLLM(LLMConfig):
+    # mock_llm_server.py, for benchmarks without API costs
+    model: str = "mock-llm"
+    api_key: str = "mock"
+    base_url: str = MOCK_LLM_URL
+    prompt_caching: bool = True
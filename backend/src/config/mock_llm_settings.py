@@ -0,0 +1,30 @@
+import os
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+# Local mock LLM server of mock_llm_server.py, used by config.llm_settings.MockLLM
+MOCK_LLM_URL: str = os.environ.get("MOCK_LLM_URL", "http://127.0.0.1:8001/v1")
+
+# Distributions are "fixed:<value>", "uniform:<low>:<high>", "normal:<mean>:<stddev>",
+# "lognormal:<median>:<sigma>" or "exponential:<mean>"
+# Seconds until the first token of a reply
+MOCK_LLM_LATENCY: str = os.environ.get("MOCK_LLM_LATENCY", "lognormal:0.5:0.4")
+# Generated tokens per second after the first token, 0 sends the whole reply at once
+MOCK_LLM_TOKENS_PER_SECOND: float = float(os.environ.get("MOCK_LLM_TOKENS_PER_SECOND", 80))
+# Tokens of a reply
+MOCK_LLM_REPLY_TOKENS: str = os.environ.get("MOCK_LLM_REPLY_TOKENS", "uniform:20:80")
+
+# Fraction of the participant's turns calling Administer-shock
+MOCK_LLM_SHOCK_RATE: float = float(os.environ.get("MOCK_LLM_SHOCK_RATE", 0.3))
+# Fraction of replies refusing, with the refusal RepeatingAgent retries
+MOCK_LLM_REFUSAL_RATE: float = float(os.environ.get("MOCK_LLM_REFUSAL_RATE", 0.02))
+# Fraction of requests rejected with 429, and the Retry-After seconds sent with them
+MOCK_LLM_RATE_LIMIT_RATE: float = float(os.environ.get("MOCK_LLM_RATE_LIMIT_RATE", 0.01))
+MOCK_LLM_RETRY_AFTER: float = float(os.environ.get("MOCK_LLM_RETRY_AFTER", 1))
+
+# Seed of the random replies, latencies and injected errors, unset for a different run every time.
+# Every request draws from its own generator seeded with its body, so runs repeat at any concurrency
+MOCK_LLM_SEED: int | None = int(os.environ["MOCK_LLM_SEED"]) if os.environ.get("MOCK_LLM_SEED") else None
@@ -0,0 +1,26 @@
+import os
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+from config.mock_llm_settings import MOCK_LLM_URL
+
+
+load_dotenv()
+
+
+# Request and token budgets per minute, looked up by "<provider>/<model>", then by provider,
+# see utils.rate_limiter.provider_key. The budgets are per process: with the process sweep engine
+# every worker process has its own budget, the async engine shares one budget across all conversations.
+RATE_LIMITS: dict[str, dict[str, int]] = {
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 200_000},
+    "anthropic": {"requests_per_minute": 50, "tokens_per_minute": 40_000},
+    "google": {"requests_per_minute": 150, "tokens_per_minute": 1_000_000},
+    "google/gemini-2.5-pro": {"requests_per_minute": 50, "tokens_per_minute": 1_000_000},
+    "openai:openrouter.ai": {"requests_per_minute": 60, "tokens_per_minute": 200_000},
+    # mock_llm_server.py, only limited by the rate limit errors it injects
+    f"openai:{urlparse(MOCK_LLM_URL).netloc}": {"requests_per_minute": 1_000_000, "tokens_per_minute": 1_000_000_000},
+}
+DEFAULT_RATE_LIMIT: dict[str, int] = {"requests_per_minute": 60, "tokens_per_minute": 100_000}
+
+# Retries of a call rejected with a rate limit error, before the error is raised
+RATE_LIMIT_MAX_RETRIES: int = int(os.environ.get("RATE_LIMIT_MAX_RETRIES", 6))
@@ -0,0 +1,80 @@
+import os
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+# Bump when the layout or drawing code changes, so cached frames and ETags expire
+RENDER_VERSION: int = 1
+
+# Seconds between checks of the sprite files for changes, modified sprites are reloaded, 0 disables it
+ASSET_RELOAD_INTERVAL: float = float(os.environ.get("ASSET_RELOAD_INTERVAL", 2.0))
+
+# In-memory tier of the game view render cache
+RENDER_CACHE_MAX_BYTES: int = int(os.environ.get("RENDER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RENDER_CACHE_MAX_ENTRIES: int = int(os.environ.get("RENDER_CACHE_MAX_ENTRIES", 512))
+
+# Optional on-disk tier, frames evicted from memory are spilled there
+RENDER_CACHE_SPILL_DIR: str | None = os.environ.get("RENDER_CACHE_SPILL_DIR") or None
+RENDER_CACHE_SPILL_MAX_BYTES: int = int(
+    os.environ.get("RENDER_CACHE_SPILL_MAX_BYTES", 1024 * 1024 * 1024)
+)
+
+# Browsers may keep a rendered frame for this long, the ETag covers revalidation
+GAME_VIEW_MAX_AGE: int = int(os.environ.get("GAME_VIEW_MAX_AGE", 3600))
+
+# Encoder options per output format for every speed-versus-size profile
+ENCODER_PROFILES: dict[str, dict[str, dict]] = {
+    "fast": {
+        "png": {"compress_level": 1},
+        "webp-lossless": {"lossless": True, "method": 0},
+        "webp": {"quality": 80, "method": 0},
+        "jpeg": {"quality": 85},
+    },
+    "balanced": {
+        "png": {"compress_level": 6},
+        "webp-lossless": {"lossless": True, "method": 4},
+        "webp": {"quality": 85, "method": 4},
+        "jpeg": {"quality": 85, "optimize": True},
+    },
+    "small": {
+        "png": {"compress_level": 9, "optimize": True},
+        "webp-lossless": {"lossless": True, "quality": 100, "method": 6},
+        "webp": {"quality": 75, "method": 6},
+        "jpeg": {"quality": 75, "optimize": True, "progressive": True},
+    },
+}
+ENCODER_PROFILE: str = os.environ.get("ENCODER_PROFILE", "balanced")
+if ENCODER_PROFILE not in ENCODER_PROFILES:
+    raise ValueError(
+        f"Unknown ENCODER_PROFILE: {ENCODER_PROFILE}, expected one of {', '.join(ENCODER_PROFILES)}"
+    )
+
+# Format sent when the client accepts WebP without asking for a specific one
+ACCEPT_WEBP_FORMAT: str = os.environ.get("ACCEPT_WEBP_FORMAT", "webp-lossless")
+
+# Executor running the blocking render and encode work off the event loop, "thread" or "process"
+RENDER_EXECUTOR: str = os.environ.get("RENDER_EXECUTOR", "thread")
+RENDER_WORKERS: int = int(os.environ.get("RENDER_WORKERS", os.cpu_count() or 2))
+# Renders allowed to wait for a free worker before requests are rejected with 503
+RENDER_QUEUE_SIZE: int = int(os.environ.get("RENDER_QUEUE_SIZE", 32))
+RENDER_RETRY_AFTER: int = int(os.environ.get("RENDER_RETRY_AFTER", 1))
+
+# Pre-rendered frames of finished experiments, stored next to the results
+FRAME_STORE_DIR: str = os.environ.get("FRAME_STORE_DIR", "results/frames")
+# "off", "inline" (before start_experiment returns) or "background" (worker pool)
+PRERENDER_MODE: str = os.environ.get("PRERENDER_MODE", "background")
+PRERENDER_WORKERS: int = int(os.environ.get("PRERENDER_WORKERS", 2))
+# Formats pre-rendered for every frame, the first one is what /api/game-view serves by default
+PRERENDER_FORMATS: list[str] = os.environ.get("PRERENDER_FORMATS", "png").split(",")
+
+# Video export of a conversation
+VIDEO_FPS: int = int(os.environ.get("VIDEO_FPS", 10))
+VIDEO_SECONDS_PER_CHAR: float = float(os.environ.get("VIDEO_SECONDS_PER_CHAR", 0.06))
+VIDEO_MIN_FRAME_SECONDS: float = float(os.environ.get("VIDEO_MIN_FRAME_SECONDS", 1.5))
+VIDEO_SHOCK_SECONDS: float = float(os.environ.get("VIDEO_SHOCK_SECONDS", 1.5))
+# Pause after each spoken line
+VIDEO_GAP_SECONDS: float = float(os.environ.get("VIDEO_GAP_SECONDS", 0.3))
+# Messages ahead of the encoder whose speech is generated concurrently
+VIDEO_TTS_LOOKAHEAD: int = int(os.environ.get("VIDEO_TTS_LOOKAHEAD", 4))
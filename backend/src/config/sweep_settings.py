@@ -0,0 +1,25 @@
+import os
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+# Worker processes of a sweep, each runs one conversation at a time
+SWEEP_WORKERS: int = int(os.environ.get("SWEEP_WORKERS", 8))
+
+# Conversations in flight per provider, see utils.rate_limiter.provider_key. Every conversation counts
+# against the provider of each of its models, e.g. an Anthropic participant with GPT-4o
+# learner, professor and orchestrator takes one "anthropic" and one "openai" slot.
+PROVIDER_CONCURRENCY: dict[str, int] = {
+    "openai": int(os.environ.get("OPENAI_CONCURRENCY", 6)),
+    "anthropic": int(os.environ.get("ANTHROPIC_CONCURRENCY", 3)),
+    "google": int(os.environ.get("GOOGLE_CONCURRENCY", 3)),
+    "openai:openrouter.ai": int(os.environ.get("OPENROUTER_CONCURRENCY", 3)),
+}
+DEFAULT_PROVIDER_CONCURRENCY: int = int(os.environ.get("DEFAULT_PROVIDER_CONCURRENCY", 2))
+
+# Async engine (sweep.py --engine async): conversations driven by one event loop
+SWEEP_ASYNC_CONCURRENCY: int = int(os.environ.get("SWEEP_ASYNC_CONCURRENCY", 32))
+# Seconds after which a conversation is cancelled, 0 disables the timeout
+EXPERIMENT_TIMEOUT: float = float(os.environ.get("EXPERIMENT_TIMEOUT", 3600))
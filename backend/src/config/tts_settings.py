@@ -0,0 +1,37 @@
+import os
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+# Speech synthesis: "audio.tts" is the project's provider, "openai" streams from the OpenAI speech endpoint
+# with the OpenAI settings below
+TTS_PROVIDER: str = os.environ.get("TTS_PROVIDER", "audio.tts")
+if TTS_PROVIDER not in ("openai", "audio.tts"):
+    raise ValueError(f"Unknown TTS_PROVIDER: {TTS_PROVIDER}, expected openai or audio.tts")
+
+# OpenAI speech parameters, only used by the openai provider, every role speaks with its own voice
+OPENAI_TTS_MODEL: str = os.environ.get("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
+OPENAI_TTS_SPEED: float = float(os.environ.get("OPENAI_TTS_SPEED", 1.0))
+OPENAI_TTS_VOICES: dict[str, str] = {
+    "Professor": os.environ.get("OPENAI_TTS_VOICE_PROFESSOR", "onyx"),
+    "Participant": os.environ.get("OPENAI_TTS_VOICE_PARTICIPANT", "alloy"),
+    "Learner": os.environ.get("OPENAI_TTS_VOICE_LEARNER", "echo"),
+    "Orchestrator": os.environ.get("OPENAI_TTS_VOICE_ORCHESTRATOR", "fable"),
+}
+OPENAI_TTS_VOICE_SETTINGS: dict[str, dict] = {
+    role: {"model": OPENAI_TTS_MODEL, "voice": voice, "speed": OPENAI_TTS_SPEED, "format": "mp3"}
+    for role, voice in OPENAI_TTS_VOICES.items()
+}
+
+# Disk cache of generated speech, shared by all server workers
+TTS_CACHE_DIR: str = os.environ.get("TTS_CACHE_DIR", "cache/tts")
+TTS_CACHE_MAX_BYTES: int = int(os.environ.get("TTS_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Background generation of speech for messages as soon as they are produced
+TTS_PREFETCH_WORKERS: int = int(os.environ.get("TTS_PREFETCH_WORKERS", 2))
+TTS_PREFETCH_QUEUE_SIZE: int = int(os.environ.get("TTS_PREFETCH_QUEUE_SIZE", 256))
+
+# Browser cache lifetime of sound effects, they are revalidated by ETag afterwards
+SFX_MAX_AGE: int = int(os.environ.get("SFX_MAX_AGE", 7 * 24 * 3600))
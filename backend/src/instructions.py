@@ -121,4 +121,12 @@ However, this flow is just an example. If agents behave differently, adapt your
 Your commentary should be minimal and serve only as a conversational guide for readers following the experiment.
 When providing information what should happen next, take into account only the history of the conversation up to that point.
 Do not return empty or None messages.
-"""
\ No newline at end of file
+"""
+
+HISTORY_SUMMARY_SYSTEM_MESSAGE = """
+You keep the notes of a psychological experiment conversation between a Professor, a Participant, a Learner and an Orchestrator.
+You get the current notes and the messages that followed them. Update the notes with these messages.
+Keep the questions asked and the Learner's answers, whether they were correct, every shock with its voltage,
+the Professor's instructions and any hesitation or refusal of the Participant.
+Write at most 200 words, as plain text without any introduction.
+"""
@@ -0,0 +1,371 @@
+"""
+Local mock of the OpenAI chat completions and Anthropic messages APIs for benchmarks without real API calls,
+see benchmark_experiments.py. It answers with random text, calls Administer-shock when the tool is offered,
+picks the next speaker for autogen's speaker selection, and reports prompt cache hits the way the providers do.
+Latency, reply length, refusals and 429 rate limit errors follow config.mock_llm_settings.
+
+    uv run uvicorn src.mock_llm_server:app --port 8001
+
+Point a model at it with base_url="http://localhost:8001/v1" (OpenAI, e.g. config.llm_settings.MockLLM)
+or base_url="http://localhost:8001" (Anthropic, api_type "anthropic"), any api key is accepted.
+"""
+
+from collections import OrderedDict
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from typing import Callable
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+
+from config.mock_llm_settings import (
+    MOCK_LLM_LATENCY,
+    MOCK_LLM_RATE_LIMIT_RATE,
+    MOCK_LLM_REFUSAL_RATE,
+    MOCK_LLM_REPLY_TOKENS,
+    MOCK_LLM_RETRY_AFTER,
+    MOCK_LLM_SEED,
+    MOCK_LLM_SHOCK_RATE,
+    MOCK_LLM_TOKENS_PER_SECOND,
+)
+
+
+# prompts are cached from 1024 tokens on, OpenAI in steps of 128 tokens
+MIN_CACHED_TOKENS = 1024
+OPENAI_CACHE_INCREMENT = 128
+# blocks Anthropic looks back from a cache breakpoint for an earlier cache entry
+ANTHROPIC_LOOKBACK_BLOCKS = 20
+MAX_CACHE_ENTRIES = 100_000
+
+SHOCK_TOOL = "Administer-shock"
+# the refusal RepeatingAgent compares replies with
+REFUSAL = "Sorry, I can't assist with that."
+WORDS = (
+    "the learner answered question next word pair is correct wrong please continue with experiment "
+    "voltage shock professor ready participant answer blue sky house garden"
+).split()
+# autogen's speaker selection prompt, "... select the next role from ['Professor', 'Learner'] to play ..."
+SPEAKER_SELECTION_PATTERN = re.compile(r"select the next role from `?\[([^\]]*)\]")
+
+
+def estimate_tokens(content: object) -> int:
+    # about four characters per token, like utils.rate_limiter.estimate_tokens
+    return len(str(content)) // 4 + 1
+
+
+DISTRIBUTIONS: dict[str, tuple[int, Callable[..., float]]] = {
+    "fixed": (1, lambda rng, value: value),
+    "uniform": (2, lambda rng, low, high: rng.uniform(low, high)),
+    "normal": (2, lambda rng, mean, stddev: max(0.0, rng.gauss(mean, stddev))),
+    "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+    "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean)),
+}
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parses a distribution like "lognormal:0.5:0.4", see config.mock_llm_settings.
+
+    Returns:
+        Callable: Draws a value with the given random generator
+    """
+    name, *params = spec.split(":")
+    if name not in DISTRIBUTIONS or len(params) != DISTRIBUTIONS[name][0]:
+        raise ValueError(f"Invalid distribution: {spec}")
+    values = [float(param) for param in params]
+    sample = DISTRIBUTIONS[name][1]
+    return lambda rng: sample(rng, *values)
+
+
+class PrefixCache:
+    """
+    Prompt prefixes seen before, each identified by a hash chained over the blocks of the prompt.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, int] = OrderedDict()
+
+    @staticmethod
+    def prefixes(blocks: list) -> list[tuple[str, int]]:
+        """
+        Returns:
+            list: (hash, tokens) of the prompt up to and including each block
+        """
+        prefixes = []
+        digest = hashlib.sha256()
+        tokens = 0
+        for block in blocks:
+            encoded = json.dumps(block, sort_keys=True)
+            digest.update(encoded.encode())
+            tokens += estimate_tokens(encoded)
+            prefixes.append((digest.copy().hexdigest(), tokens))
+        return prefixes
+
+    def __contains__(self, prefix_hash: str) -> bool:
+        if prefix_hash not in self._entries:
+            return False
+        self._entries.move_to_end(prefix_hash)
+        return True
+
+    def add(self, prefix_hash: str, tokens: int) -> None:
+        self._entries[prefix_hash] = tokens
+        self._entries.move_to_end(prefix_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+app = FastAPI()
+latency = parse_distribution(MOCK_LLM_LATENCY)
+reply_tokens = parse_distribution(MOCK_LLM_REPLY_TOKENS)
+openai_cache = PrefixCache()
+anthropic_cache = PrefixCache()
+# requests seen per request body, retries of a request get a generator of their own
+attempts: OrderedDict[str, int] = OrderedDict()
+stats = {
+    "requests": 0,
+    "rate_limited": 0,
+    "refusals": 0,
+    "tool_calls": 0,
+    "prompt_tokens": 0,
+    "cached_tokens": 0,
+    "cache_write_tokens": 0,
+    "completion_tokens": 0,
+    "generation_seconds": 0.0,
+}
+
+
+def request_rng(body: dict) -> random.Random:
+    """
+    Random generator of a request, seeded from MOCK_LLM_SEED, the request body and how often the body
+    was sent before, so the replies do not depend on the order in which concurrent requests arrive.
+    """
+    if MOCK_LLM_SEED is None:
+        return random.Random()
+    body_hash = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+    attempt = attempts.get(body_hash, 0)
+    attempts[body_hash] = attempt + 1
+    attempts.move_to_end(body_hash)
+    while len(attempts) > MAX_CACHE_ENTRIES:
+        attempts.popitem(last=False)
+    return random.Random(f"{MOCK_LLM_SEED}:{body_hash}:{attempt}")
+
+
+def record(prompt_tokens: int, cached_tokens: int, cache_write_tokens: int = 0) -> None:
+    stats["requests"] += 1
+    stats["prompt_tokens"] += prompt_tokens
+    stats["cached_tokens"] += cached_tokens
+    stats["cache_write_tokens"] += cache_write_tokens
+
+
+def rate_limited(rng: random.Random, anthropic: bool = False) -> JSONResponse | None:
+    """
+    Injected 429, in the error format of the OpenAI or the Anthropic API.
+    """
+    if rng.random() >= MOCK_LLM_RATE_LIMIT_RATE:
+        return None
+    stats["rate_limited"] += 1
+    message = "Rate limit reached (mock)"
+    if anthropic:
+        error = {"type": "error", "error": {"type": "rate_limit_error", "message": message}}
+    else:
+        error = {"error": {"message": message, "type": "requests", "code": "rate_limit_exceeded"}}
+    return JSONResponse(error, status_code=429, headers={"retry-after": str(MOCK_LLM_RETRY_AFTER)})
+
+
+def choose_reply(rng: random.Random, texts: list[str], tool_names: set[str], after_tool_result: bool) -> dict:
+    """
+    Returns:
+        dict: {"tool_call": arguments} for a shock, else {"text": text}
+    """
+    for text in reversed(texts[-2:]):
+        selection = SPEAKER_SELECTION_PATTERN.search(text)
+        if selection:
+            names = re.findall(r"'([^']+)'", selection.group(1)) or selection.group(1).split(", ")
+            return {"text": rng.choice(names)}
+    if SHOCK_TOOL in tool_names and not after_tool_result and rng.random() < MOCK_LLM_SHOCK_RATE:
+        stats["tool_calls"] += 1
+        return {"tool_call": {"learner_answered_incorrectly": True, "learner_was_asked_question": True}}
+    if rng.random() < MOCK_LLM_REFUSAL_RATE:
+        stats["refusals"] += 1
+        return {"text": REFUSAL}
+    words = [rng.choice(WORDS) for _ in range(max(1, round(reply_tokens(rng))))]
+    return {"text": " ".join(words).capitalize() + "."}
+
+
+async def generate(rng: random.Random, completion_tokens: int) -> None:
+    # time to the first token, then the remaining tokens at the token rate
+    seconds = latency(rng)
+    if MOCK_LLM_TOKENS_PER_SECOND > 0:
+        seconds += completion_tokens / MOCK_LLM_TOKENS_PER_SECOND
+    stats["completion_tokens"] += completion_tokens
+    stats["generation_seconds"] += seconds
+    await asyncio.sleep(seconds)
+
+
+def message_texts(messages: list[dict]) -> list[str]:
+    texts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(str(block.get("text", "")) for block in content if isinstance(block, dict))
+        texts.append(str(content or ""))
+    return texts
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """
+    OpenAI automatic caching: the longest prefix of an earlier prompt is read from the cache,
+    in steps of 128 tokens once it reaches 1024 tokens.
+    """
+    body = await request.json()
+    rng = request_rng(body)
+    rejected = rate_limited(rng)
+    if rejected is not None:
+        return rejected
+
+    # the tools are rendered ahead of the messages
+    prefixes = PrefixCache.prefixes([body.get("tools", []), *body["messages"]])
+    prompt_tokens = prefixes[-1][1]
+
+    cached = next((tokens for prefix_hash, tokens in reversed(prefixes) if prefix_hash in openai_cache), 0)
+    if cached < MIN_CACHED_TOKENS:
+        cached = 0
+    else:
+        cached -= (cached - MIN_CACHED_TOKENS) % OPENAI_CACHE_INCREMENT
+    for prefix_hash, tokens in prefixes:
+        openai_cache.add(prefix_hash, tokens)
+    record(prompt_tokens, cached)
+
+    reply = choose_reply(
+        rng,
+        message_texts(body["messages"]),
+        {tool.get("function", {}).get("name") for tool in body.get("tools", [])},
+        body["messages"][-1].get("role") == "tool",
+    )
+    if "tool_call" in reply:
+        arguments = json.dumps(reply["tool_call"])
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_{rng.getrandbits(96):024x}",
+                    "type": "function",
+                    "function": {"name": SHOCK_TOOL, "arguments": arguments},
+                }
+            ],
+        }
+        finish_reason = "tool_calls"
+        completion_tokens = estimate_tokens(arguments)
+    else:
+        message = {"role": "assistant", "content": reply["text"]}
+        finish_reason = "stop"
+        completion_tokens = estimate_tokens(reply["text"])
+    await generate(rng, completion_tokens)
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        },
+    }
+
+
+def anthropic_blocks(body: dict) -> list[dict]:
+    # cache prefix order of Anthropic: tools, system, messages
+    system = body.get("system") or []
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}]
+    blocks = [*body.get("tools", []), *system]
+    for message in body["messages"]:
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        blocks += [{**block, "role": message["role"]} for block in content]
+    return blocks
+
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    """
+    Anthropic caching: only prefixes ending at a cache_control breakpoint are written, a breakpoint reads the
+    longest cached prefix within the 20 blocks before it.
+    """
+    body = await request.json()
+    rng = request_rng(body)
+    rejected = rate_limited(rng, anthropic=True)
+    if rejected is not None:
+        return rejected
+
+    blocks = anthropic_blocks(body)
+    # the breakpoint marker itself is not part of the cached content
+    prefixes = PrefixCache.prefixes([{k: v for k, v in block.items() if k != "cache_control"} for block in blocks])
+    prompt_tokens = prefixes[-1][1]
+    breakpoints = [i for i, block in enumerate(blocks) if "cache_control" in block]
+
+    cache_read = 0
+    for i in breakpoints:
+        for prefix_hash, tokens in reversed(prefixes[max(0, i - ANTHROPIC_LOOKBACK_BLOCKS) : i + 1]):
+            if prefix_hash in anthropic_cache:
+                cache_read = max(cache_read, tokens)
+                break
+    cache_write = 0
+    for i in breakpoints:
+        prefix_hash, tokens = prefixes[i]
+        if tokens >= MIN_CACHED_TOKENS:
+            cache_write = max(cache_write, tokens - cache_read)
+            anthropic_cache.add(prefix_hash, tokens)
+    record(prompt_tokens, cache_read, cache_write)
+
+    reply = choose_reply(
+        rng,
+        message_texts(body["messages"]),
+        {tool.get("name") for tool in body.get("tools", [])},
+        blocks[-1].get("type") == "tool_result",
+    )
+    if "tool_call" in reply:
+        content = [
+            {"type": "tool_use", "id": f"toolu_{rng.getrandbits(96):024x}", "name": SHOCK_TOOL, "input": reply["tool_call"]}
+        ]
+        stop_reason = "tool_use"
+        output_tokens = estimate_tokens(reply["tool_call"])
+    else:
+        content = [{"type": "text", "text": reply["text"]}]
+        stop_reason = "end_turn"
+        output_tokens = estimate_tokens(reply["text"])
+    await generate(rng, output_tokens)
+
+    return {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": body["model"],
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": prompt_tokens - cache_read - cache_write,
+            "output_tokens": output_tokens,
+            "cache_creation_input_tokens": cache_write,
+            "cache_read_input_tokens": cache_read,
+        },
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "cached_fraction": stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0}
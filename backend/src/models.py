@@ -1,13 +1,33 @@
 from enum import Enum
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import List, Dict, Literal, Optional
 import uuid
 import datetime
+import random
 
 
 class LLMConfig(BaseModel):
     model: str
     api_key: str
+    prompt_caching: bool = Field(
+        default=False,
+        description="Use the provider's prompt caching for the conversation history resent every turn."
+    )
+
+    def autogen_config(self, prompt_cache_key: Optional[str] = None) -> dict:
+        """
+        llm_config of an autogen agent using this model. With prompt_caching, Anthropic models use the client
+        marking cache breakpoints (chat.prompt_caching) and OpenAI requests carry the prompt_cache_key,
+        so the calls of one agent are routed to the cache holding their prefix.
+        """
+        config = self.model_dump(exclude={"prompt_caching"})
+        if self.prompt_caching:
+            api_type = config.get("api_type", "openai")
+            if api_type == "anthropic":
+                config["model_client_cls"] = "PromptCachingAnthropicClient"
+            elif api_type == "openai" and prompt_cache_key:
+                config["extra_body"] = {"prompt_cache_key": prompt_cache_key}
+        return config
 
 
 class Roles(Enum):
@@ -17,6 +37,30 @@ class Roles(Enum):
     ORCHESTRATOR = "Orchestrator"
 
 
+class HistoryPolicy(BaseModel):
+    kind: Literal["full", "last_n", "token_budget", "summary"] = Field(
+        default="full",
+        description="History sent with every LLM call of the agent: all of it, the last messages, the last messages "
+        "within a token budget, or the last messages with a rolling summary of the older ones."
+    )
+    max_messages: int = Field(
+        default=40,
+        gt=0,
+        description="Messages kept by last_n and summary."
+    )
+    max_tokens: int = Field(
+        default=8000,
+        gt=0,
+        description="Estimated tokens of the messages kept by token_budget."
+    )
+    trim_step: int = Field(
+        default=10,
+        gt=0,
+        description="Older messages are dropped this many at a time, between two drops the history sent keeps "
+        "the same prefix for provider prompt caching."
+    )
+
+
 class ConversationConfig(BaseModel):
     max_rounds: int = Field(
         default=400,
@@ -30,6 +74,18 @@ class ConversationConfig(BaseModel):
         description="LLM used by the professor agent.")
     orchestrator_model: LLMConfig = Field(
         description="LLM used by the orchestrator agent.")
+    manager_model: Optional[LLMConfig] = Field(
+        default=None,
+        description="LLM used for the group chat's speaker selection, GPT-4o when not set.")
+    history_policies: Dict[str, HistoryPolicy] = Field(
+        default_factory=dict,
+        description="History policy per agent role, agents without one get the full history."
+    )
+    seed: int = Field(
+        default_factory=lambda: random.getrandbits(32),
+        description="Identifies the run in the LLM response store, a run with the same config and seed "
+        "replays the recorded responses, a new seed records a new conversation."
+    )
 
 
 
@@ -56,4 +112,37 @@ class ConversationDataModel(BaseModel):
         )
     final_voltage: int = Field(
         description="Final voltage of the experiment."
-    )
\ No newline at end of file
+    )
+    llm_calls: List[Dict] = Field(
+        default_factory=list,
+        description="Token usage of every LLM call of the conversation, with the prompt tokens read from the provider's cache."
+    )
+
+
+class BatchRenderRequest(BaseModel):
+    messages: Optional[List[Dict]] = Field(
+        default=None,
+        description="Conversation messages with speaker and text, as stored in the results."
+    )
+    results_id: Optional[str] = Field(
+        default=None,
+        description="Id of a stored experiment whose messages are rendered."
+    )
+    container: Literal["multipart", "zip"] = Field(
+        default="multipart",
+        description="How the rendered frames are sent back."
+    )
+    sprite_sheet: bool = Field(
+        default=False,
+        description="Pack all frames into a single sprite sheet with an index."
+    )
+    format: Optional[str] = Field(
+        default=None,
+        description="Image format of the frames, negotiated from Accept when not set."
+    )
+    scale: float = Field(
+        default=1.0,
+        gt=0,
+        le=1,
+        description="Downscale factor of the frames."
+    )
@@ -0,0 +1,179 @@
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import argparse
+import logging
+import multiprocessing
+import os
+
+from config.render_settings import (
+    ENCODER_PROFILE,
+    FRAME_STORE_DIR,
+    PRERENDER_FORMATS,
+    PRERENDER_MODE,
+    PRERENDER_WORKERS,
+    RENDER_VERSION,
+)
+from renderer import frame_args_for_message, game_view_key, render_frame
+from utils.chat_utils import load_experiment_result
+from utils.frame_store import FrameStore
+
+
+app_logger = logging.getLogger("prerender")
+app_logger.setLevel(logging.INFO)
+
+frame_store = FrameStore(FRAME_STORE_DIR)
+
+SHOCK_FRAME = frame_args_for_message({"speaker": "SHOCKING_DEVICE"})
+
+_background_pool: ThreadPoolExecutor | None = None
+
+
+def prerender_experiment(
+    experiment_id: str,
+    formats: list[str] = PRERENDER_FORMATS,
+    results_dir: str = "results",
+    store: FrameStore = frame_store,
+) -> dict:
+    """
+    Renders every message frame and the shock frame of a stored experiment into the frame store
+    and writes the experiment's manifest. Frames already in the store are not rendered again.
+
+    Returns:
+        dict: The manifest with the frame keys of every message
+    """
+    result = load_experiment_result(experiment_id, results_dir)
+    messages = result["messages"]
+
+    rendered = 0
+    manifest_frames = []
+    for message in messages:
+        keys, new_frames = _store_frame(frame_args_for_message(message), formats, store)
+        rendered += new_frames
+        manifest_frames.append({"speaker": message.get("speaker"), "keys": keys})
+    shock_keys, new_frames = _store_frame(SHOCK_FRAME, formats, store)
+    rendered += new_frames
+
+    manifest = {
+        "experiment_id": experiment_id,
+        "render_version": RENDER_VERSION,
+        "profile": ENCODER_PROFILE,
+        "formats": formats,
+        "frames": manifest_frames,
+        "shock": {"keys": shock_keys},
+    }
+    store.put_manifest(experiment_id, manifest)
+    app_logger.info(
+        f"Pre-rendered experiment {experiment_id}: {len(messages)} messages, {rendered} new frames"
+    )
+    return manifest
+
+
+def _store_frame(frame: dict, formats: list[str], store: FrameStore) -> tuple[dict, int]:
+    keys = {}
+    rendered = 0
+    for output_format in formats:
+        key = game_view_key(frame, output_format)
+        if not store.has_frame(key, output_format):
+            store.put_frame(
+                key,
+                output_format,
+                render_frame(
+                    frame["participant_message"],
+                    frame["professor_message"],
+                    frame["learner_message"],
+                    frame["display_shock"],
+                    output_format=output_format,
+                ),
+            )
+            rendered += 1
+        keys[output_format] = key
+    return keys, rendered
+
+
+def schedule_prerender(experiment_id: str, mode: str = PRERENDER_MODE) -> Future | None:
+    """
+    Post-processing stage of a finished experiment, renders its frames inline
+    or in the background worker pool depending on the mode. Worker processes always
+    render inline. The background pool is drained when the interpreter exits.
+    """
+    global _background_pool
+
+    if mode == "off":
+        return None
+    if mode == "inline":
+        prerender_experiment(experiment_id)
+        return None
+    if mode != "background":
+        raise ValueError(f"Unknown pre-render mode: {mode}")
+    if multiprocessing.parent_process() is not None:
+        # a worker process, e.g. of run_sweep, exits without waiting for its threads
+        # and the frames would be lost, so it renders before returning the experiment
+        prerender_experiment(experiment_id)
+        return None
+
+    if _background_pool is None:
+        _background_pool = ThreadPoolExecutor(
+            max_workers=PRERENDER_WORKERS, thread_name_prefix="prerender"
+        )
+    future = _background_pool.submit(prerender_experiment, experiment_id)
+    future.add_done_callback(lambda f: _log_failure(experiment_id, f))
+    return future
+
+
+def _log_failure(experiment_id: str, future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        app_logger.error(f"Pre-rendering experiment {experiment_id} failed: {future.exception()}")
+
+
+def list_experiment_ids(results_dir: str = "results") -> list[str]:
+    if not os.path.exists(results_dir):
+        return []
+    return sorted(
+        filename.removeprefix("experiment_").removesuffix(".json")
+        for filename in os.listdir(results_dir)
+        if filename.startswith("experiment_") and filename.endswith(".json")
+    )
+
+
+def backfill(
+    experiment_ids: list[str], workers: int, force: bool = False, results_dir: str = "results"
+) -> None:
+    """
+    Pre-renders the given experiments, skipping those that already have a manifest unless forced.
+    """
+    if not force:
+        experiment_ids = [
+            experiment_id
+            for experiment_id in experiment_ids
+            if not frame_store.has_manifest(experiment_id)
+        ]
+    app_logger.info(f"Pre-rendering {len(experiment_ids)} experiments with {workers} workers")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(prerender_experiment, experiment_id, PRERENDER_FORMATS, results_dir): experiment_id
+            for experiment_id in experiment_ids
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            try:
+                future.result()
+                app_logger.info(f"[{i}/{len(futures)}] {futures[future]} done")
+            except Exception as e:
+                app_logger.error(f"[{i}/{len(futures)}] {futures[future]} failed: {e}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Pre-render the frames of stored experiments.")
+    parser.add_argument("experiment_ids", nargs="*", help="Experiments to render, all when omitted")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument("--workers", type=int, default=PRERENDER_WORKERS)
+    parser.add_argument("--force", action="store_true", help="Render experiments that already have a manifest")
+    args = parser.parse_args()
+
+    backfill(
+        args.experiment_ids or list_experiment_ids(args.results_dir),
+        workers=args.workers,
+        force=args.force,
+        results_dir=args.results_dir,
+    )
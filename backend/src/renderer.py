@@ -0,0 +1,471 @@
+import io
+import hashlib
+import json
+import math
+import struct
+from collections import OrderedDict
+from threading import Lock
+from typing import Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.asset_cache import AssetRegistry, game_assets
+from utils.drawing_utils import CloudLayout, fit_cloud, layout_cloud, load_font
+from utils.image_encoding import encode_frame
+from utils.render_cache import frame_key
+from config.render_settings import ENCODER_PROFILES, ENCODER_PROFILE, RENDER_VERSION
+
+
+# Positions of the static sprites and of the speech bubble anchors in the scene
+SCENE_LAYOUT: dict[str, Tuple[int, int]] = {
+    "professor": (630, 660),
+    "student": (360, 660),
+    "learner": (673, 275),
+    "student_cloud": (450, 670),
+    "professor_cloud": (650, 670),
+    "learner_cloud": (673, 275),
+    "shock": (673, 300),
+}
+
+FONT_PATH = "/usr/share/fonts/truetype/liberation/LiberationMono-Regular.ttf"
+FONT_SIZE = 16
+
+# Sprites that never change between frames and are baked into the base scene
+BASE_SPRITES = ("professor", "student", "learner")
+
+
+class BubbleCache:
+    """
+    LRU of laid-out speech bubbles keyed by font, message text and orientation.
+    A repeated message skips the font measurement and the cloud stretching.
+    """
+
+    def __init__(self, font_path: str, font_size: int, max_entries: int = 256):
+        self.font_path = font_path
+        self.font_size = font_size
+        self.max_entries = max_entries
+        self._bubbles: OrderedDict[tuple, tuple[Image.Image, CloudLayout]] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def font(self) -> ImageFont.FreeTypeFont:
+        return load_font(self.font_path, self.font_size)
+
+    def get(
+        self, message: str, flip: bool, assets: AssetRegistry
+    ) -> tuple[Image.Image, CloudLayout]:
+        """
+        Returns the stretched cloud and the text layout for the message.
+        The returned cloud is shared and must not be drawn on.
+        """
+        key = (self.font_path, self.font_size, message, flip, assets.fingerprint())
+        with self._lock:
+            bubble = self._bubbles.get(key)
+            if bubble is not None:
+                self._bubbles.move_to_end(key)
+                self.hits += 1
+                return bubble
+
+        cloud = assets.get("cloud_flipped" if flip else "cloud")
+        layout = layout_cloud(message, self.font, cloud.size)
+        bubble = (fit_cloud(cloud, layout), layout)
+
+        with self._lock:
+            self.misses += 1
+            self._bubbles[key] = bubble
+            while len(self._bubbles) > self.max_entries:
+                self._bubbles.popitem(last=False)
+        return bubble
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bubbles.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._bubbles), "hits": self.hits, "misses": self.misses}
+
+
+bubble_cache = BubbleCache(FONT_PATH, FONT_SIZE)
+
+
+def draw_message_on_cloud(
+    composite_image: Image.Image,
+    message: str,
+    tail_anchor: Tuple[int, int],
+    flip=False,
+    assets: AssetRegistry = game_assets,
+    bubbles: BubbleCache = bubble_cache,
+    layered: bool = False,
+) -> None:
+    """
+    Draws the message on the cloud with proper text wrapping.
+    With layered the cloud is alpha composited, for drawing on a transparent overlay.
+    """
+    # Get the adjusted cloud and the wrapped text lines
+    cloud, layout = bubbles.get(message, flip, assets)
+
+    # Position the cloud with bottom-left anchor or right-bottom anchor if flipped
+    if flip:
+        cloud_position = (
+            tail_anchor[0] - cloud.size[0],
+            tail_anchor[1] - cloud.size[1],
+        )
+    else:
+        cloud_position = (tail_anchor[0], tail_anchor[1] - cloud.size[1])
+
+    if layered:
+        alpha_paste(composite_image, cloud, cloud_position)
+    else:
+        composite_image.paste(cloud, cloud_position, cloud)
+
+    # Add text to the cloud
+    draw = ImageDraw.Draw(composite_image)
+
+    # Get cloud dimensions
+    cloud_width, cloud_height = cloud.size
+
+    # Calculate total text block height
+    total_text_height = len(layout.lines) * layout.line_spacing
+
+    CLOUD_OFFSET = -11  # because of the tail of the cloud
+
+    start_y = cloud_position[1] + (cloud_height - total_text_height) // 2 + CLOUD_OFFSET
+
+    for i, (line, text_width) in enumerate(zip(layout.lines, layout.line_widths)):
+        text_x = cloud_position[0] + (cloud_width - text_width) // 2
+        text_y = start_y + (i * layout.line_spacing)
+        draw.text((text_x, text_y), line, font=bubbles.font, fill="black")
+
+    return None
+
+
+def alpha_paste(canvas: Image.Image, image: Image.Image, position: Tuple[int, int]) -> None:
+    """
+    Alpha composites the image onto the canvas, clipping parts outside of the canvas.
+    Unlike a masked paste this keeps straight alpha on a transparent canvas.
+    """
+    x, y = position
+    source = (max(0, -x), max(0, -y), min(image.width, canvas.width - x), min(image.height, canvas.height - y))
+    if source[0] >= source[2] or source[1] >= source[3]:
+        return
+    canvas.alpha_composite(image, dest=(max(0, x), max(0, y)), source=source)
+
+
+class GameRenderer:
+    """
+    Renders game frames on top of a pre-composited base scene.
+    The background and the static character sprites are composited once,
+    every frame clones that base and draws only the bubbles and the shock sprite.
+    """
+
+    def __init__(self, assets: AssetRegistry, layout: dict[str, Tuple[int, int]]):
+        self.assets = assets
+        self.layout = layout
+        self._base: Image.Image | None = None
+        self._base_fingerprint: str | None = None
+        self._lock = Lock()
+        self.base_builds = 0
+
+    def fingerprint(self) -> str:
+        """
+        Returns a digest of the assets and the layout the frames are rendered from.
+        """
+        layout = json.dumps(self.layout, sort_keys=True)
+        return hashlib.sha256(
+            f"{self.assets.fingerprint()}:{layout}".encode("utf-8")
+        ).hexdigest()[:16]
+
+    def invalidate_base(self) -> None:
+        """
+        Drops the base scene, it is composited again for the next frame.
+        Call it after changing the layout or replacing assets.
+        """
+        with self._lock:
+            self._base = None
+            self._base_fingerprint = None
+
+    def base_scene(self) -> Image.Image:
+        """
+        Returns the composited static scene, rebuilding it when the assets or layout changed.
+        The returned image is shared and must not be drawn on.
+        """
+        fingerprint = self.fingerprint()
+        with self._lock:
+            if self._base is None or self._base_fingerprint != fingerprint:
+                self._base = self._build_base()
+                self._base_fingerprint = fingerprint
+                self.base_builds += 1
+            return self._base
+
+    def compose_frame(
+        self,
+        student_message: str | None = None,
+        professor_message: str | None = None,
+        learner_message: str | None = None,
+        display_shock: bool = False,
+    ) -> Image.Image:
+        """
+        Returns a new frame with the speech bubbles and the shock drawn over the base scene.
+        """
+        composite_image = self.base_scene().copy()
+        self._draw_overlays(
+            composite_image, student_message, professor_message, learner_message, display_shock
+        )
+        return composite_image
+
+    def compose_overlay(
+        self,
+        student_message: str | None = None,
+        professor_message: str | None = None,
+        learner_message: str | None = None,
+        display_shock: bool = False,
+    ) -> tuple[Image.Image, Tuple[int, int]]:
+        """
+        Returns only the speech bubbles and the shock on a transparent layer,
+        cropped to their bounding box, and the offset of the layer in the scene.
+        """
+        base = self.base_scene()
+        overlay = Image.new("RGBA", base.size, (0, 0, 0, 0))
+        self._draw_overlays(
+            overlay, student_message, professor_message, learner_message, display_shock,
+            layered=True,
+        )
+        bbox = overlay.getchannel("A").getbbox()
+        if bbox is None:
+            return Image.new("RGBA", (1, 1), (0, 0, 0, 0)), (0, 0)
+        return overlay.crop(bbox), (bbox[0], bbox[1])
+
+    def _draw_overlays(
+        self,
+        canvas: Image.Image,
+        student_message: str | None,
+        professor_message: str | None,
+        learner_message: str | None,
+        display_shock: bool,
+        layered: bool = False,
+    ) -> None:
+        if student_message:
+            draw_message_on_cloud(
+                canvas, student_message, self.layout["student_cloud"],
+                assets=self.assets, layered=layered,
+            )
+
+        if professor_message:
+            draw_message_on_cloud(
+                canvas, professor_message, self.layout["professor_cloud"], True,
+                assets=self.assets, layered=layered,
+            )
+
+        if learner_message:
+            draw_message_on_cloud(
+                canvas, learner_message, self.layout["learner_cloud"], True,
+                assets=self.assets, layered=layered,
+            )
+
+        if display_shock:
+            shock_sprite = self.assets.get("shock")
+            if layered:
+                alpha_paste(canvas, shock_sprite, self.layout["shock"])
+            else:
+                canvas.paste(shock_sprite, self.layout["shock"], shock_sprite)
+
+    def _build_base(self) -> Image.Image:
+        # the registry's sprites are shared, the base is drawn on a copy of the background
+        base = self.assets.get("background").copy()
+        # The third argument is a mask that respects the PNG transparency
+        for name in BASE_SPRITES:
+            sprite = self.assets.get(name)
+            base.paste(sprite, self.layout[name], sprite)
+        return base
+
+
+game_renderer = GameRenderer(game_assets, SCENE_LAYOUT)
+
+
+def warm_up() -> None:
+    """
+    Loads the sprites and composites the base scene, e.g. in a fresh render worker.
+    """
+    game_assets.preload()
+    game_renderer.base_scene()
+
+
+def create_game_image(
+    student_message: str | None = None,
+    professor_message: str | None = None,
+    learner_message: str | None = None,
+    display_shock: bool = False,
+) -> io.BytesIO:
+    """
+    Generates the game image by layering sprites on a background.
+    Optionally adds a message in a cloud with proper text wrapping.
+    """
+    composite_image = game_renderer.compose_frame(
+        student_message, professor_message, learner_message, display_shock
+    )
+
+    # Save the final image to an in-memory buffer
+    img_buffer = io.BytesIO()
+    composite_image.save(img_buffer, format="PNG")
+    img_buffer.seek(0)
+
+    return img_buffer
+
+
+def render_frame(
+    student_message: str | None = None,
+    professor_message: str | None = None,
+    learner_message: str | None = None,
+    display_shock: bool = False,
+    output_format: str = "png",
+    profile: str = ENCODER_PROFILE,
+    scale: float = 1.0,
+) -> bytes:
+    """
+    Renders a game frame and encodes it with the encoder profile for the output format.
+    """
+    composite_image = game_renderer.compose_frame(
+        student_message, professor_message, learner_message, display_shock
+    )
+    return encode_frame(
+        composite_image, output_format, ENCODER_PROFILES[profile][output_format], scale
+    )
+
+
+# Position and size of an overlay in the scene, stored in front of the encoded overlay
+OVERLAY_BOX = struct.Struct(">4i")
+
+
+def render_overlay(
+    student_message: str | None = None,
+    professor_message: str | None = None,
+    learner_message: str | None = None,
+    display_shock: bool = False,
+    output_format: str = "png",
+    profile: str = ENCODER_PROFILE,
+) -> bytes:
+    """
+    Renders the overlay of a frame and encodes it, prefixed with its box (x, y, width, height).
+    Use unpack_overlay to split the record.
+    """
+    overlay, (x, y) = game_renderer.compose_overlay(
+        student_message, professor_message, learner_message, display_shock
+    )
+    image = encode_frame(overlay, output_format, ENCODER_PROFILES[profile][output_format])
+    return OVERLAY_BOX.pack(x, y, overlay.width, overlay.height) + image
+
+
+def unpack_overlay(record: bytes) -> tuple[Tuple[int, int, int, int], memoryview]:
+    """
+    Splits a record from render_overlay into the overlay box and the encoded image.
+    """
+    return OVERLAY_BOX.unpack_from(record), memoryview(record)[OVERLAY_BOX.size:]
+
+
+def render_base_scene(output_format: str = "png", profile: str = ENCODER_PROFILE) -> bytes:
+    """
+    Encodes the static base scene the overlays are placed on.
+    """
+    return encode_frame(
+        game_renderer.base_scene(), output_format, ENCODER_PROFILES[profile][output_format]
+    )
+
+
+def game_view_key(
+    frame: dict,
+    output_format: str = "png",
+    scale: float = 1.0,
+    profile: str = ENCODER_PROFILE,
+    layer: str = "frame",
+) -> str:
+    """
+    Content address of an encoded game view frame, identical inputs always produce the same image.
+    Layers other than the full frame ("overlay", "base") get their own addresses.
+    """
+    extra = {} if layer == "frame" else {"layer": layer}
+    return frame_key(
+        version=RENDER_VERSION,
+        scene=game_renderer.fingerprint(),
+        **frame,
+        output_format=output_format,
+        profile=profile,
+        scale=scale,
+        **extra,
+    )
+
+
+def frame_args_for_message(message: dict) -> dict:
+    """
+    Maps a conversation message ({"speaker": ..., "text": ...}) to the game view parameters,
+    the same way the frontend sync queue does.
+    """
+    speaker = message.get("speaker")
+    text = message.get("text")
+    return {
+        "participant_message": text if speaker == "Participant" else None,
+        "professor_message": text if speaker == "Professor" else None,
+        "learner_message": text if speaker == "Learner" else None,
+        "display_shock": speaker == "SHOCKING_DEVICE",
+    }
+
+
+# Lossless format the frames of a sprite sheet are rendered and cached in,
+# the same frames /api/game-view serves and the frame store pre-renders by default
+SPRITE_SHEET_CELL_FORMAT = "png"
+
+
+def plan_sprite_sheet(
+    frames: list[dict], scale: float = 1.0, max_pixels: int = 64_000_000
+) -> tuple[list[dict], dict]:
+    """
+    Lays the given frames (game view parameters) out on a grid, identical frames share a cell.
+    Returns the frames of the cells, in cell order, and the index with the cell size and the
+    cell of every frame. The cells are rendered separately and packed by assemble_sprite_sheet.
+    """
+    base = game_renderer.base_scene()
+    cell_width = max(1, int(base.width * scale))
+    cell_height = max(1, int(base.height * scale))
+
+    cells: dict[str, int] = {}
+    frame_cells = []
+    for frame in frames:
+        cell_key = json.dumps(frame, sort_keys=True)
+        frame_cells.append(cells.setdefault(cell_key, len(cells)))
+
+    columns = max(1, math.ceil(math.sqrt(len(cells))))
+    rows = max(1, math.ceil(len(cells) / columns))
+    if columns * cell_width * rows * cell_height > max_pixels:
+        raise ValueError("Sprite sheet is too large, use a smaller scale")
+
+    index = {
+        "cell_width": cell_width,
+        "cell_height": cell_height,
+        "columns": columns,
+        "rows": rows,
+        "frames": [
+            {"x": (cell % columns) * cell_width, "y": (cell // columns) * cell_height}
+            for cell in frame_cells
+        ],
+    }
+    return [json.loads(cell_key) for cell_key in cells], index
+
+
+def assemble_sprite_sheet(
+    cell_images: list[bytes],
+    index: dict,
+    output_format: str = "png",
+    profile: str = ENCODER_PROFILE,
+) -> bytes:
+    """
+    Packs the encoded cell frames, in cell order, into the grid of a plan_sprite_sheet index
+    and encodes the sheet.
+    """
+    columns = index["columns"]
+    cell_width, cell_height = index["cell_width"], index["cell_height"]
+    sheet = Image.new("RGBA", (columns * cell_width, index["rows"] * cell_height), (0, 0, 0, 0))
+    for cell, data in enumerate(cell_images):
+        with Image.open(io.BytesIO(data)) as image:
+            sheet.paste(image, ((cell % columns) * cell_width, (cell // columns) * cell_height))
+    return encode_frame(sheet, output_format, ENCODER_PROFILES[profile][output_format])
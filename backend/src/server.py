@@ -2,8 +2,8 @@ import io
 from io import BytesIO
 
 from PIL import Image, ImageDraw, ImageFont
-from fastapi import FastAPI, Query
-from fastapi.responses import StreamingResponse, Response
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import StreamingResponse, Response, FileResponse
 from fastapi import FastAPI, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -13,14 +13,56 @@ from typing import Tuple, List, Dict, Union
 import json
 import asyncio
 import base64
-from utils.chat_utils import load_conversation_dictionary
-from utils.drawing_utils import resize_sprite, adjust_cloud
-from utils.audio_utils import load_mp3
+import re
+from utils.chat_utils import load_conversation_dictionary, load_experiment_result
+from utils.asset_cache import game_assets
+from renderer import (
+    game_renderer,
+    game_view_key,
+    bubble_cache,
+    create_game_image,
+    render_frame,
+    render_overlay,
+    render_base_scene,
+    unpack_overlay,
+    plan_sprite_sheet,
+    assemble_sprite_sheet,
+    SPRITE_SHEET_CELL_FORMAT,
+    frame_args_for_message,
+    warm_up,
+)
+from prerender import frame_store
+from video_export import CONTAINERS, MEDIA_TYPES as VIDEO_MEDIA_TYPES, VideoExportError, stream_video
+from utils.batch_render import build_zip, multipart_boundary, multipart_stream, json_part
+from utils.render_executor import RenderExecutor, RenderQueueFull
+from utils.image_encoding import negotiate_format, media_type
+from utils.render_cache import RenderCache, etag_matches
+from config.render_settings import (
+    RENDER_CACHE_MAX_BYTES,
+    RENDER_CACHE_MAX_ENTRIES,
+    RENDER_CACHE_SPILL_DIR,
+    RENDER_CACHE_SPILL_MAX_BYTES,
+    GAME_VIEW_MAX_AGE,
+    ENCODER_PROFILE,
+    ACCEPT_WEBP_FORMAT,
+    RENDER_EXECUTOR,
+    RENDER_WORKERS,
+    RENDER_QUEUE_SIZE,
+    RENDER_RETRY_AFTER,
+)
+from utils.static_media import MediaFile, parse_byte_range, sound_effects
+from utils.tts_stream import primed
+from utils.tts_prefetch import tts_cache, tts_flights, tts_prefetcher
+from config.tts_settings import SFX_MAX_AGE
 import tempfile
 import os
-from run_experiment import start_experiment
-from datetime import datetime
+from run_experiment import a_start_experiment
+from config.llm_settings import GPT_4o
+from utils.message_channel import ChannelRegistry, MessageChannel
+from chat.rate_limited_agent import rate_limiter
+from chat.recording_agent import response_store
 import uuid
+from contextlib import asynccontextmanager
 
 # Add TTS imports
 from audio.tts import (
@@ -29,118 +71,39 @@ from audio.tts import (
     playback_worker,
     trigger_next_playback,
 )
-from models import Roles
-
-
-def draw_message_on_cloud(
-    composite_image: Image.Image, message: str, tail_anchor: Tuple[int, int], flip=False
-) -> None:
-    """
-    Draws the message on the cloud with proper text wrapping.
-    """
-    cloud = Image.open("static/cloud.png").convert("RGBA")
-    cloud = resize_sprite(cloud, 0.15)
-    if flip:
-        cloud = cloud.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
-
-    font = ImageFont.truetype(
-        "/usr/share/fonts/truetype/liberation/LiberationMono-Regular.ttf", size=16
-    )
-
-    # Adjust the cloud and get wrapped text lines
-    cloud, text_lines, line_spacing = adjust_cloud(cloud, message, font)
-
-    # Position the cloud with bottom-left anchor or right-bottom anchor if flipped
-    if flip:
-        cloud_position = (
-            tail_anchor[0] - cloud.size[0],
-            tail_anchor[1] - cloud.size[1],
-        )
-    else:
-        cloud_position = (tail_anchor[0], tail_anchor[1] - cloud.size[1])
-
-    composite_image.paste(cloud, cloud_position, cloud)
-
-    # Add text to the cloud
-    draw = ImageDraw.Draw(composite_image)
-
-    # Get cloud dimensions
-    cloud_width, cloud_height = cloud.size
+from models import Roles, BatchRenderRequest, ConversationConfig
 
-    # Calculate total text block height
-    total_text_height = len(text_lines) * line_spacing
 
-    CLOUD_OFFSET = -11  # because of the tail of the cloud
-
-    start_y = cloud_position[1] + (cloud_height - total_text_height) // 2 + CLOUD_OFFSET
-
-    for i, line in enumerate(text_lines):
-        # Calculate bounding box for this specific line
-        text_bbox = draw.textbbox((0, 0), line, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-
-        text_x = cloud_position[0] + (cloud_width - text_width) // 2
-        text_y = start_y + (i * line_spacing)
-        draw.text((text_x, text_y), line, font=font, fill="black")
-
-    return None
-
-
-def create_game_image(
-    student_message: str | None = None,
-    professor_message: str | None = None,
-    learner_message: str | None = None,
-    display_shock: bool = False,
-) -> io.BytesIO:
-    """
-    Generates the game image by layering sprites on a background.
-    Optionally adds a message in a cloud with proper text wrapping.
-    """
-    background = Image.open("static/background.jpg").convert("RGBA")
-    professor_sprite = Image.open("static/professor_w.png").convert("RGBA")
-    student_sprite = Image.open("static/student.png").convert("RGBA")
-    learner_sprite = Image.open("static/learner.png").convert("RGBA")
-    shock_sprite = Image.open("static/electricity.png").convert("RGBA")
-
-    # make the sprites smaller
-    professor_sprite = resize_sprite(professor_sprite, 0.58)
-    # flip the professor sprite to face the student
-    # professor_sprite = professor_sprite.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
-    student_sprite = resize_sprite(student_sprite, 0.15)
-    learner_sprite = resize_sprite(learner_sprite, 1.1)
-    shock_sprite = resize_sprite(shock_sprite, 0.05)
-
-    # Create a new image canvas to paste everything on
-    composite_image = background.copy()
-
-    # 2. Add sprites to the background
-    # The third argument is a mask that respects the PNG transparency
-    composite_image.paste(professor_sprite, (630, 660), professor_sprite)
-    composite_image.paste(student_sprite, (360, 660), student_sprite)
-    composite_image.paste(learner_sprite, (673, 275), learner_sprite)
-
-    # 3. Add a message in a cloud if a message is provided
-    if student_message:
-        draw_message_on_cloud(composite_image, student_message, (450, 670))
-
-    if professor_message:
-        draw_message_on_cloud(composite_image, professor_message, (650, 670), True)
+render_cache = RenderCache(
+    max_bytes=RENDER_CACHE_MAX_BYTES,
+    max_entries=RENDER_CACHE_MAX_ENTRIES,
+    spill_dir=RENDER_CACHE_SPILL_DIR,
+    spill_max_bytes=RENDER_CACHE_SPILL_MAX_BYTES,
+)
 
-    if learner_message:
-        draw_message_on_cloud(composite_image, learner_message, (673, 275), True)
+experiment_channels = ChannelRegistry()
 
-    if display_shock:
-        composite_image.paste(shock_sprite, (673, 300), shock_sprite)
+render_executor = RenderExecutor(
+    kind=RENDER_EXECUTOR,
+    workers=RENDER_WORKERS,
+    max_queue=RENDER_QUEUE_SIZE,
+    # process workers have their own sprites and base scene
+    initializer=warm_up if RENDER_EXECUTOR == "process" else None,
+)
 
-    # 4. Save the final image to an in-memory buffer
-    img_buffer = io.BytesIO()
-    composite_image.save(img_buffer, format="PNG")
-    img_buffer.seek(0)
 
-    return img_buffer
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # decode and scale all sprites and composite the static scene before the first request comes in
+    warm_up()
+    sound_effects.preload()
+    tts_prefetcher.start()
+    yield
+    await tts_prefetcher.stop()
+    render_executor.shutdown()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -150,29 +113,396 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Content-Range", "X-Overlay-X", "X-Overlay-Y", "X-Overlay-Width", "X-Overlay-Height"],
 )
 
+async def render_in_pool(fn, *args, **kwargs):
+    """
+    Runs blocking rendering in the render pool, answering 503 when its queue is full.
+    """
+    try:
+        return await render_executor.run(fn, *args, **kwargs)
+    except RenderQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Render queue is full",
+            headers={"Retry-After": str(RENDER_RETRY_AFTER)},
+        )
+
+
+async def render_game_view(frame: dict, output_format: str, scale: float) -> bytes:
+    """
+    Returns the encoded frame from the render cache or renders it in the render pool.
+    """
+    key = game_view_key(frame, output_format, scale)
+    image = await render_cache.get(key)
+    if image is not None:
+        return image
+
+    # frames of finished experiments are pre-rendered into the frame store, read off the event loop
+    image = await asyncio.get_running_loop().run_in_executor(
+        None, frame_store.read_frame, key, output_format
+    )
+    if image is not None:
+        await render_cache.put(key, image)
+        return image
+
+    # rendering blocks, so it runs in the render pool instead of the event loop
+    image = await render_in_pool(
+        render_frame,
+        frame["participant_message"],
+        frame["professor_message"],
+        frame["learner_message"],
+        frame["display_shock"],
+        output_format=output_format,
+        profile=ENCODER_PROFILE,
+        scale=scale,
+    )
+    await render_cache.put(key, image)
+    return image
+
+
 @app.get("/api/game-view")
 async def get_game_view(
+    request: Request,
     participant_message: str | None = Query(default=None, max_length=1000),
     professor_message: str | None = Query(default=None, max_length=1000),
     learner_message: str | None = Query(default=None, max_length=1000),
     display_shock: bool = False,
+    format: str | None = Query(default=None, description="png, webp, webp-lossless or jpeg"),
+    scale: float = Query(default=1.0, gt=0, le=1, description="Downscale factor for thumbnails"),
 ):
     """
     Endpoint to get the current game view with messages from both characters.
     - Student message: /game-view?student_message=Hello professor!
     - Professor message: /game-view?professor_message=Hello student!
     - Both: /game-view?student_message=Hello!&professor_message=Hi there!
+    The image format is negotiated from the format parameter or the Accept header.
+    """
+    try:
+        output_format = negotiate_format(request.headers.get("accept"), format, ACCEPT_WEBP_FORMAT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    frame = {
+        "participant_message": participant_message,
+        "professor_message": professor_message,
+        "learner_message": learner_message,
+        "display_shock": display_shock,
+    }
+    key = game_view_key(frame, output_format, scale)
+    headers = {
+        "ETag": f'"{key}"',
+        "Cache-Control": f"public, max-age={GAME_VIEW_MAX_AGE}",
+        "Vary": "Accept",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    # pre-rendered frames are sent straight from disk
+    stored_path = await asyncio.to_thread(frame_store.find_frame, key, output_format)
+    if stored_path is not None:
+        return FileResponse(stored_path, media_type=media_type(output_format), headers=headers)
+
+    image = await render_game_view(frame, output_format, scale)
+    return Response(content=image, media_type=media_type(output_format), headers=headers)
+
+
+@app.get("/api/game-view/overlay")
+async def get_game_view_overlay(
+    request: Request,
+    participant_message: str | None = Query(default=None, max_length=1000),
+    professor_message: str | None = Query(default=None, max_length=1000),
+    learner_message: str | None = Query(default=None, max_length=1000),
+    display_shock: bool = False,
+    format: str | None = Query(default=None, description="png, webp or webp-lossless"),
+):
+    """
+    Endpoint returning only the speech bubbles and the shock of a frame on a transparent image,
+    cropped to their bounding box. The X-Overlay-X and X-Overlay-Y headers give its position
+    on the base scene from /api/game-view/base.
+    """
+    try:
+        output_format = negotiate_format(request.headers.get("accept"), format, ACCEPT_WEBP_FORMAT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if output_format == "jpeg":
+        raise HTTPException(status_code=400, detail="Overlays need a format with transparency")
+
+    frame = {
+        "participant_message": participant_message,
+        "professor_message": professor_message,
+        "learner_message": learner_message,
+        "display_shock": display_shock,
+    }
+    key = game_view_key(frame, output_format, layer="overlay")
+
+    record = await render_cache.get(key)
+    if record is None:
+        record = await render_in_pool(
+            render_overlay,
+            participant_message,
+            professor_message,
+            learner_message,
+            display_shock,
+            output_format=output_format,
+            profile=ENCODER_PROFILE,
+        )
+        await render_cache.put(key, record)
+    (x, y, width, height), image = unpack_overlay(record)
+
+    headers = {
+        "ETag": f'"{key}"',
+        "Cache-Control": f"public, max-age={GAME_VIEW_MAX_AGE}",
+        "Vary": "Accept",
+        "X-Overlay-X": str(x),
+        "X-Overlay-Y": str(y),
+        "X-Overlay-Width": str(width),
+        "X-Overlay-Height": str(height),
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=bytes(image), media_type=media_type(output_format), headers=headers)
+
+
+@app.get("/api/game-view/base")
+async def get_game_view_base(request: Request, format: str | None = None):
+    """
+    Endpoint returning the static scene without bubbles, fetched once and combined with overlays.
+    """
+    try:
+        output_format = negotiate_format(request.headers.get("accept"), format, ACCEPT_WEBP_FORMAT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    key = game_view_key({}, output_format, layer="base")
+    headers = {
+        "ETag": f'"{key}"',
+        "Cache-Control": f"public, max-age={GAME_VIEW_MAX_AGE}",
+        "Vary": "Accept",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    image = await render_cache.get(key)
+    if image is None:
+        image = await render_in_pool(render_base_scene, output_format, ENCODER_PROFILE)
+        await render_cache.put(key, image)
+    return Response(content=image, media_type=media_type(output_format), headers=headers)
+
+
+@app.post("/api/game-view/batch")
+async def get_game_view_batch(request: Request, batch: BatchRenderRequest):
     """
-    # Generate the image with specific messages for each character
-    image_buffer = create_game_image(participant_message, professor_message, learner_message, display_shock)
-    return StreamingResponse(image_buffer, media_type="image/png")
+    Endpoint rendering a whole conversation, given as messages or as the id of stored results.
+    Frames are rendered in parallel and sent back as multipart/mixed or as a zip,
+    optionally packed into a single sprite sheet with an index.
+    """
+    if batch.results_id is not None:
+        try:
+            messages = load_experiment_result(batch.results_id)["messages"]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Experiment not found")
+    elif batch.messages is not None:
+        messages = batch.messages
+    else:
+        raise HTTPException(status_code=400, detail="Either messages or results_id is required")
+
+    try:
+        output_format = negotiate_format(request.headers.get("accept"), batch.format, ACCEPT_WEBP_FORMAT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    extension = output_format.split("-")[0]
+    frames = [frame_args_for_message(message) for message in messages]
+
+    # identical frames are rendered once, at most one render per worker is queued by the batch
+    worker_slots = asyncio.Semaphore(render_executor.workers)
+
+    async def render_with_slot(frame: dict, frame_format: str) -> bytes:
+        async with worker_slots:
+            return await render_game_view(frame, frame_format, batch.scale)
+
+    if batch.sprite_sheet:
+        try:
+            cell_frames, index = plan_sprite_sheet(frames, batch.scale)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # the cells are ordinary frames, rendered in parallel through the render cache
+        cell_tasks = [
+            asyncio.create_task(render_with_slot(frame, SPRITE_SHEET_CELL_FORMAT)) for frame in cell_frames
+        ]
+        try:
+            cell_images = await asyncio.gather(*cell_tasks)
+        finally:
+            for task in cell_tasks:
+                task.cancel()
+        sheet = await render_in_pool(assemble_sprite_sheet, cell_images, index, output_format, ENCODER_PROFILE)
+        files = [
+            (f"sprite_sheet.{extension}", media_type(output_format), sheet),
+            ("index.json", "application/json", json_part(index)),
+        ]
+        if batch.container == "zip":
+            return Response(content=build_zip((name, data) for name, _, data in files), media_type="application/zip")
+        boundary = multipart_boundary()
+        return StreamingResponse(
+            multipart_stream([(name, kind, _ready(data)) for name, kind, data in files], boundary),
+            media_type=f"multipart/mixed; boundary={boundary}",
+        )
+
+    tasks: dict[str, asyncio.Task] = {}
+    frame_tasks = []
+    for frame in frames:
+        key = game_view_key(frame, output_format, batch.scale)
+        if key not in tasks:
+            tasks[key] = asyncio.create_task(render_with_slot(frame, output_format))
+        frame_tasks.append(tasks[key])
+    filenames = [f"frame_{i:04d}.{extension}" for i in range(len(frames))]
+
+    if batch.container == "zip":
+        try:
+            images = await asyncio.gather(*frame_tasks)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        return Response(content=build_zip(zip(filenames, images)), media_type="application/zip")
+
+    # the stream cancels the renders not sent yet when the client goes away
+    boundary = multipart_boundary()
+    return StreamingResponse(
+        multipart_stream(
+            [(name, media_type(output_format), task) for name, task in zip(filenames, frame_tasks)],
+            boundary,
+        ),
+        media_type=f"multipart/mixed; boundary={boundary}",
+    )
+
+
+async def _ready(data: bytes) -> bytes:
+    return data
+
+
+@app.get("/api/experiments/{experiment_id}/frames")
+async def get_experiment_frames(experiment_id: str, format: str = "png"):
+    """
+    Endpoint listing the pre-rendered frame URLs of a stored experiment, in message order.
+    """
+    try:
+        manifest = await asyncio.to_thread(frame_store.load_manifest, experiment_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Experiment has no pre-rendered frames")
+    if format not in manifest["formats"]:
+        raise HTTPException(status_code=404, detail=f"Frames were not pre-rendered as {format}")
+
+    return {
+        "experiment_id": experiment_id,
+        "format": format,
+        "frames": [
+            {"speaker": frame["speaker"], "url": f"/api/frames/{frame['keys'][format]}.{format}"}
+            for frame in manifest["frames"]
+        ],
+        "shock": f"/api/frames/{manifest['shock']['keys'][format]}.{format}",
+    }
+
+
+@app.get("/api/experiments/{experiment_id}/video")
+async def get_experiment_video(experiment_id: str, container: str = "mp4", tts: bool = True):
+    """
+    Endpoint streaming a stored experiment encoded as mp4 or webm while ffmpeg produces it.
+    With tts the frames last as long as their speech, which is muxed in as the audio track.
+    """
+    if container not in CONTAINERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported video container: {container}")
+    try:
+        messages = load_experiment_result(experiment_id)["messages"]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Experiment not found")
+
+    # failures before the first chunk are answered with an error, later ones abort the response
+    try:
+        chunks = await primed(stream_video(messages, container, use_tts=tts))
+    except VideoExportError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type=VIDEO_MEDIA_TYPES[container],
+        headers={"Content-Disposition": f"attachment; filename=experiment_{experiment_id}.{container}"},
+    )
+
+
+@app.get("/api/frames/{key}.{output_format}")
+async def get_stored_frame(key: str, output_format: str):
+    """
+    Endpoint serving a pre-rendered frame, frames are content addressed and never change.
+    """
+    if len(key) != 64 or any(char not in "0123456789abcdef" for char in key):
+        raise HTTPException(status_code=404, detail="Frame not found")
+    try:
+        stored_path = await asyncio.to_thread(frame_store.find_frame, key, output_format)
+    except ValueError:
+        stored_path = None
+    if stored_path is None:
+        raise HTTPException(status_code=404, detail="Frame not found")
+    return FileResponse(
+        stored_path,
+        media_type=media_type(output_format),
+        headers={"ETag": f'"{key}"', "Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
+@app.get("/api/stats")
+async def get_stats():
+    """
+    Endpoint exposing the counters of the rendering and TTS caches.
+    """
+    return {
+        "assets": game_assets.stats(),
+        "base_scene_builds": game_renderer.base_builds,
+        "bubbles": bubble_cache.stats(),
+        "render_cache": render_cache.stats(),
+        "render_executor": render_executor.stats(),
+        "tts_cache": tts_cache.stats(),
+        "tts_single_flight": tts_flights.stats(),
+        "tts_prefetch": tts_prefetcher.stats(),
+        "sound_effects": sound_effects.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "llm_response_store": response_store.stats(),
+        "live_experiments": experiment_channels.stats(),
+    }
+
+
+@app.post("/api/renderer/invalidate")
+async def invalidate_renderer():
+    """
+    Endpoint reloading the modified sprites and forcing the base scene and the cached frames
+    to be rebuilt, e.g. after the assets or the scene layout were changed.
+    """
+    reloaded = game_assets.reload()
+    game_renderer.invalidate_base()
+    bubble_cache.clear()
+    await render_cache.clear()
+    return {"status": "invalidated", "reloaded_sprites": reloaded}
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Cache-Control",
+}
+
+
+def message_event(message: dict) -> str:
+    # speech generation starts as the message is sent, the event carries its audio URL
+    return f"data: {json.dumps({'type': 'message', **message, **tts_prefetcher.submit(message)})}\n\n"
 
 
 async def generate_example_sequence(messages):
     for message in messages:
-        yield f"data: {json.dumps({'type': 'message', **message})}\n\n"
+        yield message_event(message)
 
     yield f"data: {json.dumps({'type': 'end'})}\n\n"
 
@@ -184,52 +514,148 @@ async def game_sequence_example():
     return StreamingResponse(
         generate_example_sequence(messages),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control",
-        },
+        headers=SSE_HEADERS,
     )
 
 
+def static_media_response(media: MediaFile, request: Request, headers: dict | None = None) -> Response:
+    """
+    Sends an in-memory media file with ETag revalidation and single byte range support.
+    """
+    headers = {
+        **(headers or {}),
+        "ETag": media.etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={SFX_MAX_AGE}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), media.etag):
+        return Response(status_code=304, headers=headers)
+
+    size = len(media.data)
+    byte_range = None
+    # If-Range: a stale partial copy gets the whole file instead of a mismatching range
+    if request.headers.get("if-range", media.etag) == media.etag:
+        try:
+            byte_range = parse_byte_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        return Response(content=media.data, media_type=media.media_type, headers=headers)
+
+    start, end = byte_range
+    return Response(
+        # a view of the resident bytes, the range is not copied
+        content=memoryview(media.data)[start : end + 1],
+        status_code=206,
+        media_type=media.media_type,
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"},
+    )
+
+
+@app.get("/api/sfx/{name}")
+async def get_sound_effect(name: str, request: Request):
+    """
+    Endpoint serving a sound effect from memory, e.g. /api/sfx/shock
+    """
+    if name not in sound_effects:
+        raise HTTPException(status_code=404, detail=f"Unknown sound effect: {name}")
+    return static_media_response(sound_effects.get(name), request)
+
+
 @app.post("/api/tts")
-async def generate_tts_endpoint(request: dict):
+async def generate_tts_endpoint(request: dict, http_request: Request):
     """Generate TTS audio for a message"""
     role = request.get("role")
     message = request.get("message", "")    
     logger.info(f"Generating TTS for role: {role}, message: {message}")
+    headers = {"Content-Disposition": "attachment; filename=tts.mp3"}
     if role == "SHOCKING_DEVICE":
-        # load data from disk
-        audio_data: BytesIO = load_mp3("./static/electric-shock-cut.mp3")
-    else:   
-        audio_data: BytesIO = await generate_tts(message, Roles(role))
-    return StreamingResponse(
-        BytesIO(audio_data.getvalue()),
-        media_type="audio/mpeg",
-        headers={"Content-Disposition": "attachment; filename=tts.mp3"}
-    )
+        # the shock sound effect is kept in memory
+        return static_media_response(sound_effects.get("shock"), http_request, headers)
+
+    # identical lines are synthesized once, hits are sent straight from the cache file
+    key = tts_prefetcher.key(role, message)
+    cached_path = tts_cache.get(key)
+    if cached_path is not None:
+        return FileResponse(cached_path, media_type="audio/mpeg", headers=headers)
+
+    # concurrent requests for the same line share one generation, its chunks are sent
+    # as the provider produces them while the cache entry is written alongside
+    chunks = tts_prefetcher.stream(key, role, message)
+    return StreamingResponse(await primed(chunks), media_type="audio/mpeg", headers=headers)
+
+
+@app.get("/api/tts/audio/{key}")
+async def get_tts_audio(key: str):
+    """
+    Endpoint serving the speech of a message by the audio URL of its SSE event.
+    Prefetched lines come from the cache, lines still being generated are streamed as they are produced.
+    """
+    if not re.fullmatch(r"[0-9a-f]{64}", key):
+        raise HTTPException(status_code=404, detail="Unknown audio")
+
+    # the key is derived from the role, voice and text, so its audio never changes
+    headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+    cached_path = tts_cache.get(key)
+    if cached_path is not None:
+        return FileResponse(cached_path, media_type="audio/mpeg", headers=headers)
+
+    line = tts_prefetcher.lookup(key)
+    if line is None:
+        raise HTTPException(status_code=404, detail="Unknown audio")
+    chunks = tts_prefetcher.stream(key, *line)
+    return StreamingResponse(await primed(chunks), media_type="audio/mpeg", headers=headers)
 
 
 @app.get("/api/run-experiment")
 async def run_experiment_endpoint():
-    """Run an experiment with the given parameters"""
-    logger.info(f"Running experiment")
-    current_dt = datetime.now()
-    current_uuid = str(uuid.uuid4())[:6]
+    """
+    Starts an experiment in the background and streams its messages as the group chat produces them.
+    The first event carries the channel id, other clients can follow the same run through
+    /api/experiments/live/{channel_id}.
+    """
+    channel_id = str(uuid.uuid4())
+    channel = experiment_channels.open(channel_id)
+    logger.info(f"Running experiment on channel {channel_id}")
+    config = ConversationConfig(
+        participant_model=GPT_4o(),
+        learner_model=GPT_4o(),
+        professor_model=GPT_4o(),
+        orchestrator_model=GPT_4o(),
+    )
+    channel.task = asyncio.create_task(run_live_experiment(channel, config))
+    return StreamingResponse(
+        generate_live_sequence(channel, channel_id), media_type="text/event-stream", headers=SSE_HEADERS
+    )
 
-    output_file_path = f"{current_dt.strftime('%Y%m%d%H%M%S')}_{current_uuid}_conversation.json"
 
-    start_experiment(output_file_path)
-    messages = load_conversation_dictionary(output_file_path)
-    
+@app.get("/api/experiments/live/{channel_id}")
+async def follow_experiment(channel_id: str):
+    """
+    Streams the messages of a running or recently finished experiment, from its first message on.
+    """
+    channel = experiment_channels.get(channel_id)
+    if channel is None:
+        raise HTTPException(status_code=404, detail=f"Unknown experiment channel: {channel_id}")
     return StreamingResponse(
-        generate_example_sequence(messages),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control",
-        },
-    )
\ No newline at end of file
+        generate_live_sequence(channel, channel_id), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+async def run_live_experiment(channel: MessageChannel, config: ConversationConfig) -> None:
+    try:
+        experiment_id = await a_start_experiment(config, on_message=channel.publish)
+        channel.close(experiment_id=experiment_id)
+    except Exception as e:
+        logger.exception("Live experiment failed")
+        channel.close(error=str(e))
+
+
+async def generate_live_sequence(channel: MessageChannel, channel_id: str):
+    yield f"data: {json.dumps({'type': 'start', 'channel_id': channel_id})}\n\n"
+    async for message in channel.subscribe():
+        yield message_event(message)
+
+    if channel.error is not None:
+        yield f"data: {json.dumps({'type': 'error', 'detail': channel.error})}\n\n"
+    yield f"data: {json.dumps({'type': 'end', 'experiment_id': channel.experiment_id})}\n\n"
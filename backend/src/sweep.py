@@ -0,0 +1,291 @@
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from itertools import zip_longest
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from chat.rate_limited_agent import rate_limiter
+from chat.recording_agent import response_store
+from config.llm_settings import (
+    GPT_4o,
+    GPT_4_1,
+    GPT_4o_mini,
+    GPT_4_1_nano,
+    ClaudeSonnet4,
+    ClaudeHaiku,
+    ClaudeSonnet3_7,
+    Gemini2_5Pro,
+    Gemini2_5Flash,
+    Gemini2_5FlashLite,
+    Grok4,
+    Qwen3_235B_A22B_Instruct_2507,
+)
+from config.sweep_settings import (
+    DEFAULT_PROVIDER_CONCURRENCY,
+    EXPERIMENT_TIMEOUT,
+    PROVIDER_CONCURRENCY,
+    SWEEP_ASYNC_CONCURRENCY,
+    SWEEP_WORKERS,
+)
+from models import ConversationConfig, LLMConfig
+from run_experiment import a_start_experiment, count_experiments_per_model, start_experiment
+from utils.rate_limiter import provider_key
+
+
+app_logger = logging.getLogger("sweep")
+app_logger.setLevel(logging.INFO)
+
+# Participant models of the full sweep, learner, professor and orchestrator are fixed
+SWEEP_MODELS: list[LLMConfig] = [
+    # OpenAI
+    GPT_4o(),
+    GPT_4o_mini(),
+    GPT_4_1(),
+    GPT_4_1_nano(),
+    # Claude
+    ClaudeSonnet4(),
+    ClaudeSonnet3_7(),
+    ClaudeHaiku(),
+    # Gemini
+    Gemini2_5FlashLite(),
+    Gemini2_5Flash(),
+    Gemini2_5Pro(),
+    # Openrouter
+    Grok4(),
+    Qwen3_235B_A22B_Instruct_2507(),
+]
+
+
+def conversation_providers(config: ConversationConfig) -> tuple[str, ...]:
+    models = [
+        config.participant_model,
+        config.learner_model,
+        config.professor_model,
+        config.orchestrator_model,
+        # the group chat manager of start_experiment
+        config.manager_model or GPT_4o(),
+    ]
+    # sorted, so slots are always taken in the same order
+    providers = {
+        provider_key(getattr(model, "api_type", None), getattr(model, "base_url", None))
+        for model in models
+    }
+    return tuple(sorted(providers))
+
+
+@dataclass
+class SweepJob:
+    config: ConversationConfig
+    # number of the run among the experiments of its participant model
+    run: int
+    providers: tuple[str, ...]
+
+    @property
+    def model(self) -> str:
+        return self.config.participant_model.model
+
+
+def plan_sweep(
+    participant_models: list[LLMConfig],
+    target_experiments_per_model: int,
+    learner_model: LLMConfig,
+    professor_model: LLMConfig,
+    orchestrator_model: LLMConfig,
+) -> list[SweepJob]:
+    """
+    Plans the experiments missing to reach the target number per participant model.
+    Finished experiments are counted from the results, so running the sweep again
+    after an interruption only runs what is still missing.
+    """
+    counts = count_experiments_per_model()
+    jobs_per_model = []
+    for participant_model in participant_models:
+        config = ConversationConfig(
+            participant_model=participant_model,
+            learner_model=learner_model,
+            professor_model=professor_model,
+            orchestrator_model=orchestrator_model,
+        )
+        existing = counts.get(participant_model.model, 0)
+        missing = max(0, target_experiments_per_model - existing)
+        app_logger.info(f"{participant_model.model}: {existing} existing experiments, {missing} to run")
+        providers = conversation_providers(config)
+        jobs_per_model.append(
+            # the run number is the seed, a sweep run again records or replays the same runs
+            [
+                SweepJob(config=config.model_copy(update={"seed": run}), run=run, providers=providers)
+                for run in range(existing + 1, existing + missing + 1)
+            ]
+        )
+
+    # interleave the models, so every provider has work from the start
+    return [job for jobs in zip_longest(*jobs_per_model) for job in jobs if job is not None]
+
+
+def provider_limit(provider: str) -> int:
+    return max(1, PROVIDER_CONCURRENCY.get(provider, DEFAULT_PROVIDER_CONCURRENCY))
+
+
+def run_sweep(jobs: list[SweepJob], workers: int = SWEEP_WORKERS) -> dict:
+    """
+    Runs the jobs in worker processes. A job starts once a worker is free and every provider
+    it uses is below its concurrency limit, jobs that have to wait for a provider
+    do not hold back jobs of other providers.
+
+    Returns:
+        dict: Number of completed and failed experiments and the elapsed seconds
+    """
+    pending = deque(jobs)
+    running: dict[Future, tuple[SweepJob, float]] = {}
+    in_flight: Counter = Counter()
+    completed = failed = 0
+    started = time.monotonic()
+    app_logger.info(f"Running {len(jobs)} experiments with {workers} workers")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for job in list(pending):
+                if len(running) >= workers:
+                    break
+                if all(in_flight[provider] < provider_limit(provider) for provider in job.providers):
+                    pending.remove(job)
+                    in_flight.update(job.providers)
+                    running[pool.submit(start_experiment, job.config)] = (job, time.monotonic())
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, job_started = running.pop(future)
+                in_flight.subtract(job.providers)
+                try:
+                    experiment_id = future.result()
+                    completed += 1
+                    outcome = f"{experiment_id} in {time.monotonic() - job_started:.0f}s"
+                except Exception as e:
+                    failed += 1
+                    outcome = f"failed: {e}"
+
+                finished = completed + failed
+                elapsed = time.monotonic() - started
+                remaining = (len(jobs) - finished) * elapsed / finished
+                app_logger.info(
+                    f"[{finished}/{len(jobs)}] {job.model} run {job.run} {outcome} "
+                    f"({failed} failed, {len(running)} running, ~{remaining / 60:.0f} min left)"
+                )
+
+    elapsed = time.monotonic() - started
+    app_logger.info(f"Sweep finished in {elapsed / 60:.1f} min: {completed} completed, {failed} failed")
+    return {"completed": completed, "failed": failed, "elapsed": elapsed}
+
+
+async def run_sweep_async(
+    jobs: list[SweepJob],
+    concurrency: int = SWEEP_ASYNC_CONCURRENCY,
+    timeout: float | None = EXPERIMENT_TIMEOUT or None,
+) -> dict:
+    """
+    Runs the jobs as concurrent conversations on the running event loop, at most `concurrency`
+    at a time and within the same per-provider limits as run_sweep. A conversation exceeding
+    the timeout (seconds) is cancelled and nothing is stored for it, it is planned again by the
+    next sweep. Cancelling the sweep cancels every running conversation.
+
+    Returns:
+        dict: Number of completed and failed experiments and the elapsed seconds
+    """
+    # blocking LLM calls run in the default executor, one thread per conversation
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm")
+    )
+    sweep_slots = asyncio.Semaphore(concurrency)
+    provider_slots = {
+        provider: asyncio.Semaphore(provider_limit(provider))
+        for provider in {provider for job in jobs for provider in job.providers}
+    }
+    progress = {"completed": 0, "failed": 0}
+    started = time.monotonic()
+    app_logger.info(f"Running {len(jobs)} experiments, {concurrency} at a time")
+
+    async def run(job: SweepJob) -> None:
+        async with AsyncExitStack() as slots:
+            for provider in job.providers:
+                await slots.enter_async_context(provider_slots[provider])
+            await slots.enter_async_context(sweep_slots)
+
+            job_started = time.monotonic()
+            try:
+                experiment_id = await asyncio.wait_for(a_start_experiment(job.config), timeout)
+                progress["completed"] += 1
+                outcome = f"{experiment_id} in {time.monotonic() - job_started:.0f}s"
+            except asyncio.TimeoutError:
+                progress["failed"] += 1
+                outcome = f"timed out after {timeout:.0f}s"
+            except Exception as e:
+                progress["failed"] += 1
+                outcome = f"failed: {e}"
+
+        finished = progress["completed"] + progress["failed"]
+        elapsed = time.monotonic() - started
+        remaining = (len(jobs) - finished) * elapsed / finished
+        app_logger.info(
+            f"[{finished}/{len(jobs)}] {job.model} run {job.run} {outcome} "
+            f"({progress['failed']} failed, ~{remaining / 60:.0f} min left)"
+        )
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+    elapsed = time.monotonic() - started
+    app_logger.info(
+        f"Sweep finished in {elapsed / 60:.1f} min: {progress['completed']} completed, {progress['failed']} failed"
+    )
+    store_stats = response_store.stats()
+    if response_store.enabled:
+        app_logger.info(
+            f"Response store ({store_stats['mode']}): {store_stats['hits']} hits, {store_stats['misses']} misses, "
+            f"{store_stats['bytes_read'] / 1024:.0f} KiB read, {store_stats['bytes_written'] / 1024:.0f} KiB written"
+        )
+    # all conversations shared this process' rate limiters, report how long calls queued for them
+    for key, limiter_stats in rate_limiter.stats().items():
+        wait_time = limiter_stats["wait_time"]
+        app_logger.info(
+            f"Rate limiter {key}: {limiter_stats['calls']} calls, {limiter_stats['rate_limited']} rate limited, "
+            f"waited p50 {wait_time['p50']:.2f}s p95 {wait_time['p95']:.2f}s max {wait_time['max']:.2f}s"
+        )
+    return {**progress, "elapsed": elapsed}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Run the experiments of all participant models in parallel.")
+    parser.add_argument("--target", type=int, default=10, help="Experiments per participant model")
+    parser.add_argument("--engine", choices=["process", "async"], default="process")
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS, help="Worker processes of the process engine")
+    parser.add_argument(
+        "--concurrency", type=int, default=SWEEP_ASYNC_CONCURRENCY, help="Conversations at a time of the async engine"
+    )
+    parser.add_argument("--models", nargs="*", help="Only these participant models")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the planned experiments")
+    args = parser.parse_args()
+
+    # Create results directory if it doesn't exist
+    if not os.path.exists("results"):
+        os.makedirs("results")
+
+    participant_models = [
+        model for model in SWEEP_MODELS if not args.models or model.model in args.models
+    ]
+    jobs = plan_sweep(participant_models, args.target, GPT_4o(), GPT_4o(), GPT_4o())
+    if args.dry_run:
+        for provider, count in sorted(Counter(p for job in jobs for p in job.providers).items()):
+            print(f"{provider:25} {count:4} experiments, limit {provider_limit(provider)}")
+    elif args.engine == "async":
+        asyncio.run(run_sweep_async(jobs, args.concurrency))
+    else:
+        run_sweep(jobs, args.workers)
+        counts = count_experiments_per_model()
+        for model in participant_models:
+            app_logger.info(f"Number of {model.model} experiments: {counts.get(model.model, 0)}")
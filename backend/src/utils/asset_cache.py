@@ -0,0 +1,180 @@
+from dataclasses import dataclass
+from threading import Lock
+import hashlib
+import io
+import os
+import time
+
+from PIL import Image
+from loguru import logger
+
+from config.render_settings import ASSET_RELOAD_INTERVAL
+from utils.drawing_utils import resize_sprite
+
+
+@dataclass(frozen=True)
+class SpriteSpec:
+    """
+    Describes how a sprite is loaded from disk: source file, scale and orientation.
+    """
+
+    path: str
+    scale: float = 1.0
+    flip: bool = False
+
+
+@dataclass
+class _CachedSprite:
+    image: Image.Image
+    mtime: float
+    # SHA-256 of the file's bytes
+    digest: str
+
+
+class AssetRegistry:
+    """
+    Decodes and scales sprites once and hands out the prepared images. They are shared,
+    callers drawing onto a sprite must copy it first.
+    Modified files are reloaded automatically: get() and fingerprint() check the files' mtimes
+    at most once every reload_interval seconds, 0 leaves it to explicit reload() calls.
+    """
+
+    def __init__(self, specs: dict[str, SpriteSpec], reload_interval: float = 0):
+        self._specs = dict(specs)
+        self._sprites: dict[str, _CachedSprite] = {}
+        self._lock = Lock()
+        self.reload_interval = reload_interval
+        self._checked = time.monotonic()
+        self._fingerprint: str | None = None
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        # bumped on every (re)load, lets dependent caches detect stale assets
+        self.generation = 0
+
+    def preload(self) -> None:
+        """
+        Loads every registered sprite, normally called once at process start.
+        """
+        with self._lock:
+            for name in self._specs:
+                self._sprite(name)
+
+    def get(self, name: str) -> Image.Image:
+        """
+        Returns the prepared sprite registered under the given name, it must not be drawn on.
+        """
+        with self._lock:
+            self._check_modified()
+            if name in self._sprites:
+                self.hits += 1
+            return self._sprite(name).image
+
+    def reload(self) -> list[str]:
+        """
+        Reloads the sprites whose files were modified since they were loaded,
+        only those whose content changed count as reloaded.
+
+        Returns:
+            list: Names of the reloaded sprites
+        """
+        with self._lock:
+            return self._reload_modified()
+
+    def fingerprint(self) -> str:
+        """
+        Returns a digest of the contents of the loaded files and their scale and orientation.
+        Content addressed caches include it in their keys, so reloading a changed asset
+        changes the keys while touching or checking out the same files does not.
+        """
+        with self._lock:
+            self._check_modified()
+            if self._fingerprint is None:
+                state = sorted(
+                    (name, spec.scale, spec.flip, self._sprite(name).digest)
+                    for name, spec in self._specs.items()
+                )
+                self._fingerprint = hashlib.sha256(repr(state).encode("utf-8")).hexdigest()[:16]
+            return self._fingerprint
+
+    def clear(self) -> None:
+        """
+        Drops all loaded sprites, they are loaded again on next access.
+        """
+        with self._lock:
+            self._sprites.clear()
+            self._fingerprint = None
+            self.generation += 1
+
+    def stats(self) -> dict:
+        return {
+            "sprites": len(self._sprites),
+            "hits": self.hits,
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "generation": self.generation,
+        }
+
+    def _check_modified(self) -> None:
+        # called with the lock held
+        if not self.reload_interval or time.monotonic() - self._checked < self.reload_interval:
+            return
+        self._reload_modified()
+
+    def _reload_modified(self) -> list[str]:
+        # called with the lock held
+        self._checked = time.monotonic()
+        reloaded = []
+        for name, cached in list(self._sprites.items()):
+            spec = self._specs[name]
+            mtime = os.path.getmtime(spec.path)
+            if mtime == cached.mtime:
+                continue
+            self._sprites[name] = self._load(spec, mtime)
+            if self._sprites[name].digest == cached.digest:
+                # touched, the content is the same
+                continue
+            self.reloads += 1
+            self.generation += 1
+            self._fingerprint = None
+            reloaded.append(name)
+            logger.info(f"Reloaded sprite '{name}' from {spec.path}")
+        return reloaded
+
+    def _sprite(self, name: str) -> _CachedSprite:
+        # called with the lock held
+        cached = self._sprites.get(name)
+        if cached is not None:
+            return cached
+        spec = self._specs[name]
+        cached = self._load(spec, os.path.getmtime(spec.path))
+        self._sprites[name] = cached
+        self.loads += 1
+        self.generation += 1
+        self._fingerprint = None
+        return cached
+
+    @staticmethod
+    def _load(spec: SpriteSpec, mtime: float) -> _CachedSprite:
+        with open(spec.path, "rb") as f:
+            data = f.read()
+        with Image.open(io.BytesIO(data)) as source:
+            image = source.convert("RGBA")
+        if spec.scale != 1.0:
+            image = resize_sprite(image, spec.scale)
+        if spec.flip:
+            image = image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+        return _CachedSprite(image=image, mtime=mtime, digest=hashlib.sha256(data).hexdigest())
+
+
+GAME_SPRITES: dict[str, SpriteSpec] = {
+    "background": SpriteSpec("static/background.jpg"),
+    "professor": SpriteSpec("static/professor_w.png", 0.58),
+    "student": SpriteSpec("static/student.png", 0.15),
+    "learner": SpriteSpec("static/learner.png", 1.1),
+    "shock": SpriteSpec("static/electricity.png", 0.05),
+    "cloud": SpriteSpec("static/cloud.png", 0.15),
+    "cloud_flipped": SpriteSpec("static/cloud.png", 0.15, flip=True),
+}
+
+game_assets = AssetRegistry(GAME_SPRITES, reload_interval=ASSET_RELOAD_INTERVAL)
@@ -0,0 +1,67 @@
+from typing import AsyncIterator, Awaitable, Iterable, Sequence
+import asyncio
+import inspect
+import io
+import json
+import uuid
+import zipfile
+
+from loguru import logger
+
+
+def build_zip(files: Iterable[tuple[str, bytes]]) -> bytes:
+    """
+    Packs the files into a zip archive. Images are already compressed, so they are stored as is.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def multipart_boundary() -> str:
+    return f"frames-{uuid.uuid4().hex}"
+
+
+def _part_header(boundary: str, filename: str, media_type: str, length: int) -> bytes:
+    return (
+        f"--{boundary}\r\n"
+        f"Content-Type: {media_type}\r\n"
+        f'Content-Disposition: attachment; filename="{filename}"\r\n'
+        f"Content-Length: {length}\r\n\r\n"
+    ).encode("utf-8")
+
+
+async def multipart_stream(
+    parts: Sequence[tuple[str, str, Awaitable[bytes]]], boundary: str
+) -> AsyncIterator[bytes]:
+    """
+    Streams a multipart/mixed body, each part is sent as soon as its content is ready.
+    Parts are (filename, media type, awaitable content) and are sent in the given order.
+    The headers are sent by then, so a failed part is sent as a JSON error part
+    ("<filename>.error.json") instead. Contents not awaited yet, e.g. when the client
+    disconnects, are cancelled.
+    """
+    try:
+        for filename, media_type, content in parts:
+            try:
+                data = await content
+            except Exception as e:
+                logger.warning(f"Part {filename} of a multipart response failed: {e!r}")
+                data = json_part({"filename": filename, "error": getattr(e, "detail", None) or str(e)})
+                filename, media_type = f"{filename}.error.json", "application/json"
+            yield _part_header(boundary, filename, media_type, len(data))
+            yield data
+            yield b"\r\n"
+        yield f"--{boundary}--\r\n".encode("utf-8")
+    finally:
+        for _, _, content in parts:
+            if isinstance(content, asyncio.Future):
+                content.cancel()
+            elif inspect.iscoroutine(content):
+                content.close()
+
+
+def json_part(data) -> bytes:
+    return json.dumps(data, indent=2).encode("utf-8")
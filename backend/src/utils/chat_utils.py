@@ -2,6 +2,8 @@ from autogen import ChatResult
 from autogen.agentchat import AssistantAgent
 from models import Roles
 import json
+import os
+import re
 
 
 def check_termination(message) -> bool:
@@ -13,7 +15,8 @@ def check_termination(message) -> bool:
 def agents_total_cost(agents: list[AssistantAgent]) -> float:
     total_cost = 0.0
     for agent in agents:
-        total_cost += agent.get_actual_usage().get("total_cost", 0.0)
+        # None for agents without API calls, e.g. when all responses were replayed
+        total_cost += (agent.get_actual_usage() or {}).get("total_cost", 0.0)
     return total_cost
 
 
@@ -45,33 +48,41 @@ def check_if_administered_shock(message: dict) -> bool:
         for tool_call in found_tool_calls
     )
 
+AGENT_NAMES_MAPPING = {
+    Roles.PROFESSOR.value: "Professor",
+    Roles.LEARNER.value: "Learner",
+    Roles.PARTICIPANT.value: "Participant",
+    Roles.ORCHESTRATOR.value: "Orchestrator",
+}
+
+
+def convert_chat_message(message: dict) -> dict | None:
+    """
+    Converts one chat message to the speaker/text message shown in the game.
+    Returns None for messages that are not shown: other agents, empty and narrator messages.
+    """
+    if (
+        message.get("name") not in AGENT_NAMES_MAPPING
+        or message["content"] == ""
+        or "NARRATOR_MESSAGE" in message["content"]
+    ):
+        return None
+    if check_if_administered_shock(message):
+        return {"speaker": "SHOCKING_DEVICE", "text": "ELECTRIC_SHOCK_IMAGE"}
+    return {"speaker": AGENT_NAMES_MAPPING[message["name"]], "text": message["content"]}
+
+
 def convert_chat_history_to_json(
     chat: ChatResult
 ) -> list[dict]:
-    agent_names_mapping = {
-        Roles.PROFESSOR.value: "Professor",
-        Roles.LEARNER.value: "Learner",
-        Roles.PARTICIPANT.value: "Participant",
-        Roles.ORCHESTRATOR.value: "Orchestrator",
-    }
-    messages_of_people = [
-        message
-        for message in chat.chat_history
-        if message["name"] in agent_names_mapping
-        and message["content"] != ""
-        and "NARRATOR_MESSAGE" not in message["content"]
-    ]
-    data = [
-        {
-            "speaker": "SHOCKING_DEVICE"
-            if check_if_administered_shock(message)
-            else agent_names_mapping[message["name"]],
-            "text": "ELECTRIC_SHOCK_IMAGE"
-            if check_if_administered_shock(message)
-            else message["content"],
-        }
-        for message in messages_of_people
-    ]
+    """
+    Converts the chat history to the speaker/text messages shown in the game.
+    """
+    data = []
+    for message in chat.chat_history:
+        converted = convert_chat_message(message)
+        if converted is not None:
+            data.append(converted)
 
     # # skip those containing "None"
     # data = [message for message in data if "None" not in message["text"]]
@@ -82,3 +93,17 @@ def load_conversation_dictionary(file_path: str = "conversation.json") -> list[d
     with open(file_path, "r") as f:
         data = json.load(f)
     return data
+
+
+def experiment_result_path(experiment_id: str, results_dir: str = "results") -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", experiment_id):
+        raise ValueError(f"Invalid experiment id: {experiment_id}")
+    return os.path.join(results_dir, f"experiment_{experiment_id}.json")
+
+
+def load_experiment_result(experiment_id: str, results_dir: str = "results") -> dict:
+    """
+    Loads a stored experiment (results/experiment_<id>.json).
+    """
+    with open(experiment_result_path(experiment_id, results_dir), "r") as f:
+        return json.load(f)
@@ -0,0 +1,124 @@
+from typing import Callable, Optional
+import re
+
+from models import HistoryPolicy
+from utils.rate_limiter import estimate_tokens
+
+
+# tool response of press_button, one for every shock
+SHOCK_PATTERN = re.compile(r"button was pressed\. Current voltage: (\d+) volts")
+
+
+def message_text(message: dict) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return " ".join(str(block.get("text", "")) for block in content if isinstance(block, dict))
+    return str(content or "")
+
+
+def shock_voltages(messages: list[dict]) -> list[int]:
+    """
+    Voltages of the shocks administered in the messages, in order.
+    """
+    voltages = []
+    for message in messages:
+        voltages += [int(voltage) for voltage in SHOCK_PATTERN.findall(message_text(message))]
+    return voltages
+
+
+def pinned_facts_message(dropped: list[dict]) -> dict:
+    """
+    Narrator message standing in for the dropped messages, with the shocks administered in them
+    and the voltage they left, which the experiment depends on.
+    """
+    voltages = shock_voltages(dropped)
+    if voltages:
+        shocks = f"{len(voltages)} shocks were administered in them ({', '.join(str(v) for v in voltages)} volts)."
+    else:
+        shocks = "No shocks were administered in them."
+    return {
+        "role": "user",
+        "content": (
+            f"NARRATOR_MESSAGE: {len(dropped)} earlier messages of the conversation are not shown. {shocks} "
+            f"Current voltage: {voltages[-1] if voltages else 0} volts"
+        ),
+    }
+
+
+def transcript(messages: list[dict]) -> str:
+    return "\n".join(
+        f"{message.get('name') or message.get('role')}: {message_text(message)}"
+        for message in messages
+        if message_text(message)
+    )
+
+
+class ContextWindow:
+    """
+    Applies a HistoryPolicy to the messages of an LLM call. The system messages, the first message of the
+    conversation and the latest messages are kept, the dropped ones are replaced by a narrator message pinning
+    the shocks and the current voltage, and by a rolling summary for the summary policy.
+    Messages are dropped trim_step at a time, so the history keeps its prefix from one call to the next.
+    """
+
+    def __init__(self, policy: HistoryPolicy, summarize: Optional[Callable[[str, list[dict]], str]] = None):
+        self.policy = policy
+        # summarize(summary, messages) returns the summary updated with the messages
+        self.summarize = summarize
+        # number of conversation messages the summary covers, and the summary
+        self._summarized = 0
+        self._summary = ""
+
+    def apply(self, messages: list[dict]) -> list[dict]:
+        if self.policy.kind == "full":
+            return messages
+
+        system_count = 0
+        while system_count < len(messages) and messages[system_count].get("role") == "system":
+            system_count += 1
+        head = messages[: system_count + 1]
+        conversation = messages[system_count + 1 :]
+
+        cut = self.cut(conversation)
+        # a tool response can not be sent without the tool call before it
+        while cut < len(conversation) - 1 and conversation[cut].get("role") == "tool":
+            cut += 1
+        if cut == 0:
+            return messages
+
+        dropped = conversation[:cut]
+        window = [*head, pinned_facts_message(dropped)]
+        if self.policy.kind == "summary" and self.summarize is not None:
+            window.append({"role": "user", "content": f"Summary of the earlier messages: {self.summary(dropped)}"})
+        return window + conversation[cut:]
+
+    def cut(self, conversation: list[dict]) -> int:
+        """
+        Returns:
+            int: Number of conversation messages to drop, a multiple of trim_step
+        """
+        if self.policy.kind == "token_budget":
+            tokens = 0
+            keep = 0
+            for message in reversed(conversation):
+                tokens += estimate_tokens(message)
+                if tokens > self.policy.max_tokens and keep > 0:
+                    break
+                keep += 1
+            excess = len(conversation) - keep
+        else:
+            excess = len(conversation) - self.policy.max_messages
+        if excess <= 0:
+            return 0
+        step = self.policy.trim_step
+        # rounded up to whole steps, but the last message is always sent
+        return min(-(-excess // step) * step, len(conversation) - 1)
+
+    def summary(self, dropped: list[dict]) -> str:
+        if len(dropped) < self._summarized:
+            # a new conversation
+            self._summarized, self._summary = 0, ""
+        if len(dropped) > self._summarized:
+            self._summary = self.summarize(self._summary, dropped[self._summarized :])
+            self._summarized = len(dropped)
+        return self._summary
@@ -1,4 +1,6 @@
 from PIL import Image, ImageFont
+from functools import lru_cache
+from typing import NamedTuple
 import textwrap
 import math
 
@@ -13,17 +15,35 @@ def resize_sprite(sprite: Image.Image, scale_flearner: float) -> Image.Image:
     return sprite.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
 
-def adjust_cloud(
-    cloud: Image.Image, message: str, used_font: ImageFont.FreeTypeFont
-) -> tuple[Image.Image, list[str], float]:
+class CloudLayout(NamedTuple):
     """
-    Adjusts the cloud size to fit the message by extending the middle portion.
+    Measured layout of a message inside a speech cloud.
+    """
+
+    lines: tuple[str, ...]
+    line_widths: tuple[int, ...]
+    line_spacing: float
+    cloud_size: tuple[int, int]
+
+
+@lru_cache(maxsize=16)
+def load_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    """
+    Loads a TrueType font once per path and size.
+    """
+    return ImageFont.truetype(path, size=size)
+
+
+def layout_cloud(
+    message: str, used_font: ImageFont.FreeTypeFont, base_size: tuple[int, int]
+) -> CloudLayout:
+    """
+    Wraps the message and determines the size of the cloud that fits it.
     Determines the target cloud size based on text content first, then wraps text accordingly.
-    Maintains a 2:3 height-to-width ratio and handles text wrapping.
-    Returns a new image with the adjusted cloud, the wrapped text lines, the calculated font size, and line spacing.
+    Maintains a 2:3 height-to-width ratio, every line is measured exactly once.
     """
     # Calculate base dimensions
-    base_width, base_height = cloud.size
+    base_width, base_height = base_size
     padding = 40  # Padding inside the cloud
 
     # Get precise text dimensions using the font
@@ -51,13 +71,15 @@ def adjust_cloud(
     )  # minimum 20 chars
     actual_lines = len(wrapped_lines)
 
+    line_widths = []
+    for line in wrapped_lines:
+        line_bbox = used_font.getbbox(line)
+        line_widths.append(line_bbox[2] - line_bbox[0])
+
     # Calculate precise text area needed based on ACTUAL wrapped text
     if wrapped_lines:
         # Get the actual width of the widest line
-        actual_text_width = max(
-            used_font.getbbox(line)[2] - used_font.getbbox(line)[0]
-            for line in wrapped_lines
-        )
+        actual_text_width = max(line_widths)
         actual_text_height = actual_lines * line_spacing
     else:
         actual_text_width = 0
@@ -71,81 +93,111 @@ def adjust_cloud(
     needed_width = max(0, target_width - base_width)
     needed_height = max(0, target_height - base_height)
 
-    new_width = base_width + needed_width
-    new_height = base_height + needed_height
-
     # Ensure both dimensions are integers
-    new_width = int(new_width)
-    new_height = int(new_height)
+    new_width = int(base_width + needed_width)
+    new_height = int(base_height + needed_height)
+
+    return CloudLayout(
+        lines=tuple(wrapped_lines),
+        line_widths=tuple(line_widths),
+        line_spacing=line_spacing,
+        cloud_size=(new_width, new_height),
+    )
+
+
+def adjust_cloud(
+    cloud: Image.Image, message: str, used_font: ImageFont.FreeTypeFont
+) -> tuple[Image.Image, list[str], float]:
+    """
+    Adjusts the cloud size to fit the message by extending the middle portion.
+    Returns a new image with the adjusted cloud, the wrapped text lines and line spacing.
+    """
+    layout = layout_cloud(message, used_font, cloud.size)
+    return (
+        fit_cloud(cloud, layout),
+        list(layout.lines),
+        layout.line_spacing,
+    )
 
+
+def fit_cloud(cloud: Image.Image, layout: CloudLayout) -> Image.Image:
+    """
+    Returns the cloud stretched to the size of the layout, or the cloud itself if it already fits.
+    """
+    base_width, base_height = cloud.size
+    new_width, new_height = layout.cloud_size
     # If we need to resize the cloud
     if new_width > base_width or new_height > base_height:
-        # Create a new blank image
-        new_cloud = Image.new("RGBA", (new_width, new_height), (0, 0, 0, 0))
-
-        # The rest of the code for resizing the cloud remains the same
-        # Get the middle column and row for expansion
-        mid_x = base_width // 2
-        mid_y = base_height // 2
-
-        # Extract the four corners
-        top_left = cloud.crop((0, 0, mid_x, mid_y))
-        top_right = cloud.crop((mid_x, 0, base_width, mid_y))
-        bottom_left = cloud.crop((0, mid_y, mid_x, base_height))
-        bottom_right = cloud.crop((mid_x, mid_y, base_width, base_height))
-
-        # Paste the corners
-        new_cloud.paste(top_left, (0, 0), top_left)
-        new_cloud.paste(top_right, (new_width - (base_width - mid_x), 0), top_right)
+        return stretch_cloud(cloud, new_width, new_height)
+    return cloud
+
+
+def stretch_cloud(cloud: Image.Image, new_width: int, new_height: int) -> Image.Image:
+    """
+    Stretches the cloud to the given size with a nine-slice split around its center.
+    The four quarters are kept as they are, the middle row and column of the source
+    are repeated across the added space and the center is filled with the center pixel.
+    """
+    base_width, base_height = cloud.size
+    mid_x = base_width // 2
+    mid_y = base_height // 2
+
+    # Borders of the stretched area in the new image
+    right_x = new_width - (base_width - mid_x)
+    bottom_y = new_height - (base_height - mid_y)
+    stretch_width = right_x - mid_x
+    stretch_height = bottom_y - mid_y
+
+    new_cloud = Image.new("RGBA", (new_width, new_height), (0, 0, 0, 0))
+
+    # Paste the corners, using their alpha as the mask
+    top_left = cloud.crop((0, 0, mid_x, mid_y))
+    top_right = cloud.crop((mid_x, 0, base_width, mid_y))
+    bottom_left = cloud.crop((0, mid_y, mid_x, base_height))
+    bottom_right = cloud.crop((mid_x, mid_y, base_width, base_height))
+    new_cloud.paste(top_left, (0, 0), top_left)
+    new_cloud.paste(top_right, (right_x, 0), top_right)
+    new_cloud.paste(bottom_left, (0, bottom_y), bottom_left)
+    new_cloud.paste(bottom_right, (right_x, bottom_y), bottom_right)
+
+    # Repeat the one pixel wide middle strips over the added space.
+    # Nearest-neighbour resize of a single row or column is an exact repetition
+    # and the strips are copied without a mask, replacing the pixels underneath.
+    # The strips of a one pixel wide or high cloud are empty and left out.
+    if stretch_width > 0 and mid_y > 0:
+        top_strip = cloud.crop((mid_x, 0, mid_x + 1, mid_y))
         new_cloud.paste(
-            bottom_left, (0, new_height - (base_height - mid_y)), bottom_left
+            top_strip.resize((stretch_width, mid_y), Image.Resampling.NEAREST),
+            (mid_x, 0),
         )
+    if stretch_width > 0:
+        bottom_strip = cloud.crop((mid_x, mid_y, mid_x + 1, base_height))
         new_cloud.paste(
-            bottom_right,
-            (new_width - (base_width - mid_x), new_height - (base_height - mid_y)),
-            bottom_right,
+            bottom_strip.resize(
+                (stretch_width, base_height - mid_y), Image.Resampling.NEAREST
+            ),
+            (mid_x, bottom_y),
         )
 
-        # Sample a few pixels from the center of the cloud to use for filling
-        center_pixel = cloud.getpixel((mid_x, mid_y))
-
-        # Create horizontal and vertical "strips" from the original cloud
-        top_strip = cloud.crop((mid_x, 0, mid_x + 1, mid_y))
-        bottom_strip = cloud.crop((mid_x, mid_y, mid_x + 1, base_height))
+    if stretch_height > 0 and mid_x > 0:
         left_strip = cloud.crop((0, mid_y, mid_x, mid_y + 1))
+        new_cloud.paste(
+            left_strip.resize((mid_x, stretch_height), Image.Resampling.NEAREST),
+            (0, mid_y),
+        )
+    if stretch_height > 0:
         right_strip = cloud.crop((mid_x, mid_y, base_width, mid_y + 1))
+        new_cloud.paste(
+            right_strip.resize(
+                (base_width - mid_x, stretch_height), Image.Resampling.NEAREST
+            ),
+            (right_x, mid_y),
+        )
+
+    # Fill the center section with the center pixel of the cloud
+    if stretch_width > 0 and stretch_height > 0:
+        new_cloud.paste(
+            cloud.getpixel((mid_x, mid_y)), (mid_x, mid_y, right_x, bottom_y)
+        )
 
-        # Fill the horizontal middle sections (top and bottom)
-        for x in range(mid_x, new_width - (base_width - mid_x)):
-            # Top section
-            for y in range(0, mid_y):
-                pixel = top_strip.getpixel((0, y))
-                new_cloud.putpixel((x, y), pixel)
-
-            # Bottom section
-            for y in range(new_height - (base_height - mid_y), new_height):
-                rel_y = y - (new_height - (base_height - mid_y))
-                pixel = bottom_strip.getpixel((0, rel_y))
-                new_cloud.putpixel((x, y), pixel)
-
-        # Fill the vertical middle sections (left and right)
-        for y in range(mid_y, new_height - (base_height - mid_y)):
-            # Left section
-            for x in range(0, mid_x):
-                pixel = left_strip.getpixel((x, 0))
-                new_cloud.putpixel((x, y), pixel)
-
-            # Right section
-            for x in range(new_width - (base_width - mid_x), new_width):
-                rel_x = x - (new_width - (base_width - mid_x))
-                pixel = right_strip.getpixel((rel_x, 0))
-                new_cloud.putpixel((x, y), pixel)
-
-        # Fill the center section (expanded area)
-        for y in range(mid_y, new_height - (base_height - mid_y)):
-            for x in range(mid_x, new_width - (base_width - mid_x)):
-                new_cloud.putpixel((x, y), center_pixel)
-
-        return new_cloud, wrapped_lines, line_spacing
-
-    return cloud, wrapped_lines, line_spacing
+    return new_cloud
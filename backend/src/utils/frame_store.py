@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+
+from utils.image_encoding import OUTPUT_FORMATS
+
+
+class FrameStore:
+    """
+    Content addressed store of encoded frames on disk.
+    Frames live under <root>/<key[:2]>/<key>.<format> and every experiment has a manifest
+    listing the frame keys of its messages, so replays can be served as static files.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def frame_path(self, key: str, output_format: str) -> str:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        return os.path.join(self.root, key[:2], f"{key}.{output_format}")
+
+    def manifest_path(self, experiment_id: str) -> str:
+        return os.path.join(self.root, f"experiment_{experiment_id}.json")
+
+    def has_frame(self, key: str, output_format: str) -> bool:
+        return os.path.exists(self.frame_path(key, output_format))
+
+    def find_frame(self, key: str, output_format: str) -> str | None:
+        path = self.frame_path(key, output_format)
+        return path if os.path.exists(path) else None
+
+    def read_frame(self, key: str, output_format: str) -> bytes | None:
+        try:
+            with open(self.frame_path(key, output_format), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put_frame(self, key: str, output_format: str, frame: bytes) -> str:
+        path = self.frame_path(key, output_format)
+        if not os.path.exists(path):
+            _atomic_write(path, frame)
+        return path
+
+    def has_manifest(self, experiment_id: str) -> bool:
+        return os.path.exists(self.manifest_path(experiment_id))
+
+    def load_manifest(self, experiment_id: str) -> dict:
+        with open(self.manifest_path(experiment_id), "r") as f:
+            return json.load(f)
+
+    def put_manifest(self, experiment_id: str, manifest: dict) -> None:
+        _atomic_write(
+            self.manifest_path(experiment_id),
+            json.dumps(manifest, indent=4).encode("utf-8"),
+        )
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    # concurrent writers produce the same content, the last rename wins
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,90 @@
+import io
+
+from PIL import Image
+
+
+# Output format name -> (PIL format, media type)
+OUTPUT_FORMATS: dict[str, tuple[str, str]] = {
+    "png": ("PNG", "image/png"),
+    "webp": ("WEBP", "image/webp"),
+    "webp-lossless": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+def media_type(output_format: str) -> str:
+    return OUTPUT_FORMATS[output_format][1]
+
+
+def _parse_accept(accept: str) -> list[tuple[str, float]]:
+    media_ranges = []
+    for part in accept.split(","):
+        fields = [field.strip() for field in part.split(";")]
+        if not fields[0]:
+            continue
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_ranges.append((fields[0].lower(), quality))
+    return media_ranges
+
+
+def negotiate_format(
+    accept: str | None, requested: str | None, webp_format: str = "webp-lossless"
+) -> str:
+    """
+    Picks the output format from an explicit format parameter or the Accept header.
+    An explicit format wins, otherwise the best accepted image type is used
+    and PNG is the fallback for wildcards and unknown types.
+    """
+    if requested:
+        requested = requested.lower()
+        if requested == "jpg":
+            requested = "jpeg"
+        if requested not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {requested}")
+        return requested
+
+    if not accept:
+        return "png"
+
+    candidates = {
+        "image/webp": webp_format,
+        "image/jpeg": "jpeg",
+        "image/png": "png",
+    }
+    best_format, best_quality = "png", 0.0
+    for media_range, quality in _parse_accept(accept):
+        output_format = candidates.get(media_range)
+        if output_format is not None and quality > best_quality:
+            best_format, best_quality = output_format, quality
+    return best_format
+
+
+def encode_frame(
+    image: Image.Image,
+    output_format: str = "png",
+    options: dict | None = None,
+    scale: float = 1.0,
+) -> bytes:
+    """
+    Encodes a rendered frame, optionally downscaled, with the given encoder options.
+    """
+    pil_format, _ = OUTPUT_FORMATS[output_format]
+
+    if scale != 1.0:
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    if pil_format == "JPEG":
+        # JPEG has no alpha channel
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=pil_format, **(options or {}))
+    return buffer.getvalue()
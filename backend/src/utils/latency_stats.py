@@ -0,0 +1,16 @@
+from typing import Iterable
+import statistics
+
+
+def latency_summary(samples: Iterable[float]) -> dict:
+    """
+    Median, 95th percentile and maximum of the latency samples, zeros without samples.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "p50": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import AsyncIterator
+import asyncio
+
+
+class MessageChannel:
+    """
+    Messages of one running experiment. Every subscriber receives all messages from the start,
+    followed by new ones as they are published, until the channel is closed.
+    Used from the event loop, publish may also be called from other threads.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.messages: list[dict] = []
+        self.closed = False
+        self.experiment_id: str | None = None
+        self.error: str | None = None
+        # the background task running the experiment
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def publish(self, message: dict) -> None:
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._append(message)
+        else:
+            self._loop.call_soon_threadsafe(self._append, message)
+
+    def close(self, experiment_id: str | None = None, error: str | None = None) -> None:
+        self.experiment_id = experiment_id
+        self.error = error
+        self.closed = True
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[dict]:
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.messages):
+                yield self.messages[sent]
+                sent += 1
+            if self.closed:
+                return
+            await changed.wait()
+
+    def _append(self, message: dict) -> None:
+        self.messages.append(message)
+        self._notify()
+
+    def _notify(self) -> None:
+        # wakes all current subscribers, later waits use a fresh event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class ChannelRegistry:
+    """
+    Channels of running and recently finished experiments, the oldest finished ones are dropped.
+    """
+
+    def __init__(self, max_finished: int = 32):
+        self.max_finished = max_finished
+        self._channels: OrderedDict[str, MessageChannel] = OrderedDict()
+
+    def open(self, channel_id: str) -> MessageChannel:
+        channel = MessageChannel(asyncio.get_running_loop())
+        self._channels[channel_id] = channel
+        finished = [key for key, existing in self._channels.items() if existing.closed]
+        for key in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._channels[key]
+        return channel
+
+    def get(self, channel_id: str) -> MessageChannel | None:
+        return self._channels.get(channel_id)
+
+    def stats(self) -> dict:
+        running = sum(not channel.closed for channel in self._channels.values())
+        return {"running": running, "finished": len(self._channels) - running}
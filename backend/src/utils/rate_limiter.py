@@ -0,0 +1,164 @@
+from collections import deque
+from threading import Lock
+from urllib.parse import urlparse
+import time
+
+from utils.latency_stats import latency_summary
+
+
+def provider_key(api_type: str | None, base_url: str | None) -> str:
+    """
+    Identifies the provider serving a model by its api_type, and the host of its base_url if set,
+    e.g. "anthropic" or "openai:openrouter.ai".
+    """
+    api_type = api_type or "openai"
+    if base_url:
+        # autogen's llm_config holds the base_url as a pydantic URL
+        return f"{api_type}:{urlparse(str(base_url)).netloc}"
+    return api_type
+
+
+def estimate_tokens(content: object) -> int:
+    # about four characters per token, good enough for budgeting
+    return len(str(content)) // 4 + 1
+
+
+def rate_limit_retry_after(error: Exception) -> float | None:
+    """
+    Recognizes rate limit errors of the provider SDKs.
+
+    Returns:
+        float | None: The delay requested by the provider's Retry-After header, 0 for a rate limit
+            error without one, None if the error is not a rate limit error
+    """
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    name = type(error).__name__
+    if status != 429 and "RateLimit" not in name and "ResourceExhausted" not in name:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TokenBucket:
+    """
+    Budget refilled continuously at `per_minute` units per minute, up to one minute's worth.
+    Reservations are taken immediately and may overdraw the bucket, the caller waits
+    until the debt is repaid, so callers are served in order of arrival.
+    """
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    def reserve(self, amount: float, rate_factor: float, now: float) -> float:
+        """
+        Takes the amount from the bucket, returns the seconds to wait before using it.
+        """
+        rate = self.per_minute * rate_factor / 60
+        self.level = min(self.per_minute, self.level + (now - self._updated) * rate)
+        self._updated = now
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / rate
+
+    def refund(self, amount: float) -> None:
+        self.level = min(self.per_minute, self.level + amount)
+
+
+class ProviderLimiter:
+    """
+    Request and token buckets of one provider and model.
+    The refill rate adapts to the provider: it is halved on every rate limit error and
+    recovers slowly with successful calls, a Retry-After delay blocks all calls until it passed.
+    """
+
+    MIN_RATE_FACTOR = 0.05
+    RECOVERY_STEP = 0.02
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, samples: int = 1000):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.rate_factor = 1.0
+        self.blocked_until = 0.0
+        self._lock = Lock()
+        self._consecutive_limits = 0
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.waited = 0.0
+        self._wait_times: deque[float] = deque(maxlen=samples)
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Blocks until the call fits in the budget, returns the seconds waited.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.blocked_until - now,
+                self.requests.reserve(1, self.rate_factor, now),
+                self.tokens.reserve(tokens, self.rate_factor, now),
+            )
+            self.calls += 1
+            self.waited += wait
+            self._wait_times.append(wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record_success(self, estimated_tokens: int, used_tokens: int) -> None:
+        with self._lock:
+            # correct the reservation made with the estimate before the call
+            self.tokens.refund(estimated_tokens - used_tokens)
+            self._consecutive_limits = 0
+            self.rate_factor = min(1.0, self.rate_factor + self.RECOVERY_STEP)
+
+    def record_rate_limited(self, retry_after: float) -> float:
+        """
+        Backs off after a rate limit error, returns the seconds until calls are let through again.
+        """
+        with self._lock:
+            self.rate_limited += 1
+            self._consecutive_limits += 1
+            self.rate_factor = max(self.MIN_RATE_FACTOR, self.rate_factor / 2)
+            delay = retry_after or min(60.0, 2.0 ** self._consecutive_limits)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            return delay
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "rate_factor": self.rate_factor,
+            "waited_seconds": self.waited,
+            "wait_time": latency_summary(self._wait_times),
+        }
+
+
+class RateLimiter:
+    """
+    Shared registry of the per provider and model limiters of a process.
+    """
+
+    def __init__(self, limits: dict[str, dict[str, int]], default_limit: dict[str, int]):
+        self.limits = limits
+        self.default_limit = default_limit
+        self._limiters: dict[str, ProviderLimiter] = {}
+        self._lock = Lock()
+
+    def get(self, provider: str, model: str) -> ProviderLimiter:
+        key = f"{provider}/{model}"
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limit = self.limits.get(key) or self.limits.get(provider) or self.default_limit
+                limiter = ProviderLimiter(limit["requests_per_minute"], limit["tokens_per_minute"])
+                self._limiters[key] = limiter
+            return limiter
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {key: limiter.stats() for key, limiter in self._limiters.items()}
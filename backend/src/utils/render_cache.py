@@ -0,0 +1,207 @@
+from collections import OrderedDict
+from threading import Lock
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+
+from loguru import logger
+
+
+def frame_key(**inputs) -> str:
+    """
+    Returns a content address for a frame, the SHA-256 of its canonical render inputs.
+    """
+    payload = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Checks an If-None-Match header value against a strong ETag.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # weak comparison is what If-None-Match asks for, so W/ prefixes match as well
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+class RenderCache:
+    """
+    Bounded LRU of encoded frames keyed by their content address.
+    Frames evicted from memory are spilled to an optional directory on disk
+    and promoted back into memory when they are requested again.
+    Only the in-memory step runs on the event loop, the spill tier's disk I/O runs in a thread.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entries: int,
+        spill_dir: str | None = None,
+        spill_max_bytes: int = 0,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+
+        self._frames: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        # evicted from memory, still being written to the spill directory
+        self._spilling: dict[str, bytes] = {}
+        self._lock = Lock()
+        self._spilled: OrderedDict[str, int] = OrderedDict()
+        self._spilled_bytes = 0
+        self._spill_lock = Lock()
+
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._index_spill_dir()
+
+    async def get(self, key: str) -> bytes | None:
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return frame
+            frame = self._spilling.get(key)
+            if frame is not None:
+                self.hits += 1
+                return frame
+
+        frame = await asyncio.to_thread(self._read_spilled, key) if key in self._spilled else None
+        if frame is None:
+            self.misses += 1
+            return None
+        self.spill_hits += 1
+        await self.put(key, frame)
+        return frame
+
+    async def put(self, key: str, frame: bytes) -> None:
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return
+            evicted = self._insert(key, frame)
+        if evicted and self.spill_dir:
+            await asyncio.to_thread(self._spill_evicted, evicted)
+
+    async def clear(self) -> None:
+        """
+        Drops every cached frame from both tiers.
+        """
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+        await asyncio.to_thread(self._clear_spilled)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.spill_hits + self.misses
+        return {
+            "entries": len(self._frames),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "spilled_entries": len(self._spilled),
+            "spilled_bytes": self._spilled_bytes,
+            "hits": self.hits,
+            "spill_hits": self.spill_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.spill_hits) / lookups if lookups else 0.0,
+        }
+
+    def _insert(self, key: str, frame: bytes) -> list[tuple[str, bytes]]:
+        """
+        Adds the frame to memory and returns the frames evicted to make room, to be spilled.
+        """
+        if len(frame) > self.max_bytes:
+            evicted = [(key, frame)]
+        else:
+            self._frames[key] = frame
+            self._bytes += len(frame)
+            evicted = []
+            while self._bytes > self.max_bytes or len(self._frames) > self.max_entries:
+                evicted_key, evicted_frame = self._frames.popitem(last=False)
+                self._bytes -= len(evicted_frame)
+                self.evictions += 1
+                evicted.append((evicted_key, evicted_frame))
+        if self.spill_dir:
+            self._spilling.update(evicted)
+        return evicted
+
+    def _spill_evicted(self, evicted: list[tuple[str, bytes]]) -> None:
+        for key, frame in evicted:
+            self._spill(key, frame)
+            with self._lock:
+                self._spilling.pop(key, None)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.bin")
+
+    def _index_spill_dir(self) -> None:
+        entries = []
+        for filename in os.listdir(self.spill_dir):
+            if filename.endswith(".bin"):
+                stat = os.stat(os.path.join(self.spill_dir, filename))
+                entries.append((stat.st_mtime, filename.removesuffix(".bin"), stat.st_size))
+        for _, key, size in sorted(entries):
+            self._spilled[key] = size
+            self._spilled_bytes += size
+
+    def _spill(self, key: str, frame: bytes) -> None:
+        if not self.spill_dir or key in self._spilled:
+            return
+        try:
+            # write to a temporary file first so readers never see a partial frame
+            fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(frame)
+            os.replace(tmp_path, self._spill_path(key))
+        except OSError as e:
+            logger.warning(f"Could not spill frame {key}: {e}")
+            return
+        with self._spill_lock:
+            if key in self._spilled:
+                return
+            self._spilled[key] = len(frame)
+            self._spilled_bytes += len(frame)
+            while self._spilled_bytes > self.spill_max_bytes and self._spilled:
+                self._remove_spilled(next(iter(self._spilled)))
+
+    def _read_spilled(self, key: str) -> bytes | None:
+        try:
+            with open(self._spill_path(key), "rb") as f:
+                frame = f.read()
+        except OSError:
+            with self._spill_lock:
+                if key in self._spilled:
+                    self._spilled_bytes -= self._spilled.pop(key)
+            return None
+        with self._spill_lock:
+            if key in self._spilled:
+                self._spilled.move_to_end(key)
+        return frame
+
+    def _clear_spilled(self) -> None:
+        with self._spill_lock:
+            for key in list(self._spilled):
+                self._remove_spilled(key)
+
+    def _remove_spilled(self, key: str) -> None:
+        # called with the spill lock held
+        self._spilled_bytes -= self._spilled.pop(key)
+        try:
+            os.remove(self._spill_path(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,131 @@
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+import asyncio
+import time
+
+from utils.latency_stats import latency_summary
+
+
+class RenderQueueFull(Exception):
+    """
+    Raised when the render queue is full and the render was not accepted.
+    """
+
+
+def _timed_call(
+    submitted_at: float, fn: Callable, args: tuple, kwargs: dict
+) -> tuple[Any, float, float]:
+    # wall clock time, comparable between the server and a worker process
+    started_at = time.time()
+    result = fn(*args, **kwargs)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable, *args) -> None:
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        # the loop was closed, nothing is waiting for the counters anymore
+        pass
+
+
+class RenderExecutor:
+    """
+    Runs blocking render work in a thread or process pool with a bounded queue.
+    At most `workers + max_queue` renders are accepted at once, further renders
+    are rejected with RenderQueueFull instead of piling up behind the workers.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = 2,
+        max_queue: int = 32,
+        initializer: Callable[[], None] | None = None,
+        samples: int = 1000,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown render executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.initializer = initializer
+        self._executor: Executor | None = None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_times: deque[float] = deque(maxlen=samples)
+        self._render_times: deque[float] = deque(maxlen=samples)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=self.initializer
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="render",
+                    initializer=self.initializer,
+                )
+        return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Runs fn in the pool and returns its result.
+        Raises RenderQueueFull if the queue has no room for another render.
+        """
+        # the event loop is single threaded, so the check and increment cannot race
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise RenderQueueFull()
+
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.executor.submit(_timed_call, time.time(), fn, args, kwargs)
+        except Exception:
+            self.in_flight -= 1
+            self.failed += 1
+            raise
+        # the render holds its slot until the pool is done with it, even if the caller stops waiting
+        future.add_done_callback(lambda done: _call_soon(loop, self._finished, done))
+        result, _, _ = await asyncio.wrap_future(future)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_time": latency_summary(self._wait_times),
+            "render_time": latency_summary(self._render_times),
+        }
+
+    def _finished(self, future: Future) -> None:
+        # runs on the event loop once the pool finished or cancelled the render
+        self.in_flight -= 1
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.failed += 1
+            return
+        _, wait_time, render_time = future.result()
+        self.completed += 1
+        self._wait_times.append(wait_time)
+        self._render_times.append(render_time)
@@ -0,0 +1,106 @@
+from threading import Lock
+import hashlib
+import json
+import os
+import tempfile
+
+
+RESPONSE_STORE_MODES = ("record", "replay", "passthrough")
+
+
+class ResponseNotRecorded(Exception):
+    """
+    Raised in replay mode for an LLM call that is not in the store.
+    """
+
+
+class ResponseStore:
+    """
+    Persistent store of LLM responses keyed by a hash of the model, the messages
+    (system message included) and the tools of the call, the run and the number of the call. Entries are JSON files sharded
+    over two directory levels and written atomically, so concurrent runs can share the store.
+    """
+
+    def __init__(self, directory: str, mode: str = "passthrough"):
+        if mode not in RESPONSE_STORE_MODES:
+            raise ValueError(f"Unknown response store mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "passthrough"
+
+    @staticmethod
+    def key(model: str, messages: list[dict], tools: list | None, seed: int | None = None, call: int = 0) -> str:
+        """
+        seed identifies the conversation run and call numbers the LLM calls of an agent within it,
+        so repeated runs and retries of an identical prompt get their own responses.
+        """
+        payload = json.dumps(
+            {"model": model, "messages": messages, "tools": tools or [], "seed": seed, "call": call},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key[2:4], f"{key}.json")
+
+    def get(self, key: str) -> dict | None:
+        """
+        Returns the stored entry, its "response" is the extracted reply (text or tool call dict).
+        Raises ResponseNotRecorded on a miss in replay mode.
+        """
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            if self.mode == "replay":
+                raise ResponseNotRecorded(f"No recorded response for LLM call {key}")
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.bytes_read += len(data)
+        return json.loads(data)
+
+    def put(self, key: str, model: str, response: str | dict | None) -> None:
+        data = json.dumps({"model": model, "response": response}, indent=1).encode("utf-8")
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self.writes += 1
+            self.bytes_written += len(data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,92 @@
+from typing import AsyncIterator, Awaitable, Callable, Hashable, TypeVar
+import asyncio
+
+
+T = TypeVar("T")
+
+
+class _Broadcast:
+    """
+    Chunks of one in-flight stream, kept until the stream ends so late subscribers can catch up.
+    """
+
+    def __init__(self):
+        self.chunks: list = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.changed = asyncio.Condition()
+
+    async def pump(self, source: AsyncIterator) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                async with self.changed:
+                    self.changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            async with self.changed:
+                self.changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator:
+        sent = 0
+        while True:
+            while sent < len(self.chunks):
+                yield self.chunks[sent]
+                sent += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.done or sent < len(self.chunks))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight call.
+    Callers arriving while a call for their key runs wait for it and share its result
+    (or its exception). A caller that is cancelled does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self._streams: dict[Hashable, _Broadcast] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stream(self, key: Hashable, source: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """
+        Streaming variant of do: one source stream runs per key and every caller gets all of its chunks,
+        callers joining late first receive the chunks produced so far. The source runs to its end
+        in the background even if all callers go away.
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.calls += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            task = asyncio.ensure_future(broadcast.pump(source()))
+            task.add_done_callback(lambda _: self._streams.pop(key, None))
+        else:
+            self.coalesced += 1
+        return broadcast.subscribe()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight) + len(self._streams),
+            "upstream_calls": self.calls,
+            "coalesced": self.coalesced,
+        }
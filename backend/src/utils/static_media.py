@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from threading import Lock
+import hashlib
+import mimetypes
+import os
+import re
+
+
+@dataclass(frozen=True)
+class MediaFile:
+    data: bytes
+    etag: str
+    media_type: str
+    mtime: float
+
+
+class StaticMedia:
+    """
+    Keeps small static media files, such as sound effects, resident in memory.
+    A file is read again when its modification time changes.
+    """
+
+    def __init__(self, files: dict[str, str]):
+        self._files = dict(files)
+        self._loaded: dict[str, MediaFile] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._files
+
+    def preload(self) -> None:
+        for name in self._files:
+            self.get(name)
+
+    def get(self, name: str) -> MediaFile:
+        path = self._files[name]
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            loaded = self._loaded.get(name)
+            if loaded is not None and loaded.mtime == mtime:
+                self.hits += 1
+                return loaded
+
+            with open(path, "rb") as f:
+                data = f.read()
+            loaded = MediaFile(
+                data=data,
+                etag=f'"{hashlib.sha256(data).hexdigest()[:32]}"',
+                media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                mtime=mtime,
+            )
+            self._loaded[name] = loaded
+            self.loads += 1
+            return loaded
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._loaded),
+            "bytes": sum(len(media.data) for media in self._loaded.values()),
+            "hits": self.hits,
+            "loads": self.loads,
+        }
+
+
+def parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parses a single range Range header into an inclusive (start, end) byte range.
+    Returns None when the whole file should be sent: no header, or a multi-range request.
+
+    Raises:
+        ValueError: The range is malformed or not satisfiable
+    """
+    if not header:
+        return None
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header)
+    if match is None:
+        if header.strip().startswith("bytes=") and "," in header:
+            return None
+        raise ValueError(f"Invalid range: {header}")
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        # suffix range, the last n bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    else:
+        raise ValueError(f"Invalid range: {header}")
+
+    if start >= size or start > end:
+        raise ValueError(f"Range not satisfiable: {header}")
+    return start, end
+
+
+SOUND_EFFECTS: dict[str, str] = {
+    "shock": "static/electric-shock-cut.mp3",
+}
+
+sound_effects = StaticMedia(SOUND_EFFECTS)
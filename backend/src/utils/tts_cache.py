@@ -0,0 +1,187 @@
+from threading import Lock, Thread
+import hashlib
+import json
+import os
+import re
+import tempfile
+import unicodedata
+
+from loguru import logger
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text for cache lookups, so formatting differences do not miss the cache.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class TTSCache:
+    """
+    Disk-backed cache of generated speech keyed by role, voice settings and normalized text.
+    Files are written atomically, so several server workers can share the directory.
+    When the cache grows over max_bytes a background thread evicts the least recently used
+    files down to low_water of max_bytes, a hit refreshes the modification time of its file.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, extension: str = "mp3", low_water: float = 0.9):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.extension = extension
+        self._lock = Lock()
+        self._evicting = False
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._size = self._scan_size()
+
+    @staticmethod
+    def key(role: str, voice_settings: dict, text: str) -> str:
+        payload = json.dumps(
+            {"role": role, "voice": voice_settings, "text": normalize_text(text)},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{self.extension}")
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns the path of the cached audio, or None on a miss.
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def contains(self, key: str) -> bool:
+        """
+        Checks for an entry without counting a lookup or refreshing it.
+        """
+        return os.path.exists(self.path(key))
+
+    def put(self, key: str, audio: bytes) -> str:
+        with self.writer(key) as writer:
+            writer.write(audio)
+        return self.path(key)
+
+    def writer(self, key: str) -> "CacheWriter":
+        """
+        Returns a writer filling the entry chunk by chunk, the entry appears once the writer
+        is closed without an error.
+        """
+        return CacheWriter(self, key)
+
+    def _committed(self, size: int) -> None:
+        with self._lock:
+            self.writes += 1
+            self._size += size
+            if self._size <= self.max_bytes or self._evicting:
+                return
+            self._evicting = True
+        # commits happen on the event loop, the directory scan must not block it
+        Thread(target=self._evict, name="tts-cache-evict", daemon=True).start()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _files(self) -> list[tuple[float, int, str]]:
+        files = []
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith(f".{self.extension}"):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self) -> None:
+        try:
+            with self._lock:
+                size_before = self._size
+            # other workers write to the same directory, so the real size is taken from disk
+            files = sorted(self._files())
+            size = sum(file_size for _, file_size, _ in files)
+            target = int(self.max_bytes * self.low_water)
+            evicted = 0
+            for _, file_size, path in files:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= file_size
+                evicted += 1
+            with self._lock:
+                # entries committed during the scan were added meanwhile
+                self._size += size - size_before
+                self.evictions += evicted
+            logger.info(f"Evicted {evicted} files from the TTS cache, down to {size} bytes")
+        finally:
+            with self._lock:
+                self._evicting = False
+
+
+class CacheWriter:
+    """
+    Writes a cache entry to a temporary file and renames it into place on commit,
+    readers never see a partially written entry.
+    """
+
+    def __init__(self, cache: TTSCache, key: str):
+        self.cache = cache
+        self.path = cache.path(key)
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> None:
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        self.cache._committed(self.size)
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self) -> "CacheWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
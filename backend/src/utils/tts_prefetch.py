@@ -0,0 +1,196 @@
+from collections import OrderedDict
+import asyncio
+import threading
+
+from loguru import logger
+
+from config.tts_settings import (
+    TTS_CACHE_DIR,
+    TTS_CACHE_MAX_BYTES,
+    TTS_PREFETCH_WORKERS,
+    TTS_PREFETCH_QUEUE_SIZE,
+)
+from models import Roles
+from utils.single_flight import SingleFlight
+from utils.tts_cache import TTSCache
+from utils.tts_stream import provider_voice_settings, stream_and_cache
+
+
+class TTSPrefetcher:
+    """
+    Generates speech for conversation messages as soon as they are produced, ahead of playback,
+    so the client's request for a line is normally answered from the cache.
+
+    A fixed number of worker tasks on the server's event loop drain a bounded queue, lines that
+    do not fit in the queue are left to on-demand synthesis. Generation goes through the same
+    single flight as client requests, so a client asking for a line being prefetched joins it.
+    """
+
+    def __init__(
+        self,
+        cache: TTSCache,
+        flights: SingleFlight,
+        voice_settings: dict[str, dict],
+        workers: int,
+        max_pending: int,
+        url_prefix: str = "/api/tts/audio",
+        static_audio: dict[str, str] | None = None,
+    ):
+        self.cache = cache
+        self.flights = flights
+        self.voice_settings = voice_settings
+        self.workers = workers
+        self.max_pending = max_pending
+        self.url_prefix = url_prefix
+        # speaker -> URL of a fixed sound, e.g. the shock effect
+        self.static_audio = static_audio or {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._queued: set[str] = set()
+        # key -> (role, text) of recently submitted lines, lets audio URLs be resolved
+        self._lines: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self._lines_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """
+        Starts the workers on the running event loop, called from the server's lifespan.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.max_pending)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def key(self, role: str, text: str) -> str:
+        return self.cache.key(role, self.voice_settings.get(role, {}), text)
+
+    def lookup(self, key: str) -> tuple[str, str] | None:
+        """
+        Returns the role and text of a submitted line.
+        """
+        with self._lines_lock:
+            return self._lines.get(key)
+
+    def submit(self, message: dict) -> dict:
+        """
+        Queues speech generation for a converted message (speaker, text). Safe to call from any thread.
+
+        Returns:
+            dict: audio_url and audio_status ("ready" or "pending") for the SSE event,
+                empty for messages without speech
+        """
+        role, text = message.get("speaker"), message.get("text", "")
+        if role in self.static_audio:
+            return {"audio_url": self.static_audio[role], "audio_status": "ready"}
+        if role not in self.voice_settings or not text:
+            return {}
+
+        key = self.key(role, text)
+        with self._lines_lock:
+            self._lines[key] = (role, text)
+            self._lines.move_to_end(key)
+            while len(self._lines) > self.max_pending * 4:
+                self._lines.popitem(last=False)
+
+        if self.cache.contains(key):
+            status = "ready"
+        else:
+            status = "pending"
+            self.submitted += 1
+            self._enqueue(key)
+        return {"audio_url": f"{self.url_prefix}/{key}", "audio_status": status}
+
+    def stream(self, key: str, role: str, text: str):
+        """
+        Speech of a line, shared with a generation already in flight for it.
+        """
+        return self.flights.stream(key, lambda: stream_and_cache(self.cache, key, text, Roles(role)))
+
+    async def audio(self, role: str, text: str) -> bytes:
+        """
+        Complete speech of a line, read from the cache or generated through the single flight.
+        """
+        key = self.key(role, text)
+        path = self.cache.get(key)
+        if path is not None:
+            try:
+                return await asyncio.to_thread(_read_file, path)
+            except FileNotFoundError:
+                # evicted in between
+                pass
+        return b"".join([chunk async for chunk in self.stream(key, role, text)])
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    def _enqueue(self, key: str) -> None:
+        if self._loop is None or self._loop.is_closed():
+            self.dropped += 1
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(key)
+        else:
+            self._loop.call_soon_threadsafe(self._put, key)
+
+    def _put(self, key: str) -> None:
+        if key in self._queued:
+            return
+        try:
+            self._queue.put_nowait(key)
+            self._queued.add(key)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _work(self) -> None:
+        while True:
+            key = await self._queue.get()
+            self._queued.discard(key)
+            try:
+                line = self.lookup(key)
+                if line is not None and not self.cache.contains(key):
+                    async for _ in self.stream(key, *line):
+                        pass
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Prefetching TTS {key} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Shared by the server's TTS endpoints and the video export
+tts_cache = TTSCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES)
+tts_flights = SingleFlight()
+tts_prefetcher = TTSPrefetcher(
+    tts_cache,
+    tts_flights,
+    provider_voice_settings(),
+    workers=TTS_PREFETCH_WORKERS,
+    max_pending=TTS_PREFETCH_QUEUE_SIZE,
+    static_audio={"SHOCKING_DEVICE": "/api/sfx/shock"},
+)
@@ -0,0 +1,119 @@
+from typing import AsyncIterator
+import hashlib
+import inspect
+
+from openai import AsyncOpenAI
+
+import audio.tts as tts
+from config.tts_settings import TTS_PROVIDER, OPENAI_TTS_VOICE_SETTINGS
+from models import Roles
+from utils.tts_cache import TTSCache
+
+
+CHUNK_SIZE = 16 * 1024
+
+_openai_client: AsyncOpenAI | None = None
+
+
+def openai_client() -> AsyncOpenAI:
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI()
+    return _openai_client
+
+
+async def openai_speech_chunks(message: str, role: Roles) -> AsyncIterator[bytes]:
+    """
+    Yields the speech of the OpenAI speech endpoint as it arrives, with the role's voice settings.
+    """
+    settings = OPENAI_TTS_VOICE_SETTINGS[role.value]
+    async with openai_client().audio.speech.with_streaming_response.create(
+        model=settings["model"],
+        voice=settings["voice"],
+        input=message,
+        speed=settings["speed"],
+        response_format=settings["format"],
+    ) as response:
+        async for chunk in response.iter_bytes(CHUNK_SIZE):
+            yield chunk
+
+
+async def audio_tts_chunks(message: str, role: Roles) -> AsyncIterator[bytes]:
+    """
+    Yields the speech of audio.tts. Its stream_tts is passed on as the provider produces the
+    chunks, without one the complete audio of generate_tts is sliced into views without copying it.
+    """
+    stream_tts = getattr(tts, "stream_tts", None)
+    if stream_tts is not None:
+        async for chunk in stream_tts(message, role):
+            yield chunk
+        return
+
+    buffer = (await tts.generate_tts(message, role)).getbuffer()
+    for offset in range(0, len(buffer), CHUNK_SIZE):
+        yield buffer[offset:offset + CHUNK_SIZE]
+
+
+def audio_tts_voice_settings() -> dict[str, dict]:
+    """
+    Voice settings of audio.tts per role. The module chooses its voices itself: they are its
+    voice_settings(role) when it has one, otherwise the hash of its source, so a changed
+    provider does not serve the audio of the previous one from the cache.
+    """
+    voice_settings = getattr(tts, "voice_settings", None)
+    if voice_settings is not None:
+        return {role.value: {"provider": "audio.tts", **voice_settings(role)} for role in Roles}
+
+    try:
+        source = hashlib.sha256(inspect.getsource(tts).encode("utf-8")).hexdigest()
+    except (OSError, TypeError):
+        # no source file, e.g. a compiled module
+        source = None
+    return {role.value: {"provider": "audio.tts", "source": source} for role in Roles}
+
+
+def provider_voice_settings() -> dict[str, dict]:
+    """
+    Voice settings per role of the configured provider, part of the TTS cache key.
+    """
+    if TTS_PROVIDER == "openai":
+        return {role: {"provider": "openai", **settings} for role, settings in OPENAI_TTS_VOICE_SETTINGS.items()}
+    return audio_tts_voice_settings()
+
+
+async def iter_tts_chunks(message: str, role: Roles) -> AsyncIterator[bytes]:
+    """
+    Yields synthesized speech of the configured provider.
+    """
+    chunks = openai_speech_chunks if TTS_PROVIDER == "openai" else audio_tts_chunks
+    async for chunk in chunks(message, role):
+        yield chunk
+
+
+async def stream_and_cache(
+    cache: TTSCache, key: str, message: str, role: Roles
+) -> AsyncIterator[bytes]:
+    """
+    Streams the speech while filling the cache entry with the same chunks.
+    The entry is only committed when the whole stream was received.
+    """
+    with cache.writer(key) as writer:
+        async for chunk in iter_tts_chunks(message, role):
+            writer.write(chunk)
+            yield chunk
+
+
+async def primed(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Waits for the first chunk before handing the stream on, so a provider failing
+    before any audio was produced raises here instead of after the response started.
+    """
+    first = await anext(chunks, None)
+
+    async def resumed() -> AsyncIterator[bytes]:
+        if first is not None:
+            yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return resumed()
@@ -0,0 +1,350 @@
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition, Thread
+from typing import AsyncIterator, Iterable, Iterator
+import argparse
+import asyncio
+import os
+import subprocess
+
+import ffmpeg
+from loguru import logger
+
+from config.render_settings import (
+    VIDEO_FPS,
+    VIDEO_GAP_SECONDS,
+    VIDEO_MIN_FRAME_SECONDS,
+    VIDEO_SECONDS_PER_CHAR,
+    VIDEO_SHOCK_SECONDS,
+    VIDEO_TTS_LOOKAHEAD,
+)
+from renderer import frame_args_for_message, game_renderer
+from utils.static_media import sound_effects
+from utils.chat_utils import load_experiment_result
+from utils.tts_prefetch import tts_prefetcher
+
+
+AUDIO_SAMPLE_RATE = 24000
+
+# Output container -> ffmpeg output options, both are written so they can be streamed
+CONTAINERS: dict[str, dict] = {
+    "mp4": {
+        "format": "mp4",
+        "vcodec": "libx264",
+        "preset": "veryfast",
+        "tune": "stillimage",
+        "pix_fmt": "yuv420p",
+        "acodec": "aac",
+        # fragmented mp4 does not need a seekable output, a fragment is written every second
+        # instead of at keyframes, so the output flows long before the encoding ends
+        "movflags": "empty_moov+default_base_moof",
+        "frag_duration": 1000000,
+    },
+    "webm": {
+        "format": "webm",
+        "vcodec": "libvpx-vp9",
+        "deadline": "realtime",
+        "cpu-used": 8,
+        "pix_fmt": "yuv420p",
+        "acodec": "libopus",
+    },
+}
+MEDIA_TYPES = {"mp4": "video/mp4", "webm": "video/webm"}
+
+
+class VideoExportError(RuntimeError):
+    """
+    Raised when the video could not be encoded completely.
+    """
+
+
+@dataclass
+class Segment:
+    """
+    One frame of the video, shown for the given duration, with its mono 16-bit PCM audio.
+    """
+
+    frame: dict
+    duration: float
+    audio: bytes = b""
+
+
+def decode_audio(mp3: bytes) -> bytes:
+    """
+    Decodes an mp3 to mono 16-bit PCM through ffmpeg pipes.
+    """
+    pcm, _ = (
+        ffmpeg.input("pipe:")
+        .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=AUDIO_SAMPLE_RATE)
+        .run(input=mp3, capture_stdout=True, capture_stderr=True)
+    )
+    return pcm
+
+
+def text_duration(message: dict) -> float:
+    if message.get("speaker") == "SHOCKING_DEVICE":
+        return VIDEO_SHOCK_SECONDS
+    return max(VIDEO_MIN_FRAME_SECONDS, len(message.get("text", "")) * VIDEO_SECONDS_PER_CHAR)
+
+
+async def speech_segment(message: dict) -> Segment:
+    """
+    Segment of a message lasting as long as its speech, from the TTS cache or a generation
+    shared with the server's TTS requests and prefetching.
+    """
+    if message.get("speaker") == "SHOCKING_DEVICE":
+        mp3 = sound_effects.get("shock").data
+    else:
+        mp3 = await tts_prefetcher.audio(message["speaker"], message["text"])
+    audio = await asyncio.to_thread(decode_audio, mp3)
+    audio_seconds = len(audio) / (2 * AUDIO_SAMPLE_RATE)
+    return Segment(
+        frame=frame_args_for_message(message),
+        duration=audio_seconds + VIDEO_GAP_SECONDS,
+        audio=audio,
+    )
+
+
+async def iter_segments(
+    messages: list[dict], use_tts: bool = True, lookahead: int = VIDEO_TTS_LOOKAHEAD
+) -> AsyncIterator[Segment]:
+    """
+    Yields the video segments of a conversation in order. With TTS every frame lasts as long as
+    its audio and the speech of up to `lookahead` following messages is prepared concurrently,
+    otherwise the duration follows the text length.
+    """
+    if not use_tts:
+        for message in messages:
+            yield Segment(frame=frame_args_for_message(message), duration=text_duration(message))
+        return
+
+    pending: deque[asyncio.Task] = deque()
+    try:
+        for message in messages:
+            pending.append(asyncio.create_task(speech_segment(message)))
+            if len(pending) > lookahead:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class SegmentFeed:
+    """
+    Hands segments from the planner on the event loop to the encoder's writer threads.
+    Every iteration yields all segments in order, waiting for those not planned yet.
+    If planning failed, iterating raises VideoExportError once the planned segments are used up.
+    """
+
+    def __init__(self):
+        self._segments: list[Segment] = []
+        self._closed = False
+        self._changed = Condition()
+        self.error: Exception | None = None
+
+    def append(self, segment: Segment) -> None:
+        with self._changed:
+            self._segments.append(segment)
+            self._changed.notify_all()
+
+    def close(self) -> None:
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def fail(self, error: Exception) -> None:
+        with self._changed:
+            self.error = error
+            self._closed = True
+            self._changed.notify_all()
+
+    def __iter__(self) -> Iterator[Segment]:
+        sent = 0
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._closed or sent < len(self._segments))
+                if sent == len(self._segments):
+                    if self.error is not None:
+                        raise VideoExportError("Planning the video segments failed") from self.error
+                    return
+                segment = self._segments[sent]
+            sent += 1
+            yield segment
+
+
+async def feed_segments(segments: AsyncIterator[Segment], feed: SegmentFeed) -> None:
+    try:
+        async for segment in segments:
+            feed.append(segment)
+    except Exception as e:
+        logger.error(f"Planning the video segments failed: {e}")
+        feed.fail(e)
+    finally:
+        feed.close()
+
+
+def _frame_count(segment: Segment, fps: int) -> int:
+    return max(1, round(segment.duration * fps))
+
+
+def _write_frames(process: subprocess.Popen, segments: Iterable[Segment], fps: int, size: tuple[int, int]) -> None:
+    stdin = process.stdin
+    try:
+        for segment in segments:
+            frame = game_renderer.compose_frame(
+                segment.frame["participant_message"],
+                segment.frame["professor_message"],
+                segment.frame["learner_message"],
+                segment.frame["display_shock"],
+            )
+            # yuv420p needs even dimensions
+            raw = frame.crop((0, 0, *size)).convert("RGB").tobytes()
+            for _ in range(_frame_count(segment, fps)):
+                stdin.write(raw)
+    except BrokenPipeError:
+        logger.warning("ffmpeg closed its input before all frames were written")
+    except VideoExportError:
+        # ending the input would finish a shortened but valid video
+        process.kill()
+    finally:
+        stdin.close()
+
+
+def _write_audio(process: subprocess.Popen, audio_fd: int, segments: Iterable[Segment], fps: int) -> None:
+    try:
+        with os.fdopen(audio_fd, "wb") as audio_pipe:
+            for segment in segments:
+                # pad every segment with silence to the exact length of its frames
+                samples = _frame_count(segment, fps) * AUDIO_SAMPLE_RATE // fps
+                audio = segment.audio[: samples * 2]
+                audio_pipe.write(audio)
+                audio_pipe.write(bytes(samples * 2 - len(audio)))
+    except BrokenPipeError:
+        logger.warning("ffmpeg closed its audio input before all samples were written")
+    except VideoExportError:
+        process.kill()
+
+
+def start_encoder(
+    segments: Iterable[Segment], with_audio: bool, container: str = "mp4", fps: int = VIDEO_FPS
+) -> subprocess.Popen:
+    """
+    Starts ffmpeg encoding the segments to its stdout. Frames are rendered and piped
+    straight into ffmpeg's stdin, the audio track goes through a second pipe.
+    The segments are iterated once by each writer thread, a SegmentFeed lets encoding
+    start while later segments are still being planned.
+    """
+    base = game_renderer.base_scene()
+    size = (base.width - base.width % 2, base.height - base.height % 2)
+
+    video = ffmpeg.input(
+        "pipe:0", format="rawvideo", pix_fmt="rgb24", s=f"{size[0]}x{size[1]}", framerate=fps
+    )
+    streams = [video]
+    pass_fds = ()
+    if with_audio:
+        audio_read_fd, audio_write_fd = os.pipe()
+        streams.append(
+            ffmpeg.input(f"pipe:{audio_read_fd}", format="s16le", ar=AUDIO_SAMPLE_RATE, ac=1)
+        )
+        pass_fds = (audio_read_fd,)
+
+    options = dict(CONTAINERS[container])
+    if not with_audio:
+        options.pop("acodec")
+    args = ffmpeg.output(*streams, "pipe:1", **options).global_args("-loglevel", "error").compile()
+
+    process = subprocess.Popen(
+        args,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        pass_fds=pass_fds,
+    )
+    Thread(target=_write_frames, args=(process, segments, fps, size), daemon=True).start()
+    if with_audio:
+        os.close(audio_read_fd)
+        Thread(target=_write_audio, args=(process, audio_write_fd, segments, fps), daemon=True).start()
+    return process
+
+
+def iter_encoded(process: subprocess.Popen, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Yields the encoded video from ffmpeg's stdout as it is produced.
+    """
+    try:
+        while chunk := process.stdout.read(chunk_size):
+            yield chunk
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            logger.error(f"ffmpeg exited with code {process.returncode}")
+
+
+async def stream_video(
+    messages: list[dict], container: str = "mp4", use_tts: bool = True
+) -> AsyncIterator[bytes]:
+    """
+    Async stream of the encoded video, for a StreamingResponse.
+    Encoding starts with the first segment while the speech of later messages is prepared.
+    Raises VideoExportError after the last chunk when the video is incomplete, so a response
+    already started is aborted instead of ending like a complete video.
+    """
+    feed = SegmentFeed()
+    planner = asyncio.create_task(feed_segments(iter_segments(messages, use_tts), feed))
+    process = start_encoder(feed, use_tts, container)
+    chunks = iter_encoded(process)
+    try:
+        while chunk := await asyncio.to_thread(next, chunks, b""):
+            yield chunk
+        if feed.error is not None:
+            raise VideoExportError("Planning the video segments failed") from feed.error
+        if process.returncode != 0:
+            raise VideoExportError(f"ffmpeg exited with code {process.returncode}")
+    finally:
+        planner.cancel()
+        if process.poll() is None:
+            process.kill()
+        chunks.close()
+
+
+def export_video(
+    experiment_id: str, output_path: str, use_tts: bool = True, results_dir: str = "results"
+) -> None:
+    """
+    Exports a stored experiment to a video file, the container follows the file extension.
+    """
+    container = os.path.splitext(output_path)[1].lstrip(".").lower()
+    if container not in CONTAINERS:
+        raise ValueError(f"Unsupported video container: {container}")
+
+    messages = load_experiment_result(experiment_id, results_dir)["messages"]
+
+    async def export() -> None:
+        with open(output_path, "wb") as f:
+            async for chunk in stream_video(messages, container, use_tts):
+                f.write(chunk)
+
+    try:
+        asyncio.run(export())
+    except BaseException:
+        # no incomplete video is left behind
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    logger.info(f"Exported experiment {experiment_id} to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a stored experiment as a video.")
+    parser.add_argument("experiment_id")
+    parser.add_argument("output", help="Output file, .mp4 or .webm")
+    parser.add_argument("--results-dir", default="results")
+    parser.add_argument(
+        "--no-tts", action="store_true", help="Time frames by text length and export without audio"
+    )
+    args = parser.parse_args()
+
+    export_video(args.experiment_id, args.output, use_tts=not args.no_tts, results_dir=args.results_dir)
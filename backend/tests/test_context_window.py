@@ -0,0 +1,130 @@
+from models import HistoryPolicy
+from utils.context_window import ContextWindow, pinned_facts_message, shock_voltages
+
+
+SYSTEM = {"role": "system", "content": "You are the participant."}
+FIRST = {"role": "user", "content": "The experiment starts."}
+
+
+def conversation(count: int) -> list[dict]:
+    return [{"role": "user", "content": f"message {i}"} for i in range(count)]
+
+
+def shock(voltage: int) -> list[dict]:
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [{"id": "call", "type": "function"}]},
+        {"role": "tool", "content": f"The button was pressed. Current voltage: {voltage} volts"},
+    ]
+
+
+def test_full_policy_sends_everything():
+    messages = [SYSTEM, FIRST, *conversation(100)]
+
+    assert ContextWindow(HistoryPolicy()).apply(messages) is messages
+
+
+def test_last_n_keeps_the_head_and_the_latest_messages():
+    window = ContextWindow(HistoryPolicy(kind="last_n", max_messages=5, trim_step=1))
+    rest = conversation(8)
+
+    applied = window.apply([SYSTEM, FIRST, *rest])
+
+    assert applied[:2] == [SYSTEM, FIRST]
+    assert applied[2]["content"].startswith("NARRATOR_MESSAGE: 3 earlier messages")
+    assert applied[3:] == rest[3:]
+
+
+def test_last_n_within_the_limit_is_unchanged():
+    messages = [SYSTEM, FIRST, *conversation(5)]
+
+    assert ContextWindow(HistoryPolicy(kind="last_n", max_messages=5)).apply(messages) is messages
+
+
+def test_messages_are_dropped_in_whole_steps():
+    window = ContextWindow(HistoryPolicy(kind="last_n", max_messages=10, trim_step=4))
+    rest = conversation(11)
+
+    # one message over the limit drops a whole step, the next calls keep the same prefix
+    first = window.apply([FIRST, *rest])
+    second = window.apply([FIRST, *rest, *conversation(2)])
+    assert first[2:] == rest[4:]
+    assert first[:2] == second[:2]
+    assert second[2 : len(first)] == first[2:]
+
+
+def test_window_never_starts_with_a_tool_response():
+    window = ContextWindow(HistoryPolicy(kind="last_n", max_messages=4, trim_step=1))
+    rest = [*conversation(2), *shock(15), *conversation(3)]
+
+    applied = window.apply([FIRST, *rest])
+
+    # the cut falls on the tool response, it moves past it
+    assert applied[2:] == rest[4:]
+
+
+def test_last_message_is_always_sent():
+    window = ContextWindow(HistoryPolicy(kind="last_n", max_messages=1, trim_step=10))
+    rest = conversation(3)
+
+    assert window.apply([FIRST, *rest])[2:] == rest[-1:]
+
+
+def test_token_budget_keeps_the_latest_messages_within_the_budget():
+    window = ContextWindow(HistoryPolicy(kind="token_budget", max_tokens=60, trim_step=1))
+    rest = [{"role": "user", "content": "x" * 80} for _ in range(10)]
+
+    applied = window.apply([FIRST, *rest])
+
+    # every message is estimated at about 30 tokens with its keys
+    assert len(applied) - 2 == 2
+
+
+def test_token_budget_always_keeps_the_last_message():
+    window = ContextWindow(HistoryPolicy(kind="token_budget", max_tokens=1, trim_step=1))
+    rest = [{"role": "user", "content": "x" * 400} for _ in range(3)]
+
+    assert window.apply([FIRST, *rest])[2:] == rest[-1:]
+
+
+def test_dropped_shocks_are_pinned():
+    dropped = [*conversation(1), *shock(15), *shock(30)]
+
+    assert shock_voltages(dropped) == [15, 30]
+    content = pinned_facts_message(dropped)["content"]
+    assert "2 shocks were administered in them (15, 30 volts)." in content
+    assert content.endswith("Current voltage: 30 volts")
+
+
+def test_no_dropped_shocks_pin_zero_volts():
+    content = pinned_facts_message(conversation(2))["content"]
+
+    assert "No shocks were administered in them." in content
+    assert content.endswith("Current voltage: 0 volts")
+
+
+def test_summary_policy_summarizes_only_newly_dropped_messages():
+    calls = []
+
+    def summarize(summary: str, messages: list[dict]) -> str:
+        calls.append([message["content"] for message in messages])
+        return f"{summary}+{len(messages)}"
+
+    window = ContextWindow(HistoryPolicy(kind="summary", max_messages=2, trim_step=2), summarize)
+    rest = conversation(6)
+
+    first = window.apply([FIRST, *rest])
+    second = window.apply([FIRST, *rest, *conversation(2)])
+
+    assert calls == [["message 0", "message 1", "message 2", "message 3"], ["message 4", "message 5"]]
+    assert first[1]["content"].startswith("NARRATOR_MESSAGE")
+    assert first[2]["content"] == "Summary of the earlier messages: +4"
+    assert second[2]["content"] == "Summary of the earlier messages: +4+2"
+
+
+def test_summary_starts_over_for_a_new_conversation():
+    window = ContextWindow(HistoryPolicy(kind="summary", max_messages=2, trim_step=2), lambda s, m: f"{s}+{len(m)}")
+
+    window.apply([FIRST, *conversation(8)])
+    applied = window.apply([FIRST, *conversation(4)])
+
+    assert applied[2]["content"] == "Summary of the earlier messages: +2"
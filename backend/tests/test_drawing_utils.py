@@ -0,0 +1,106 @@
+import random
+
+import pytest
+from PIL import Image
+
+from utils.drawing_utils import stretch_cloud
+
+
+def reference_stretch_cloud(cloud: Image.Image, new_width: int, new_height: int) -> Image.Image:
+    """
+    The per-pixel stretching adjust_cloud did before stretch_cloud, kept as the reference output.
+    """
+    base_width, base_height = cloud.size
+    new_cloud = Image.new("RGBA", (new_width, new_height), (0, 0, 0, 0))
+
+    mid_x = base_width // 2
+    mid_y = base_height // 2
+
+    top_left = cloud.crop((0, 0, mid_x, mid_y))
+    top_right = cloud.crop((mid_x, 0, base_width, mid_y))
+    bottom_left = cloud.crop((0, mid_y, mid_x, base_height))
+    bottom_right = cloud.crop((mid_x, mid_y, base_width, base_height))
+
+    new_cloud.paste(top_left, (0, 0), top_left)
+    new_cloud.paste(top_right, (new_width - (base_width - mid_x), 0), top_right)
+    new_cloud.paste(bottom_left, (0, new_height - (base_height - mid_y)), bottom_left)
+    new_cloud.paste(
+        bottom_right,
+        (new_width - (base_width - mid_x), new_height - (base_height - mid_y)),
+        bottom_right,
+    )
+
+    center_pixel = cloud.getpixel((mid_x, mid_y))
+
+    top_strip = cloud.crop((mid_x, 0, mid_x + 1, mid_y))
+    bottom_strip = cloud.crop((mid_x, mid_y, mid_x + 1, base_height))
+    left_strip = cloud.crop((0, mid_y, mid_x, mid_y + 1))
+    right_strip = cloud.crop((mid_x, mid_y, base_width, mid_y + 1))
+
+    for x in range(mid_x, new_width - (base_width - mid_x)):
+        for y in range(0, mid_y):
+            new_cloud.putpixel((x, y), top_strip.getpixel((0, y)))
+        for y in range(new_height - (base_height - mid_y), new_height):
+            rel_y = y - (new_height - (base_height - mid_y))
+            new_cloud.putpixel((x, y), bottom_strip.getpixel((0, rel_y)))
+
+    for y in range(mid_y, new_height - (base_height - mid_y)):
+        for x in range(0, mid_x):
+            new_cloud.putpixel((x, y), left_strip.getpixel((x, 0)))
+        for x in range(new_width - (base_width - mid_x), new_width):
+            rel_x = x - (new_width - (base_width - mid_x))
+            new_cloud.putpixel((x, y), right_strip.getpixel((rel_x, 0)))
+
+    for y in range(mid_y, new_height - (base_height - mid_y)):
+        for x in range(mid_x, new_width - (base_width - mid_x)):
+            new_cloud.putpixel((x, y), center_pixel)
+
+    return new_cloud
+
+
+def random_cloud(width: int, height: int, seed: int) -> Image.Image:
+    """
+    Noise with every alpha value, so masked and unmasked pastes give different pixels.
+    """
+    rng = random.Random(seed)
+    cloud = Image.new("RGBA", (width, height))
+    cloud.putdata([tuple(rng.randrange(256) for _ in range(4)) for _ in range(width * height)])
+    return cloud
+
+
+@pytest.mark.parametrize("base_size", [(64, 48), (65, 47), (7, 5), (2, 2)])
+@pytest.mark.parametrize(
+    "growth",
+    [
+        (0, 0),
+        (1, 0),
+        (0, 1),
+        (37, 0),  # width only
+        (0, 23),  # height only
+        (1, 1),
+        (150, 61),
+    ],
+)
+def test_stretch_cloud_matches_reference(base_size, growth):
+    width, height = base_size
+    cloud = random_cloud(width, height, seed=width * 1000 + height)
+    new_size = (width + growth[0], height + growth[1])
+
+    stretched = stretch_cloud(cloud, *new_size)
+
+    assert stretched.mode == "RGBA"
+    assert stretched.size == new_size
+    assert stretched.tobytes() == reference_stretch_cloud(cloud, *new_size).tobytes()
+
+
+@pytest.mark.parametrize("base_size", [(1, 1), (1, 9), (9, 1)])
+@pytest.mark.parametrize("growth", [(0, 0), (12, 0), (0, 12), (12, 12)])
+def test_stretch_cloud_one_pixel_sprites(base_size, growth):
+    width, height = base_size
+    cloud = random_cloud(width, height, seed=width * 1000 + height)
+    new_size = (width + growth[0], height + growth[1])
+
+    stretched = stretch_cloud(cloud, *new_size)
+
+    assert stretched.size == new_size
+    assert stretched.tobytes() == reference_stretch_cloud(cloud, *new_size).tobytes()
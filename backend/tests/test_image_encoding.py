@@ -0,0 +1,65 @@
+import io
+
+import pytest
+from PIL import Image
+
+from utils.image_encoding import encode_frame, negotiate_format
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, "png"),
+        ("", "png"),
+        ("*/*", "png"),
+        ("image/*", "png"),
+        ("text/html", "png"),
+        ("image/webp,*/*", "webp-lossless"),
+        ("image/png, image/webp", "png"),  # equal quality, the first one wins
+        ("image/png;q=0.8, image/webp;q=0.9", "webp-lossless"),
+        ("image/jpeg;q=0.5, image/png;q=0.4", "jpeg"),
+        ("IMAGE/WEBP", "webp-lossless"),
+        ("image/webp ; q=1.0 , image/png;q=0.2", "webp-lossless"),
+        ("image/webp;q=0, image/jpeg;q=0.1", "jpeg"),  # q=0 means not acceptable
+        ("image/webp;q=0, image/jpeg;q=0", "png"),
+        ("image/webp;q=oops, image/jpeg;q=0.1", "jpeg"),  # a malformed quality counts as 0
+        (",,image/jpeg", "jpeg"),
+    ],
+)
+def test_negotiate_format_from_accept(accept, expected):
+    assert negotiate_format(accept, None) == expected
+
+
+def test_negotiate_format_uses_the_configured_webp_format():
+    assert negotiate_format("image/webp", None, webp_format="webp") == "webp"
+
+
+@pytest.mark.parametrize(
+    "requested, expected",
+    [("png", "png"), ("JPG", "jpeg"), ("jpeg", "jpeg"), ("webp", "webp"), ("Webp-Lossless", "webp-lossless")],
+)
+def test_negotiate_format_explicit_format_wins_over_accept(requested, expected):
+    assert negotiate_format("image/png", requested) == expected
+
+
+def test_negotiate_format_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        negotiate_format("image/png", "gif")
+
+
+def test_encode_frame_scales_and_drops_alpha_for_jpeg():
+    image = Image.new("RGBA", (100, 50), (255, 0, 0, 128))
+
+    encoded = encode_frame(image, "jpeg", {"quality": 80}, scale=0.5)
+
+    with Image.open(io.BytesIO(encoded)) as decoded:
+        assert decoded.format == "JPEG"
+        assert decoded.mode == "RGB"
+        assert decoded.size == (50, 25)
+
+
+def test_encode_frame_never_scales_to_nothing():
+    encoded = encode_frame(Image.new("RGBA", (3, 3)), "png", scale=0.1)
+
+    with Image.open(io.BytesIO(encoded)) as decoded:
+        assert decoded.size == (1, 1)
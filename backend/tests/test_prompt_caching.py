@@ -0,0 +1,70 @@
+import copy
+
+from chat.prompt_caching import EPHEMERAL, add_cache_breakpoints
+
+
+TOOLS = [{"name": "first"}, {"name": "Administer-shock"}]
+
+
+def test_marks_the_last_tool_the_system_prompt_and_the_last_message():
+    params = {
+        "model": "claude",
+        "tools": TOOLS,
+        "system": "You are the professor.",
+        "messages": [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi"},
+        ],
+    }
+
+    marked = add_cache_breakpoints(params)
+
+    assert marked["tools"] == [{"name": "first"}, {"name": "Administer-shock", "cache_control": EPHEMERAL}]
+    assert marked["system"] == [{"type": "text", "text": "You are the professor.", "cache_control": EPHEMERAL}]
+    assert marked["messages"][0] == {"role": "user", "content": "Hello"}
+    assert marked["messages"][1] == {
+        "role": "assistant",
+        "content": [{"type": "text", "text": "Hi", "cache_control": EPHEMERAL}],
+    }
+
+
+def test_does_not_modify_the_request():
+    params = {
+        "tools": TOOLS,
+        "system": "System",
+        "messages": [{"role": "user", "content": [{"type": "text", "text": "a"}]}],
+    }
+    original = copy.deepcopy(params)
+
+    add_cache_breakpoints(params)
+
+    assert params == original
+
+
+def test_marks_the_last_block_of_a_message_with_blocks():
+    blocks = [
+        {"type": "tool_result", "tool_use_id": "toolu_1", "content": "pressed"},
+        {"type": "text", "text": "Go on"},
+    ]
+
+    marked = add_cache_breakpoints({"messages": [{"role": "user", "content": blocks}]})
+
+    assert marked["messages"][0]["content"] == [blocks[0], {**blocks[1], "cache_control": EPHEMERAL}]
+
+
+def test_skips_trailing_messages_that_can_not_be_marked():
+    messages = [
+        {"role": "user", "content": "Hello"},
+        {"role": "assistant", "content": ""},
+        {"role": "assistant", "content": [{"type": "text", "text": ""}]},
+    ]
+
+    marked = add_cache_breakpoints({"messages": messages})
+
+    assert marked["messages"][0]["content"] == [{"type": "text", "text": "Hello", "cache_control": EPHEMERAL}]
+    assert marked["messages"][1:] == messages[1:]
+
+
+def test_requests_without_tools_system_or_messages():
+    assert add_cache_breakpoints({"model": "claude"}) == {"model": "claude", "messages": []}
+    assert add_cache_breakpoints({"system": "", "tools": []}) == {"system": "", "tools": [], "messages": []}
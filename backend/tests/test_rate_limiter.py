@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils.rate_limiter import ProviderLimiter, RateLimiter, TokenBucket, provider_key, rate_limit_retry_after
+
+
+def test_token_bucket_starts_full():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+
+    assert bucket.reserve(60, 1.0, now) == 0.0
+    assert bucket.level == 0
+
+
+def test_token_bucket_overdraw_waits_until_the_debt_is_repaid():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+    bucket.reserve(60, 1.0, now)
+
+    # one unit per second, the third unit is free in three seconds
+    assert bucket.reserve(3, 1.0, now) == pytest.approx(3.0)
+    # callers queue behind the debt
+    assert bucket.reserve(1, 1.0, now) == pytest.approx(4.0)
+
+
+def test_token_bucket_refills_with_time_up_to_one_minute():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+    bucket.reserve(60, 1.0, now)
+
+    assert bucket.reserve(10, 1.0, now + 10) == 0.0
+    assert bucket.reserve(0, 1.0, now + 3600) == 0.0
+    assert bucket.level == 60
+
+
+def test_token_bucket_rate_factor_slows_the_refill():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+    bucket.reserve(60, 1.0, now)
+
+    assert bucket.reserve(1, 0.5, now) == pytest.approx(2.0)
+
+
+def test_token_bucket_refund_settles_the_estimate():
+    bucket = TokenBucket(100)
+    now = bucket._updated
+    bucket.reserve(50, 1.0, now)
+
+    bucket.refund(20)  # the call used less than estimated
+    assert bucket.level == 70
+    bucket.refund(-30)  # more than estimated
+    assert bucket.level == 40
+    bucket.refund(1000)
+    assert bucket.level == 100
+
+
+def test_provider_limiter_backs_off_and_recovers():
+    limiter = ProviderLimiter(requests_per_minute=1000, tokens_per_minute=100_000)
+
+    assert limiter.record_rate_limited(0) == 2.0
+    assert limiter.record_rate_limited(0) == 4.0
+    assert limiter.rate_factor == 0.25
+    # a Retry-After from the provider wins over the exponential delay
+    assert limiter.record_rate_limited(1.5) == 1.5
+
+    limiter.record_success(10, 10)
+    assert limiter.rate_factor == pytest.approx(0.125 + ProviderLimiter.RECOVERY_STEP)
+    assert limiter.stats()["rate_limited"] == 3
+
+
+def test_provider_limiter_rate_factor_has_a_floor():
+    limiter = ProviderLimiter(requests_per_minute=1000, tokens_per_minute=100_000)
+    for _ in range(20):
+        limiter.record_rate_limited(0.1)
+
+    assert limiter.rate_factor == ProviderLimiter.MIN_RATE_FACTOR
+
+
+def test_provider_limiter_acquire_within_budget_does_not_wait():
+    limiter = ProviderLimiter(requests_per_minute=10, tokens_per_minute=1000)
+
+    assert limiter.acquire(100) == 0.0
+    assert limiter.stats()["calls"] == 1
+
+
+def test_rate_limiter_picks_the_most_specific_limit():
+    limits = {
+        "openai/gpt-4o": {"requests_per_minute": 1, "tokens_per_minute": 10},
+        "openai": {"requests_per_minute": 2, "tokens_per_minute": 20},
+    }
+    rate_limiter = RateLimiter(limits, {"requests_per_minute": 3, "tokens_per_minute": 30})
+
+    assert rate_limiter.get("openai", "gpt-4o").requests.per_minute == 1
+    assert rate_limiter.get("openai", "gpt-4o-mini").requests.per_minute == 2
+    assert rate_limiter.get("anthropic", "claude").requests.per_minute == 3
+    assert rate_limiter.get("openai", "gpt-4o") is rate_limiter.get("openai", "gpt-4o")
+
+
+@pytest.mark.parametrize(
+    "api_type, base_url, expected",
+    [
+        (None, None, "openai"),
+        ("anthropic", None, "anthropic"),
+        ("openai", "https://openrouter.ai/api/v1", "openai:openrouter.ai"),
+        (None, "http://localhost:8001/v1", "openai:localhost:8001"),
+    ],
+)
+def test_provider_key(api_type, base_url, expected):
+    assert provider_key(api_type, base_url) == expected
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (ValueError("bad request"), None),
+        (SimpleNamespace(status_code=500), None),
+        (SimpleNamespace(status_code=429), 0.0),
+        (SimpleNamespace(code=429, response=SimpleNamespace(headers={"retry-after": "7"})), 7.0),
+        (SimpleNamespace(status_code=429, response=SimpleNamespace(headers={"retry-after": "soon"})), 0.0),
+        (RateLimitError(), 0.0),
+    ],
+)
+def test_rate_limit_retry_after(error, expected):
+    assert rate_limit_retry_after(error) == expected
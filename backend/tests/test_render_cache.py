@@ -0,0 +1,159 @@
+import asyncio
+import os
+
+import pytest
+
+from utils.render_cache import RenderCache, etag_matches, frame_key
+
+
+ETAG = '"abc123"'
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (None, False),
+        ("", False),
+        ('"abc123"', True),
+        ('W/"abc123"', True),  # weak comparison
+        ('"other"', False),
+        ('"other", "abc123"', True),
+        ('"other",W/"abc123"', True),
+        ("*", True),
+        ("abc123", False),  # unquoted
+        ('"abc"', False),
+    ],
+)
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, ETAG) is expected
+
+
+def test_frame_key_is_independent_of_argument_order():
+    assert frame_key(a=1, b="x") == frame_key(b="x", a=1)
+    assert frame_key(a=1, b="x") != frame_key(a=2, b="x")
+
+
+def test_lru_evicts_the_least_recently_used_frame():
+    cache = RenderCache(max_bytes=1000, max_entries=2)
+
+    async def run():
+        await cache.put("a", b"A")
+        await cache.put("b", b"B")
+        # a becomes the most recently used, so b is evicted by c
+        assert await cache.get("a") == b"A"
+        await cache.put("c", b"C")
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    assert asyncio.run(run()) == (b"A", None, b"C")
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = RenderCache(max_bytes=10, max_entries=100)
+
+    async def run():
+        for key in "abcd":
+            await cache.put(key, key.encode() * 4)
+        return [await cache.get(key) for key in "abcd"]
+
+    assert asyncio.run(run()) == [None, None, b"cccc", b"dddd"]
+    assert cache.stats()["bytes"] == 8
+
+
+def test_put_of_a_cached_frame_only_refreshes_it():
+    cache = RenderCache(max_bytes=1000, max_entries=2)
+
+    async def run():
+        await cache.put("a", b"A")
+        await cache.put("b", b"B")
+        await cache.put("a", b"A")
+        await cache.put("c", b"C")
+        return await cache.get("a"), await cache.get("b")
+
+    assert asyncio.run(run()) == (b"A", None)
+    assert cache.stats()["bytes"] == 2
+
+
+def test_evicted_frames_are_spilled_and_promoted_back(tmp_path):
+    cache = RenderCache(max_bytes=1000, max_entries=1, spill_dir=str(tmp_path), spill_max_bytes=1000)
+
+    async def run():
+        await cache.put("a", b"A")
+        await cache.put("b", b"B")
+        assert os.listdir(tmp_path) == ["a.bin"]
+        # a comes back from disk into memory and pushes b out to disk
+        return await cache.get("a")
+
+    assert asyncio.run(run()) == b"A"
+    assert sorted(os.listdir(tmp_path)) == ["a.bin", "b.bin"]
+    stats = cache.stats()
+    assert stats["spill_hits"] == 1
+    assert stats["entries"] == 1
+
+
+def test_frames_larger_than_memory_go_to_disk(tmp_path):
+    cache = RenderCache(max_bytes=4, max_entries=10, spill_dir=str(tmp_path), spill_max_bytes=1000)
+
+    async def run():
+        await cache.put("big", b"0123456789")
+        return await cache.get("big")
+
+    assert asyncio.run(run()) == b"0123456789"
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["spilled_entries"] == 1
+
+
+def test_spill_tier_evicts_the_oldest_files(tmp_path):
+    cache = RenderCache(max_bytes=4, max_entries=1, spill_dir=str(tmp_path), spill_max_bytes=8)
+
+    async def run():
+        for key in "abcd":
+            await cache.put(key, key.encode() * 4)
+
+    asyncio.run(run())
+    # d is in memory, a was dropped from the full spill tier
+    assert sorted(os.listdir(tmp_path)) == ["b.bin", "c.bin"]
+    assert cache.stats()["spilled_bytes"] == 8
+
+
+def test_spilled_frames_survive_a_restart(tmp_path):
+    first = RenderCache(max_bytes=1000, max_entries=1, spill_dir=str(tmp_path), spill_max_bytes=1000)
+
+    async def fill():
+        await first.put("a", b"A")
+        await first.put("b", b"B")
+
+    asyncio.run(fill())
+
+    second = RenderCache(max_bytes=1000, max_entries=1, spill_dir=str(tmp_path), spill_max_bytes=1000)
+    assert asyncio.run(second.get("a")) == b"A"
+
+
+def test_missing_spill_file_is_a_miss(tmp_path):
+    cache = RenderCache(max_bytes=1000, max_entries=1, spill_dir=str(tmp_path), spill_max_bytes=1000)
+
+    async def run():
+        await cache.put("a", b"A")
+        await cache.put("b", b"B")
+        os.remove(tmp_path / "a.bin")
+        return await cache.get("a")
+
+    assert asyncio.run(run()) is None
+    assert cache.stats()["spilled_entries"] == 0
+
+
+def test_clear_drops_both_tiers(tmp_path):
+    cache = RenderCache(max_bytes=1000, max_entries=1, spill_dir=str(tmp_path), spill_max_bytes=1000)
+
+    async def run():
+        await cache.put("a", b"A")
+        await cache.put("b", b"B")
+        await cache.clear()
+        return await cache.get("a"), await cache.get("b")
+
+    assert asyncio.run(run()) == (None, None)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,68 @@
+import pytest
+
+from utils.response_store import ResponseNotRecorded, ResponseStore
+
+
+MESSAGES = [{"role": "system", "content": "You are the professor."}, {"content": "Hello", "role": "user"}]
+
+
+def test_key_does_not_depend_on_dict_order():
+    reordered = [{"content": "You are the professor.", "role": "system"}, {"role": "user", "content": "Hello"}]
+
+    assert ResponseStore.key("gpt-4o", MESSAGES, None) == ResponseStore.key("gpt-4o", reordered, None)
+
+
+def test_key_treats_no_tools_like_an_empty_list():
+    assert ResponseStore.key("gpt-4o", MESSAGES, None) == ResponseStore.key("gpt-4o", MESSAGES, [])
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        {"model": "gpt-4o-mini"},
+        {"messages": MESSAGES[:1]},
+        {"tools": [{"type": "function", "function": {"name": "Administer-shock"}}]},
+        {"seed": 2},
+        {"call": 2},
+    ],
+)
+def test_key_changes_with_every_input(changed):
+    call = {"model": "gpt-4o", "messages": MESSAGES, "tools": None, "seed": 1, "call": 1}
+
+    assert ResponseStore.key(**call) != ResponseStore.key(**{**call, **changed})
+
+
+def test_put_and_get_round_trip(tmp_path):
+    store = ResponseStore(str(tmp_path), "record")
+    key = ResponseStore.key("gpt-4o", MESSAGES, None)
+    tool_call = {"content": None, "tool_calls": [{"id": "call_1", "type": "function"}]}
+
+    store.put(key, "gpt-4o", tool_call)
+
+    assert store.get(key) == {"model": "gpt-4o", "response": tool_call}
+    assert store.path(key).startswith(str(tmp_path / key[:2] / key[2:4]))
+    stats = store.stats()
+    assert stats["writes"] == 1
+    assert stats["hits"] == 1
+    assert stats["bytes_read"] == stats["bytes_written"]
+
+
+def test_a_miss_returns_none_when_recording(tmp_path):
+    store = ResponseStore(str(tmp_path), "record")
+
+    assert store.get("0" * 64) is None
+    assert store.stats()["misses"] == 1
+
+
+def test_a_miss_raises_when_replaying(tmp_path):
+    store = ResponseStore(str(tmp_path), "replay")
+
+    with pytest.raises(ResponseNotRecorded):
+        store.get("0" * 64)
+
+
+def test_passthrough_is_disabled_and_unknown_modes_are_rejected(tmp_path):
+    assert not ResponseStore(str(tmp_path)).enabled
+    assert ResponseStore(str(tmp_path), "replay").enabled
+    with pytest.raises(ValueError):
+        ResponseStore(str(tmp_path), "refresh")
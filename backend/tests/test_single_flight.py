@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_with_the_same_key_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return f"result {key}"
+
+    async def run():
+        return await asyncio.gather(
+            flights.do("a", lambda: fetch("a")),
+            flights.do("a", lambda: fetch("a")),
+            flights.do("b", lambda: fetch("b")),
+        )
+
+    assert asyncio.run(run()) == ["result a", "result a", "result b"]
+    assert calls == ["a", "b"]
+    assert flights.stats() == {"in_flight": 0, "upstream_calls": 2, "coalesced": 1}
+
+
+def test_a_finished_call_is_not_reused():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        return len(calls)
+
+    async def run():
+        return await flights.do("a", fetch), await flights.do("a", fetch)
+
+    assert asyncio.run(run()) == (1, 2)
+
+
+def test_waiting_callers_share_the_exception():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def run():
+        return await asyncio.gather(flights.do("a", fail), flights.do("a", fail), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert [str(error) for error in errors] == ["provider down", "provider down"]
+
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(flights.do("a", fetch))
+        second = asyncio.create_task(flights.do("a", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(run()) == ("done", True)
+
+
+async def chunks(values, delay=0.0):
+    for value in values:
+        await asyncio.sleep(delay)
+        yield value
+
+
+def test_late_stream_subscribers_receive_every_chunk():
+    flights = SingleFlight()
+    sources = []
+
+    def source():
+        sources.append(None)
+        return chunks([b"a", b"b", b"c"], delay=0.01)
+
+    async def collect(stream):
+        return [chunk async for chunk in stream]
+
+    async def run():
+        first = asyncio.create_task(collect(flights.stream("key", source)))
+        await asyncio.sleep(0.025)
+        # joins after the first chunks were produced
+        second = asyncio.create_task(collect(flights.stream("key", source)))
+        return await first, await second
+
+    assert asyncio.run(run()) == ([b"a", b"b", b"c"], [b"a", b"b", b"c"])
+    assert len(sources) == 1
+
+
+def test_stream_errors_reach_every_subscriber_after_the_chunks_produced():
+    flights = SingleFlight()
+
+    async def failing():
+        yield b"a"
+        raise RuntimeError("provider down")
+
+    async def collect(stream):
+        received = []
+        with pytest.raises(RuntimeError):
+            async for chunk in stream:
+                received.append(chunk)
+        return received
+
+    async def run():
+        return await asyncio.gather(
+            collect(flights.stream("key", failing)), collect(flights.stream("key", failing))
+        )
+
+    assert asyncio.run(run()) == [[b"a"], [b"a"]]
+
+
+def test_stream_source_runs_to_its_end_without_subscribers():
+    flights = SingleFlight()
+    produced = []
+
+    async def source():
+        for value in range(3):
+            await asyncio.sleep(0.005)
+            produced.append(value)
+            yield value
+
+    async def run():
+        stream = flights.stream("key", source)
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert produced == [0, 1, 2]
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from utils.static_media import StaticMedia, parse_byte_range
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("", None),
+        ("bytes=0-99", (0, 99)),
+        ("bytes=10-", (10, 999)),
+        ("bytes=990-2000", (990, 999)),  # end clamped to the file
+        ("bytes=-100", (900, 999)),  # suffix range
+        ("bytes=-5000", (0, 999)),  # suffix longer than the file
+        (" bytes=5-5 ", (5, 5)),
+        ("bytes=0-9,20-29", None),  # multi-range, the whole file is sent
+    ],
+)
+def test_parse_byte_range(header, expected):
+    assert parse_byte_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        "bytes=-",
+        "bytes=a-b",
+        "items=0-10",
+        "bytes 0-10",
+        "bytes=1000-",  # starts past the end
+        "bytes=50-10",  # end before start
+        "bytes=-0",  # empty suffix
+    ],
+)
+def test_parse_byte_range_rejects_invalid_and_unsatisfiable_ranges(header):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, 1000)
+
+
+def test_parse_byte_range_of_an_empty_file():
+    assert parse_byte_range(None, 0) is None
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=0-", 0)
+
+
+def test_static_media_reads_a_file_again_when_it_changes(tmp_path):
+    path = tmp_path / "shock.mp3"
+    path.write_bytes(b"first")
+    media = StaticMedia({"shock": str(path)})
+
+    first = media.get("shock")
+    assert media.get("shock") is first
+    assert first.media_type == "audio/mpeg"
+
+    path.write_bytes(b"second")
+    # the modification time is what is checked
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second = media.get("shock")
+    assert second.data == b"second"
+    assert second.etag != first.etag
+    assert media.stats()["loads"] == 2